@@ -1,64 +1,140 @@
-import pygame, sys, random, math
+import pygame, os, sys, random, time, argparse, atexit, sqlite3
+from pong_assets import StartupTimer, find_font
+from pong_audio import AudioManager
+from pong_engine import Match
+from pong_replay import Recording, Recorder, Replay, SETTINGS, SERVE, RESTART
+from pong_text import TextCache
+from pong_render import Display, DISPLAY_BACKENDS, DirtyRectRenderer, SpriteCache, parse_size
+from pong_net import NetClient, parse_address
+from pong_profiler import FrameProfiler, EVENTS, BALL, PADDLES, OPPONENT, DRAW, PRESENT, SLEEP
+from pong_latency import FramePacer, LatencyMonitor
+from pong_telemetry import Telemetry
+from pong_quality import QualityGovernor
+from pong_memory import SteadyGC, AllocationProfiler
+from pong_capture import FrameCapture, CAPTURE_FORMATS
+
+STARTUP = StartupTimer()
+STARTUP_REPORT = False  # Print the startup timings once the first frame is up (--startup-report)
 
 # Game Initialization and Management
-pygame.init()
-WIDTH, HEIGHT = 1280, 700
-FONT = pygame.font.SysFont("Consolas", int(WIDTH / 20))
-SCREEN = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Pong!")
-CLOCK = pygame.time.Clock()
+WIDTH, HEIGHT = 1280, 700  # Logical resolution: the game is drawn at this size and scaled to the window
+SCREEN = FONT = CLOCK = RENDERER = DISPLAY = None  # Created by init_game()
+DISPLAY_BACKEND = "window"  # How SCREEN reaches the window, see pong_render.DISPLAY_BACKENDS (--display)
+WINDOW_SIZE = None  # Window size for the scaling backends; None opens it at the logical resolution
+FULLSCREEN = False
+VSYNC = False  # Only the scaled and renderer backends can wait for the display's refresh
+TEXT_CACHE = TextCache()  # Rendered labels, reused across frames
+SPRITES = SpriteCache()  # Ball and paddle surfaces, re-rendered only when their colors change
+PHYSICS_HZ = 60  # Fixed physics rate; ball and paddle speeds are in pixels per physics tick
+PHYSICS_DT = 1 / PHYSICS_HZ
+MAX_CATCH_UP_STEPS = 5  # Physics ticks allowed per rendered frame before the backlog is dropped
+MAX_FPS = 0  # Render rate cap (0 = uncapped, renders as fast as the display allows)
+DIRTY_RECTS = True  # Only redraw and present the moving objects; False repaints the whole screen every frame
 LEFT_MARGIN = 75
 
 live_ball = False
 paused = False  
-player_score, opponent_score = 0, 0
 ai_difficulty = 0.2
 boss_mode = False
 # Indices for difficulty settings
 difficulty_levels = [0.2, 0.4, 0.6, 0.8, 1.0]
 difficulty_index = difficulty_levels.index(ai_difficulty)
 
-# Load Sounds
+# Load Sounds (the sound effect and both music tracks are decoded in the background, see init_game)
 main_music = 'Games/Pong/srstrnc.wav'
 boss_music = 'Games/Pong/boss-music.wav'
-point_sfx = pygame.mixer.Sound('Games/Pong/8bit_point_sfx.wav')
-current_music = None
+point_sfx_file = 'Games/Pong/8bit_point_sfx.wav'
+AUDIO = AudioManager()
+point_sfx = AUDIO.sound_effect(point_sfx_file)
+
+def init_game(load_sounds=True):
+    """
+    Start only the subsystems the first frame needs; audio finishes loading while the start menu is up.
+    load_sounds=False opens the mixer but skips the sound files, leaving the game silent (the benchmarks).
+    """
+    global FONT, CLOCK
+
+    pygame.display.init()
+    STARTUP.mark("display init")
+    init_display()
+    STARTUP.mark("window")
+
+    AudioManager.init_mixer()  # Small buffer for low-latency sound effects; only the decoding goes to the loader
+    STARTUP.mark("mixer init")
+    if load_sounds:
+        AUDIO.start([point_sfx_file], [main_music, boss_music])
+    else:
+        AUDIO.start([], [])
+
+    pygame.font.init()
+    FONT = pygame.font.Font(find_font("Consolas"), int(WIDTH / 20))  # Same font SysFont picks, without the scan
+    STARTUP.mark("font")
+
+    CLOCK = pygame.time.Clock()
+
+def init_display():
+    """Open the window for the DISPLAY_* settings. SCREEN is the logical surface everything is drawn on."""
+    global SCREEN, RENDERER, DISPLAY
+    DISPLAY = Display(DISPLAY_BACKEND, (WIDTH, HEIGHT), WINDOW_SIZE, FULLSCREEN, VSYNC, caption="Pong!")
+    if DISPLAY.fallback_reason:
+        print(DISPLAY.fallback_reason, file=sys.stderr)
+    SCREEN = DISPLAY.surface
+    RENDERER = DirtyRectRenderer(SCREEN, DISPLAY.update)
+    MENU_SURFACES.clear()  # Composed in the previous display's pixel format
 
 def play_music(is_boss_mode):
     """Handle music switching between normal and boss mode"""
-    global current_music
-    
-    # Determine which music track to play
-    music_track = boss_music if is_boss_mode else main_music
-    
-    # Only change the music if it's different from what's currently playing
-    if current_music != music_track:
-        pygame.mixer.music.stop()  # Stop current music
-        pygame.mixer.music.unload()  # Unload current music
-        pygame.mixer.music.load(music_track)  # Load new music
-        pygame.mixer.music.play(-1)  # Play on loop (-1 means loop indefinitely)
-        current_music = music_track
+    # Both tracks are already in memory; switching crossfades on the mixer thread without blocking
+    AUDIO.play_music(boss_music if is_boss_mode else main_music)
 
 # Paddles
 player = pygame.Rect(WIDTH - 30, HEIGHT / 2 - 50, 20, 140)
 opponent = pygame.Rect(30, HEIGHT / 2 - 50, 20, 140)
 
-# Paddle properties
-PADDLE_ACCELERATION = 1.25
-MAX_PADDLE_SPEED = 15
-BOSS_PADDLE_SPEED = 20
-
-# Paddle state
-player_paddle_speed = 0
-opponent_paddle_speed = 0
-
 # Ball
 ball = pygame.Rect(WIDTH / 2 - 10, HEIGHT / 2 - 10, 27, 27)
 
-x_speed, y_speed = 20, 20
 ball_speed_levels = [6, 8, 10, 12, 14, 16]
 ball_speed_index = 4
 
+# Match state: ball, paddles, speeds and scores (see pong_engine.py)
+match = Match(ball_speed=ball_speed_levels[ball_speed_index], ai_difficulty=ai_difficulty)
+
+# Recording / playback of the match (--record / --replay, see pong_replay.py)
+RECORDER = None
+REPLAY = None
+
+# Online match (--connect, see pong_net.py): the server owns the match, this is our predicted copy of it
+NET = None
+
+# Chaos mode (--chaos N, see pong_multiball.py): N extra balls that score like the real one but make no sound
+SWARM = None
+
+# Frame-time profiler (see pong_profiler.py): None unless --profile is given or the overlay is opened with F3
+PROFILER = None
+PROFILE_EXPORT = None  # File the profiler's frames are written to at exit (--profile-out)
+PROFILE_KEY = pygame.K_F3
+
+# Frame pacing and input latency (see pong_latency.py): None paces with CLOCK.tick(MAX_FPS)
+PACER = None  # --low-latency: read the input, simulate and render as late as possible before each present
+LATENCY = None  # --latency-report: key event to present times
+LOW_LATENCY_FPS = 60  # Frame rate --low-latency paces to when --fps isn't given
+
+# Adaptive quality (--adaptive-quality, see pong_quality.py): steps quality down when frames run over budget
+GOVERNOR = None
+QUALITY_FPS = 60  # Frame rate the governor holds when --fps isn't given
+SHOWN_SCORES = (0, 0)  # Scores on the scoreboard; they lag the match's while the governor defers score redraws
+
+# Memory (see pong_memory.py): --steady-gc holds garbage collection for breaks in play, --alloc-profile traces allocations
+STEADY_GC = None
+ALLOC_PROFILER = None
+
+# Gameplay capture (--capture PATH, see pong_capture.py): frames copied to pooled surfaces and written by a thread pool
+CAPTURE = None
+
+# Match telemetry (--telemetry DB, see pong_telemetry.py): paddle hits and rallies, written to SQLite off the game thread
+TELEMETRY = None
+
 # Settings for the game
 ball_color = "orange"
 scoreboard_color = "white"
@@ -66,549 +142,709 @@ player_paddle_color = "dodgerblue"
 opponent_paddle_color = "tomato"
 boss_paddle_color = "red"
 
+# -------------------- MENU HELPERS --------------------
+# Menus only change when the mouse moves onto another item or a setting is
+# clicked, so they block on pygame.event.wait (no CPU while the player is idle)
+# and redraw only when something they show has changed.
+MENU_SURFACES = {}  # Pre-composited static parts of the menus, keyed by menu
+
+def menu_surface(key, draw):
+    """The cached static layer for a menu; draw(surface) composes it the first time."""
+    surface = MENU_SURFACES.get(key)
+    if surface is None:
+        surface = pygame.Surface(SCREEN.get_size()).convert(SCREEN)
+        surface.fill("Black")
+        draw(surface)
+        MENU_SURFACES[key] = surface
+    return surface
+
+def wait_menu_event():
+    """Sleep until the next event arrives and return it. Quitting is handled here for every menu."""
+    event = pygame.event.wait()
+    if event.type == pygame.QUIT:
+        quit_game()
+    return event
+
+def quit_game():
+    """The window was closed: write out what telemetry and capture still have queued, then shut down."""
+    close_telemetry()
+    close_capture()
+    pygame.quit()
+    sys.exit()
+
+def menu_needs_redraw(event):
+    """Events after which the window contents must be drawn again even though the menu didn't change."""
+    return event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.WINDOWSHOWN)
+
+def hovered_item(rects, position):
+    """Index of the rect under position, or None."""
+    for index, rect in enumerate(rects):
+        if rect.collidepoint(position):
+            return index
+    return None
+
 # -------------------- START MENU --------------------
 def show_start_menu():
     """Displays the start menu and waits for the player to start the game with mouse interaction."""
     global boss_mode, opponent_paddle_color
-    
-    while True:
-        SCREEN.fill("Black")
-
-        # ---------- Text for the menu options ----------
-        title_text = FONT.render("Pong!", True, "orange")
-        play_text = FONT.render("Play", True, "white")
-        boss_text = FONT.render("Boss Mode", True, "red")
-        settings_text = FONT.render("Settings", True, "white")
 
-        # Create rectangles for menu options
-        qg_rect = play_text.get_rect(topleft=(LEFT_MARGIN, HEIGHT / 2 - 150))
-        boss_rect = boss_text.get_rect(topleft=(LEFT_MARGIN, HEIGHT / 2 - 50))
-        settings_rect = settings_text.get_rect(topleft=(LEFT_MARGIN, HEIGHT / 2 + 50))
+    # ---------- Text for the menu options ----------
+    title_text = TEXT_CACHE.render(FONT, "Pong!", "orange")
+    labels = [("Play", "white"), ("Boss Mode", "red"), ("Settings", "white")]
+    label_texts = [TEXT_CACHE.render(FONT, text, color) for text, color in labels]
 
-        # Get mouse position
-        mouse_x, mouse_y = pygame.mouse.get_pos()
+    # Create rectangles for menu options
+    qg_rect = label_texts[0].get_rect(topleft=(LEFT_MARGIN, HEIGHT / 2 - 150))
+    boss_rect = label_texts[1].get_rect(topleft=(LEFT_MARGIN, HEIGHT / 2 - 50))
+    settings_rect = label_texts[2].get_rect(topleft=(LEFT_MARGIN, HEIGHT / 2 + 50))
+    item_rects = [qg_rect, boss_rect, settings_rect]
 
-        # Check hover for Play
-        if qg_rect.collidepoint(mouse_x, mouse_y):
-            play_text = FONT.render("Play", True, "yellow")
-            pygame.draw.rect(SCREEN, "yellow", qg_rect.inflate(20, 10), 3)
+    def draw_static(surface):
+        surface.blit(title_text, (LEFT_MARGIN, HEIGHT / 12))
+        for text, rect in zip(label_texts, item_rects):
+            surface.blit(text, rect.topleft)
 
-        # Check hover for Boss Mode
-        if boss_rect.collidepoint(mouse_x, mouse_y):
-            boss_text = FONT.render("Boss Mode", True, "yellow")
-            pygame.draw.rect(SCREEN, "yellow", boss_rect.inflate(20, 10), 3)
+    hovered = hovered_item(item_rects, DISPLAY.mouse_pos())
+    needs_redraw = True
 
-        # Check hover for Settings
-        if settings_rect.collidepoint(mouse_x, mouse_y):
-            settings_text = FONT.render("Settings", True, "yellow")
-            pygame.draw.rect(SCREEN, "yellow", settings_rect.inflate(20, 10), 3)
-
-        # Blit the menu items
-        SCREEN.blit(title_text, (LEFT_MARGIN, HEIGHT / 12))
-        SCREEN.blit(play_text, qg_rect.topleft)
-        SCREEN.blit(boss_text, boss_rect.topleft)
-        SCREEN.blit(settings_text, settings_rect.topleft)
-
-        pygame.display.update()
+    while True:
+        if needs_redraw:
+            SCREEN.blit(menu_surface("start", draw_static), (0, 0))
+            # Highlight the hovered option
+            if hovered is not None:
+                rect = item_rects[hovered]
+                SCREEN.fill("Black", rect)
+                SCREEN.blit(TEXT_CACHE.render(FONT, labels[hovered][0], "yellow"), rect.topleft)
+                pygame.draw.rect(SCREEN, "yellow", rect.inflate(20, 10), 3)
+            DISPLAY.update()
+            needs_redraw = False
+            if STARTUP.mark_first_frame() and STARTUP_REPORT:
+                print(STARTUP.report())
 
         # Event handling
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if qg_rect.collidepoint(mouse_x, mouse_y):
-                    boss_mode = False
-                    opponent_paddle_color = "tomato"
-                    play_music(False)  # Start normal music
-                    return
-                if boss_rect.collidepoint(mouse_x, mouse_y):
-                    boss_mode = True
-                    opponent_paddle_color = boss_paddle_color
-                    play_music(True)  # Start boss music
-                    return
-                if settings_rect.collidepoint(mouse_x, mouse_y):
-                    show_settings_menu()
+        event = wait_menu_event()
+        if event.type == pygame.MOUSEMOTION:
+            now_hovered = hovered_item(item_rects, event.pos)
+            needs_redraw = now_hovered != hovered
+            hovered = now_hovered
+
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            if qg_rect.collidepoint(event.pos):
+                boss_mode = False
+                opponent_paddle_color = "tomato"
+                play_music(False)  # Start normal music
+                return
+            if boss_rect.collidepoint(event.pos):
+                boss_mode = True
+                opponent_paddle_color = boss_paddle_color
+                play_music(True)  # Start boss music
+                return
+            if settings_rect.collidepoint(event.pos):
+                show_settings_menu()
+                hovered = hovered_item(item_rects, DISPLAY.mouse_pos())
+                needs_redraw = True
+
+        elif menu_needs_redraw(event):
+            needs_redraw = True
 
 # -------------------- IN-GAME PAUSE MENU --------------------
 def show_pause_menu():
     """Displays the pause menu and allows the player to resume, restart, or return to the main menu."""
     global paused
 
-    pygame.mixer.music.pause()
+    AUDIO.pause_music()
 
-    while paused:
-        SCREEN.fill("Black")
-
-        # ---------- Pause Menu Text ----------
-        pause_title = FONT.render("Paused", True, "orange")
-        resume_text = FONT.render("Resume Game", True, "white")
-        restart_text = FONT.render("Restart Game", True, "white")
-        main_menu_text = FONT.render("Return to Main Menu", True, "white")
-
-        # ---------- Create rectangles for menu options to detect hovering ----------
-        resume_rect = resume_text.get_rect(center=(WIDTH / 2, HEIGHT / 2 - 100))
-        restart_rect = restart_text.get_rect(center=(WIDTH / 2, HEIGHT / 2))
-        main_menu_rect = main_menu_text.get_rect(center=(WIDTH / 2, HEIGHT / 2 + 100))
-
-        # Get mouse position
-        mouse_x, mouse_y = pygame.mouse.get_pos()
-
-        # Highlight and detect clicks for "Resume Game"
-        if resume_rect.collidepoint(mouse_x, mouse_y):
-            resume_text = FONT.render("Resume Game", True, "yellow")
-            pygame.draw.rect(SCREEN, "yellow", resume_rect.inflate(20, 20), 3)
-            if pygame.mouse.get_pressed()[0]:
-                paused = False  # Resume the game
+    # ---------- Pause Menu Text ----------
+    pause_title = TEXT_CACHE.render(FONT, "Paused", "orange")
+    labels = ["Resume Game", "Restart Game", "Return to Main Menu"]
+    label_texts = [TEXT_CACHE.render(FONT, text, "white") for text in labels]
 
-        # Highlight and detect clicks for "Restart Game"
-        if restart_rect.collidepoint(mouse_x, mouse_y):
-            restart_text = FONT.render("Restart Game", True, "yellow")
-            pygame.draw.rect(SCREEN, "yellow", restart_rect.inflate(20, 20), 3)
-            if pygame.mouse.get_pressed()[0]:
-                restart_game()  # Call the restart function
-                paused = False  # Unpause the game after restart
+    # ---------- Create rectangles for menu options to detect hovering ----------
+    resume_rect = label_texts[0].get_rect(center=(WIDTH / 2, HEIGHT / 2 - 100))
+    restart_rect = label_texts[1].get_rect(center=(WIDTH / 2, HEIGHT / 2))
+    main_menu_rect = label_texts[2].get_rect(center=(WIDTH / 2, HEIGHT / 2 + 100))
+    item_rects = [resume_rect, restart_rect, main_menu_rect]
 
-        # Highlight and detect clicks for "Return to Main Menu"
-        if main_menu_rect.collidepoint(mouse_x, mouse_y):
-            main_menu_text = FONT.render("Return to Main Menu", True, "yellow")
-            pygame.draw.rect(SCREEN, "yellow", main_menu_rect.inflate(20, 20), 3)
-            if pygame.mouse.get_pressed()[0]:
-                show_start_menu()  # Function to go back to the main menu
+    def draw_static(surface):
+        surface.blit(pause_title, (WIDTH / 2 - 100, HEIGHT / 6))
+        for text, rect in zip(label_texts, item_rects):
+            surface.blit(text, rect.topleft)
 
-        # Render the pause menu items
-        SCREEN.blit(pause_title, (WIDTH / 2 - 100, HEIGHT / 6))
-        SCREEN.blit(resume_text, resume_rect.topleft)
-        SCREEN.blit(restart_text, restart_rect.topleft)
-        SCREEN.blit(main_menu_text, main_menu_rect.topleft)
+    hovered = hovered_item(item_rects, DISPLAY.mouse_pos())
+    needs_redraw = True
 
-        pygame.display.update()
+    while paused:
+        if needs_redraw:
+            SCREEN.blit(menu_surface("pause", draw_static), (0, 0))
+            if hovered is not None:
+                rect = item_rects[hovered]
+                SCREEN.fill("Black", rect)
+                SCREEN.blit(TEXT_CACHE.render(FONT, labels[hovered], "yellow"), rect.topleft)
+                pygame.draw.rect(SCREEN, "yellow", rect.inflate(20, 20), 3)
+            DISPLAY.update()
+            needs_redraw = False
 
         # Event handling
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+        event = wait_menu_event()
+        if event.type == pygame.MOUSEMOTION:
+            now_hovered = hovered_item(item_rects, event.pos)
+            needs_redraw = now_hovered != hovered
+            hovered = now_hovered
+
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            if resume_rect.collidepoint(event.pos):
+                paused = False  # Resume the game
+            elif restart_rect.collidepoint(event.pos):
+                restart_game()  # Call the restart function
+                paused = False  # Unpause the game after restart
+            elif main_menu_rect.collidepoint(event.pos):
+                show_start_menu()  # Function to go back to the main menu
+                hovered = hovered_item(item_rects, DISPLAY.mouse_pos())
+                needs_redraw = True
+
+        elif menu_needs_redraw(event):
+            needs_redraw = True
 
-        if not paused:
-            pygame.mixer.music.unpause()
+    AUDIO.unpause_music()
 
 
 # -------------------- SETTINGS MENU --------------------
 def show_settings_menu():
     """Displays the settings menu to allow players to adjust options."""
     global ball_color, scoreboard_color, player_paddle_color, opponent_paddle_color, ai_difficulty, difficulty_index, difficulty_levels, LEFT_MARGIN
-    global ball_speed_index, ball_speed_levels, x_speed, y_speed
+    global ball_speed_index, ball_speed_levels
 
     colors = ["aqua", "blue", "brown", "coral", "crimson", "cyan", "fuchsia", "gold", 
               "gray", "greenyellow", "indigo", "lavender", "lime", "moccasin", "navy", "orange", 
               "plum", "purple", "red", "salmon", "silver", "springgreen", "tomato", "turquoise", "violet", "khaki1", 
               "white", "yellow", "dodgerblue"]
 
-    # Indices for selected colors
-    ball_color_index = colors.index(ball_color)
-    scoreboard_color_index = colors.index(scoreboard_color)
-    player_paddle_color_index = colors.index(player_paddle_color)
-    opponent_paddle_color_index = colors.index(opponent_paddle_color)
+    # Each setting: label and the list of values it cycles through
+    settings = [("Ball Color: ", colors), ("Scoreboard Color: ", colors), ("Player Paddle Color: ", colors),
+                ("Opponent Paddle Color: ", colors), ("AI Difficulty: ", difficulty_levels), ("Ball Speed: ", ball_speed_levels)]
 
-    mouse_released = True  # Track mouse release to prevent continuous cycling
+    # Indices for selected values
+    indices = [colors.index(ball_color), colors.index(scoreboard_color), colors.index(player_paddle_color),
+               colors.index(opponent_paddle_color), difficulty_index, ball_speed_index]
 
     # Constant vertical offsets for spacing menu items
     VERTICAL_SPACING = 75
     START_Y = HEIGHT / 2 - 225
 
-    # Create random button text and position
-    random_button_text = FONT.render("Randomize Colors", True, "white")
+    # Rects for the settings, the back button and the random button
+    item_rects = [TEXT_CACHE.render(FONT, prefix, "white").get_rect(topleft=(LEFT_MARGIN, START_Y + i * VERTICAL_SPACING))
+                  for i, (prefix, values) in enumerate(settings)]
+    back_rect = TEXT_CACHE.render(FONT, "Back to Menu", "white").get_rect(topleft=(LEFT_MARGIN, START_Y + 6 * VERTICAL_SPACING))
+    random_button_text = TEXT_CACHE.render(FONT, "Randomize Colors", "white")
     random_button_rect = random_button_text.get_rect(topright=(WIDTH - 40, 40))
+    buttons = item_rects + [back_rect, random_button_rect]
+    BACK, RANDOM = len(settings), len(settings) + 1
 
-    # Wait for the mouse button to be released
-    while pygame.mouse.get_pressed()[0]:  # Wait for the mouse button to be released before proceeding
-        pygame.event.pump()  # Keep processing events to avoid freezing
+    def draw_static(surface):
+        # Settings title, the setting labels and the buttons; the values are drawn on top
+        surface.blit(TEXT_CACHE.render(FONT, "Settings", "orange"), (LEFT_MARGIN, START_Y - 80))
+        for (prefix, values), rect in zip(settings, item_rects):
+            surface.blit(TEXT_CACHE.render(FONT, prefix, "white"), rect.topleft)
+        surface.blit(TEXT_CACHE.render(FONT, "Back to Menu", "white"), back_rect.topleft)
+        surface.blit(random_button_text, random_button_rect)
+
+    hovered = hovered_item(buttons, DISPLAY.mouse_pos())
+    needs_redraw = True
 
     while True:
-        SCREEN.fill("Black")
-
-        # Settings title
-        settings_title = FONT.render("Settings", True, "orange")
-
-        # Render menu items and get their rects
-        ball_color_rect = render_menu_item("Ball Color: ", colors[ball_color_index], (LEFT_MARGIN, START_Y))
-        scoreboard_color_rect = render_menu_item("Scoreboard Color: ", colors[scoreboard_color_index], (LEFT_MARGIN, START_Y + VERTICAL_SPACING))
-        player_paddle_color_rect = render_menu_item("Player Paddle Color: ", colors[player_paddle_color_index], (LEFT_MARGIN, START_Y + 2 * VERTICAL_SPACING))
-        opponent_paddle_color_rect = render_menu_item("Opponent Paddle Color: ", colors[opponent_paddle_color_index], (LEFT_MARGIN, START_Y + 3 * VERTICAL_SPACING))
-        ai_difficulty_rect = render_menu_item("AI Difficulty: ", difficulty_levels[difficulty_index], (LEFT_MARGIN, START_Y + 4 * VERTICAL_SPACING))
-        ball_speed_rect = render_menu_item("Ball Speed: ", ball_speed_levels[ball_speed_index], (LEFT_MARGIN, START_Y + 5 * VERTICAL_SPACING))
-        back_rect = render_text_item("Back to Menu", (LEFT_MARGIN, START_Y + 6 * VERTICAL_SPACING))
-
-        # Get mouse position
-        mouse_x, mouse_y = pygame.mouse.get_pos()
-
-        # Draw random button
-        mouse_x, mouse_y = pygame.mouse.get_pos()
-
-        if random_button_rect.collidepoint(mouse_x, mouse_y):
-            random_button_text = FONT.render("Randomize Colors", True, "yellow")
-            pygame.draw.rect(SCREEN, "yellow", random_button_rect.inflate(20, 20), 3)
-            if pygame.mouse.get_pressed()[0] and mouse_released:
+        if needs_redraw:
+            SCREEN.blit(menu_surface("settings", draw_static), (0, 0))
+
+            # Current values next to their labels
+            for (prefix, values), index, rect in zip(settings, indices, item_rects):
+                render_menu_value(values[index], rect)
+
+            # Highlight the hovered item
+            if hovered == RANDOM:
+                SCREEN.blit(TEXT_CACHE.render(FONT, "Randomize Colors", "yellow"), random_button_rect)
+                pygame.draw.rect(SCREEN, "yellow", random_button_rect.inflate(20, 20), 3)
+            elif hovered == BACK:
+                pygame.draw.rect(SCREEN, "yellow", back_rect.inflate(20, 20), 3)
+            elif hovered is not None:
+                draw_menu_highlight(item_rects[hovered], settings[hovered][1][indices[hovered]])
+
+            DISPLAY.update()
+            needs_redraw = False
+
+        # Event handling
+        event = wait_menu_event()
+        if event.type == pygame.MOUSEMOTION:
+            now_hovered = hovered_item(buttons, event.pos)
+            needs_redraw = now_hovered != hovered
+            hovered = now_hovered
+
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            clicked = hovered_item(buttons, event.pos)
+            if clicked == RANDOM:
                 # Randomize colors but ensure they're all different
                 available_colors = colors.copy()
-                # Randomize ball color
-                ball_color_index = colors.index(random.choice(available_colors))
-                available_colors.remove(colors[ball_color_index])
-                # Randomize scoreboard color
-                scoreboard_color_index = colors.index(random.choice(available_colors))
-                available_colors.remove(colors[scoreboard_color_index])
-                # Randomize player paddle color
-                player_paddle_color_index = colors.index(random.choice(available_colors))
-                available_colors.remove(colors[player_paddle_color_index])
-                # Randomize opponent paddle color
-                opponent_paddle_color_index = colors.index(random.choice(available_colors))
-                mouse_released = False
-        
-        SCREEN.blit(random_button_text, random_button_rect)
-
-        # Handle input and highlighting for each setting
-        ball_color_index, mouse_released = handle_menu_input(ball_color_rect, ball_color_index, colors, mouse_x, mouse_y, mouse_released)
-        scoreboard_color_index, mouse_released = handle_menu_input(scoreboard_color_rect, scoreboard_color_index, colors, mouse_x, mouse_y, mouse_released)
-        player_paddle_color_index, mouse_released = handle_menu_input(player_paddle_color_rect, player_paddle_color_index, colors, mouse_x, mouse_y, mouse_released)
-        opponent_paddle_color_index, mouse_released = handle_menu_input(opponent_paddle_color_rect, opponent_paddle_color_index, colors, mouse_x, mouse_y, mouse_released)
-        difficulty_index, mouse_released = handle_menu_input(ai_difficulty_rect, difficulty_index, difficulty_levels, mouse_x, mouse_y, mouse_released)
-        ball_speed_index, mouse_released = handle_menu_input(ball_speed_rect, ball_speed_index, ball_speed_levels, mouse_x, mouse_y, mouse_released)
-
-        # Highlight and handle "Back to Menu" button
-        if back_rect.collidepoint(mouse_x, mouse_y):
-            pygame.draw.rect(SCREEN, "yellow", back_rect.inflate(20, 20), 3)
-            if pygame.mouse.get_pressed()[0] and mouse_released:
+                for i in range(4):  # Ball, scoreboard, player paddle and opponent paddle colors
+                    indices[i] = colors.index(random.choice(available_colors))
+                    available_colors.remove(colors[indices[i]])
+                needs_redraw = True
+            elif clicked == BACK:
                 # Save settings and go back to the main menu
-                ball_color = colors[ball_color_index]
-                scoreboard_color = colors[scoreboard_color_index]
-                player_paddle_color = colors[player_paddle_color_index]
-                opponent_paddle_color = colors[opponent_paddle_color_index]
+                ball_color = colors[indices[0]]
+                scoreboard_color = colors[indices[1]]
+                player_paddle_color = colors[indices[2]]
+                opponent_paddle_color = colors[indices[3]]
+                difficulty_index, ball_speed_index = indices[4], indices[5]
                 ai_difficulty = difficulty_levels[difficulty_index]  # Save AI difficulty
-                #x_speed, y_speed = ball_speed_levels[ball_speed_index]
                 return
+            elif clicked is not None:
+                # Cycle through the values of the clicked setting
+                indices[clicked] = (indices[clicked] + 1) % len(settings[clicked][1])
+                needs_redraw = True
 
-        # Reset mouse_released when the mouse button is released
-        if not pygame.mouse.get_pressed()[0]:
-            mouse_released = True
-
-        # Render the title
-        SCREEN.blit(settings_title, (LEFT_MARGIN, START_Y - 80))
-
-        pygame.display.update()
+        elif menu_needs_redraw(event):
+            needs_redraw = True
 
-        # Event handling
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
-# Helper function to render a menu item
-def render_menu_item(prefix, value, position):
-    text_prefix = FONT.render(prefix, True, "white")
-    text_value = FONT.render(str(value), True, value if isinstance(value, str) else "yellow")
-    rect_prefix = text_prefix.get_rect(topleft=position)
-    SCREEN.blit(text_prefix, position)
+# Helper function to render the value of a menu item next to its label
+def render_menu_value(value, rect_prefix):
+    text_value = TEXT_CACHE.render(FONT, str(value), value if isinstance(value, str) else "yellow")
     SCREEN.blit(text_value, (rect_prefix.right + 10, rect_prefix.top))
-    return rect_prefix
-
-# Helper function to render a simple text item like "Back to Menu"
-def render_text_item(text, position):
-    rendered_text = FONT.render(text, True, "white")
-    rect = rendered_text.get_rect(topleft=position)
-    SCREEN.blit(rendered_text, position)
-    return rect
-
-# Function to handle menu input and return the updated index
-def handle_menu_input(item_rect, current_index, item_list, mouse_x, mouse_y, mouse_released):
-    if item_rect.collidepoint(mouse_x, mouse_y):
-        highlight_rect = pygame.Rect(
-            item_rect.x - 10,
-            item_rect.y - 10,
-            item_rect.width + FONT.size(str(item_list[current_index]))[0] + 35,
-            item_rect.height + 15
-        )
-        pygame.draw.rect(SCREEN, "yellow", highlight_rect, 3)
-
-        # Detect mouse click (button pressed and released) and cycle through items
-        if pygame.mouse.get_pressed()[0]:  # Mouse is currently pressed
-            if mouse_released:  # Check if this is a fresh click (not held down)
-                current_index = (current_index + 1) % len(item_list)  # Cycle through items
-                mouse_released = False  # Prevent further changes until the mouse is released
-        else:
-            mouse_released = True  # Reset the flag when the mouse is released
 
-    return current_index, mouse_released  # Return both the index and the updated state of mouse_released
+# Helper function to draw the box around a hovered setting and its value
+def draw_menu_highlight(item_rect, value):
+    highlight_rect = pygame.Rect(
+        item_rect.x - 10,
+        item_rect.y - 10,
+        item_rect.width + TEXT_CACHE.size(FONT, str(value))[0] + 35,
+        item_rect.height + 15
+    )
+    pygame.draw.rect(SCREEN, "yellow", highlight_rect, 3)
 
 # -------------------- Helper Functions --------------------
+def sync_match_settings():
+    """Push the current menu settings into the match."""
+    match.boss_mode = boss_mode
+    match.ai_difficulty = ai_difficulty
+    match.ball_speed = ball_speed_levels[ball_speed_index]
+
+def sync_rects(alpha=1.0):
+    """Copy the match state, interpolated alpha of the way through the last physics tick, onto the Rects used for drawing."""
+    ball_x, ball_y, player_y, opponent_y = match.interpolate(alpha)
+    ball.topleft = (ball_x, ball_y)
+    player.y = player_y
+    opponent.y = opponent_y
+
+def record_event(action):
+    """Note a serve, restart or settings change in the recording, if one is running."""
+    if RECORDER:
+        RECORDER.event(action)
+
 def reset_ball(starting_player='player'):
     """Reset the ball position and speed based on the player who starts it."""
-    global ball, x_speed, y_speed
-    
-    # Position the ball at the center of the appropriate paddle
-    if starting_player == 'player':
-        ball.centerx = player.centerx - ball.width  # Start at player's paddle
-        ball.centery = player.centery
-    else:
-        ball.centerx = opponent.centerx + ball.width  # Start at opponent's paddle
-        ball.centery = opponent.centery
-
-    # Set initial speed (faster in boss mode)
-    base_speed = ball_speed_levels[ball_speed_index]
-    if boss_mode:
-        base_speed *= 1.3  # 30% faster in boss mode
-
-    # Set direction based on starting player
-    if starting_player == 'player':
-        x_speed = -abs(base_speed)  # Move towards opponent
+    sync_match_settings()
+    record_event(SERVE)
+    match.reset_ball(starting_player)
+    if TELEMETRY:
+        TELEMETRY.serve(match.frame)
+
+def draw_background(surface):
+    """Static part of the game screen: background, center line and scores."""
+    surface.fill("Black")
+    pygame.draw.line(surface, scoreboard_color, (WIDTH / 2, 0), (WIDTH / 2, HEIGHT))  # Scoreboard line
+    score_digits = TEXT_CACHE.digits(FONT, scoreboard_color)  # Scores are blitted from pre-rendered digits
+    player_score, opponent_score = SHOWN_SCORES
+    score_digits.blit_number(surface, player_score, (WIDTH / 2 + 40, HEIGHT / 8))
+    score_digits.blit_number(surface, opponent_score, (WIDTH / 2 - 80, HEIGHT / 8))
+
+def draw_screen(alpha=1.0):
+    global SHOWN_SCORES
+    sync_rects(alpha)
+    scores = (match.player_score, match.opponent_score)
+    if scores != SHOWN_SCORES and (GOVERNOR is None or GOVERNOR.redraw_scores()):
+        SHOWN_SCORES = scores
+    if DIRTY_RECTS:
+        # The background is only redrawn when a score or the scoreboard color changes
+        RENDERER.begin((scoreboard_color, SHOWN_SCORES), draw_background)
     else:
-        x_speed = abs(base_speed)   # Move towards player
-    
-    # Add more vertical variation in boss mode
-    if boss_mode:
-        y_speed = random.uniform(-base_speed * 0.8, base_speed * 0.8)
+        draw_background(SCREEN)
+    player_rect = SCREEN.blit(SPRITES.paddle("player", player_paddle_color, player.size), player)
+    opponent_rect = SCREEN.blit(SPRITES.paddle("opponent", opponent_paddle_color, opponent.size), opponent)
+    ball_sprite = SPRITES.ball(ball_color, ball.size)
+    ball_rect = SCREEN.blit(ball_sprite, ball)
+    if DIRTY_RECTS:
+        RENDERER.mark(player_rect, opponent_rect, ball_rect)
+    if SWARM:
+        xs, ys = SWARM.positions(alpha)
+        rects = SCREEN.blits([(ball_sprite, position) for position in zip(xs, ys)], doreturn=DIRTY_RECTS)
+        if DIRTY_RECTS:
+            RENDERER.mark(*rects)
+    if PROFILER and PROFILER.overlay:
+        overlay_rect = PROFILER.draw_overlay(SCREEN)
+        if DIRTY_RECTS:
+            RENDERER.mark(overlay_rect)
+
+def present_frame():
+    """Show the frame drawn by draw_screen."""
+    if DIRTY_RECTS:
+        RENDERER.present()
     else:
-        y_speed = random.choice([base_speed / 2, -base_speed / 2])
-
-def draw_screen():
-    SCREEN.fill("Black")
-    pygame.draw.line(SCREEN, scoreboard_color, (WIDTH / 2, 0), (WIDTH / 2, HEIGHT))  # Scoreboard line
-    pygame.draw.rect(SCREEN, player_paddle_color, player)
-    pygame.draw.rect(SCREEN, opponent_paddle_color, opponent)
-    pygame.draw.ellipse(SCREEN, ball_color, ball)
-    player_score_text = FONT.render(str(player_score), True, scoreboard_color)
-    opponent_score_text = FONT.render(str(opponent_score), True, scoreboard_color)
-    SCREEN.blit(player_score_text, (WIDTH / 2 + 40, HEIGHT / 8))
-    SCREEN.blit(opponent_score_text, (WIDTH / 2 - 80, HEIGHT / 8))
+        DISPLAY.update()
 
 def restart_game():
-    global player_score, opponent_score, paused, boss_mode
-    player_score, opponent_score = 0, 0
-    reset_ball()
+    global paused
+    sync_match_settings()
+    record_event(RESTART)
+    match.restart()
+    if TELEMETRY:
+        TELEMETRY.serve(match.frame)
     paused = False
     # Restart appropriate music
     play_music(boss_mode)
 
 
-# Game Logic
+# Game Logic (the rules themselves live on the Match in pong_engine.py)
 def handle_ball_movement():
     """
     Updates ball position and handles wall collisions with classic pong physics.
     """
-    global x_speed, y_speed, player_score, opponent_score
-
-    # Move the ball
-    ball.x += x_speed
-    ball.y += y_speed
-    
-    # Perfect elastic collisions with walls (no dampening)
-    if ball.top <= 0:
-        ball.top = 0
-        y_speed = abs(y_speed)  # Reverse direction with full energy
-    elif ball.bottom >= HEIGHT:
-        ball.bottom = HEIGHT
-        y_speed = -abs(y_speed)  # Reverse direction with full energy
-
-    # Scoring logic
-    if ball.left <= 0:
-        player_score += 1
-        pygame.mixer.Sound.play(point_sfx)
-        reset_ball('player')
-    elif ball.right >= WIDTH:
-        opponent_score += 1
-        pygame.mixer.Sound.play(point_sfx)
-        reset_ball('opponent')
-
-    # Check for paddle collisions
-    if ball.colliderect(player):
-        check_ball_paddle_collision(ball, player)
-    elif ball.colliderect(opponent):
-        check_ball_paddle_collision(ball, opponent)
+    if match.move_ball() is not None:
+        point_scored()
 
-def handle_paddle_movement():
-    global player_paddle_speed, opponent_paddle_speed
+def point_scored():
+    point_sfx.play()
+    if STEADY_GC:
+        STEADY_GC.collect()  # The ball is being served again: the one break in a match's action
 
+def handle_paddle_movement():
     keys = pygame.key.get_pressed()
-
-    # Player paddle movement
-    if keys[pygame.K_UP]:
-        player_paddle_speed = max(player_paddle_speed - PADDLE_ACCELERATION, -MAX_PADDLE_SPEED)  # Accelerate up
-    elif keys[pygame.K_DOWN]:
-        player_paddle_speed = min(player_paddle_speed + PADDLE_ACCELERATION, MAX_PADDLE_SPEED)  # Accelerate down
-    else:
-        # Decelerate when no key is pressed
-        if player_paddle_speed > 0:
-            player_paddle_speed = max(player_paddle_speed - PADDLE_ACCELERATION, 0)
-        elif player_paddle_speed < 0:
-            player_paddle_speed = min(player_paddle_speed + PADDLE_ACCELERATION, 0)
-
-    # Move player paddle
-    player.y += player_paddle_speed
-
-    # Prevent paddle from going out of bounds
-    if player.top < 0:
-        player.top = 0
-    if player.bottom > HEIGHT:
-        player.bottom = HEIGHT
-
-    # Opponent paddle movement (AI or similar logic)
-    if opponent_paddle_speed > 0:
-        opponent.y += opponent_paddle_speed
-
-    # Update opponent paddle movement logic (if it's AI, follow the ball, etc.)
-    if ball.centery > opponent.centery:
-        opponent_paddle_speed = min(opponent_paddle_speed + PADDLE_ACCELERATION, MAX_PADDLE_SPEED)  # Accelerate down
-    elif ball.centery < opponent.centery:
-        opponent_paddle_speed = max(opponent_paddle_speed - PADDLE_ACCELERATION, -MAX_PADDLE_SPEED)  # Accelerate up
-    else:
-        # Decelerate when not moving
-        if opponent_paddle_speed > 0:
-            opponent_paddle_speed = max(opponent_paddle_speed - PADDLE_ACCELERATION, 0)
-        elif opponent_paddle_speed < 0:
-            opponent_paddle_speed = min(opponent_paddle_speed + PADDLE_ACCELERATION, 0)
-
-    # Move opponent paddle
-    opponent.y += opponent_paddle_speed
-
-    # Prevent opponent paddle from going out of bounds
-    if opponent.top < 0:
-        opponent.top = 0
-    if opponent.bottom > HEIGHT:
-        opponent.bottom = HEIGHT
-
-def check_ball_paddle_collision(ball, paddle):
-    """
-    Handles ball-paddle collisions with realistic physics.
-    The return angle is calculated based on where the ball hits the paddle.
-    """
-    global x_speed, y_speed
-    
-    if ball.colliderect(paddle):
-        # Determine which side of the paddle was hit
-        if paddle == player:
-            ball.right = player.left
-        else:
-            ball.left = opponent.right
-            
-        # Calculate relative intersection point
-        relative_intersect_y = (paddle.centery - ball.centery) / (paddle.height / 2)
-        
-        # Normalize between -1 and 1
-        normalized_intersect = min(max(relative_intersect_y, -1.0), 1.0)
-        
-        # Maximum return angle (in radians)
-        max_bounce_angle = math.pi / 3  # 60 degrees
-        
-        # Calculate return angle
-        bounce_angle = normalized_intersect * max_bounce_angle
-        
-        # Calculate new velocity
-        speed = math.sqrt(x_speed * x_speed + y_speed * y_speed)
-        speed *= 1.03  # Increase speed slightly with each hit
-        
-        # Ensure the ball moves in the correct direction after collision
-        if paddle == player:
-            direction = -1
-        else:
-            direction = 1
-            
-        # Calculate new x and y speeds based on the bounce angle
-        x_speed = direction * abs(speed * math.cos(bounce_angle))
-        y_speed = speed * -math.sin(bounce_angle)
-        
-        # Ensure minimum vertical movement to prevent horizontal stalemates
-        min_y_speed = 2.0
-        if abs(y_speed) < min_y_speed:
-            y_speed = min_y_speed if y_speed > 0 else -min_y_speed
-            
-        # Add small random variation to prevent predictable patterns
-        y_speed += random.uniform(-0.5, 0.5)
-        
-        # Ensure speed doesn't exceed maximum
-        max_speed = 20
-        current_speed = math.sqrt(x_speed * x_speed + y_speed * y_speed)
-        if current_speed > max_speed:
-            speed_multiplier = max_speed / current_speed
-            x_speed *= speed_multiplier
-            y_speed *= speed_multiplier
+    if LATENCY:
+        LATENCY.sampled()
+    up, down = keys[pygame.K_UP], keys[pygame.K_DOWN]
+    if RECORDER:
+        RECORDER.record(up, down)
+    match.move_paddles(up, down)
 
 
 # -------------------- OPPONENT AI --------------------
 def move_opponent():
-    global opponent_paddle_speed
-
-    if boss_mode:
-        # Boss mode AI - Enhanced prediction and faster movement
-        prediction_factor = 0.95  # Higher prediction accuracy
-        max_speed = BOSS_PADDLE_SPEED
-        
-        # Predict where the ball will intersect with the opponent's y-position
-        if x_speed < 0:  # Ball is moving towards opponent
-            # Calculate time until ball reaches opponent's x position
-            time_to_intercept = (opponent.centerx - ball.centerx) / -x_speed
-            # Predict ball's y position at intercept
-            predicted_y = ball.centery + (y_speed * time_to_intercept * prediction_factor)
-            
-            # Account for bounces
-            while predicted_y < 0 or predicted_y > HEIGHT:
-                if predicted_y < 0:
-                    predicted_y = -predicted_y
-                if predicted_y > HEIGHT:
-                    predicted_y = 2 * HEIGHT - predicted_y
-        else:
-            # If ball is moving away, return to center with some randomization
-            predicted_y = HEIGHT / 2 + random.randint(-50, 50)
-
-        # Move towards the predicted position
-        if opponent.centery < predicted_y - 5:
-            opponent_paddle_speed = min(opponent_paddle_speed + PADDLE_ACCELERATION * 2, max_speed)
-        elif opponent.centery > predicted_y + 5:
-            opponent_paddle_speed = max(opponent_paddle_speed - PADDLE_ACCELERATION * 2, -max_speed)
-        else:
-            opponent_paddle_speed = 0
+    match.move_opponent()
+
+def physics_step():
+    """One fixed physics tick."""
+    if REPLAY:
+        # Inputs, serves and setting changes all come from the recording
+        if not REPLAY.finished and REPLAY.step() is not None:
+            point_scored()
+        if PROFILER:
+            PROFILER.mark(BALL)  # The whole replayed tick
+        return
+    if NET:
+        # Our input goes to the server and into the local prediction; the other paddle comes from the server
+        keys = pygame.key.get_pressed()
+        if LATENCY:
+            LATENCY.sampled()
+        if NET.step(keys[pygame.K_UP], keys[pygame.K_DOWN]) is not None:
+            point_scored()
+        if PROFILER:
+            PROFILER.mark(BALL)  # The whole predicted tick
+        return
+    match.save_previous()
+    handle_ball_movement()
+    if SWARM:
+        player_points, opponent_points = SWARM.step(match.player_y, match.opponent_y)
+        match.player_score += player_points
+        match.opponent_score += opponent_points
+    if PROFILER:
+        PROFILER.mark(BALL)
+    handle_paddle_movement()
+    if PROFILER:
+        PROFILER.mark(PADDLES)
+    move_opponent()
+    match.frame += 1
+    if PROFILER:
+        PROFILER.mark(OPPONENT)
+
+def toggle_profiler_overlay():
+    """F3: show or hide the profiler overlay. Profiling only runs while it is shown, unless --profile was given."""
+    global PROFILER
+    if PROFILER is None:
+        PROFILER = FrameProfiler()
+        PROFILER.overlay = True
+    elif PROFILER.overlay and not PROFILE_EXPORT:
+        PROFILER = None
     else:
-        # Simple AI for normal mode - directly follow the ball
-        speed = MAX_PADDLE_SPEED * ai_difficulty  # Use AI difficulty to scale the speed
-        
-        # Simple up/down movement based on ball position
-        if opponent.centery < ball.centery:
-            opponent.y += speed
-        elif opponent.centery > ball.centery:
-            opponent.y -= speed
-
-    # Keep paddle in bounds
-    if opponent.top < 0:
-        opponent.top = 0
-    if opponent.bottom > HEIGHT:
-        opponent.bottom = HEIGHT
+        PROFILER.overlay = not PROFILER.overlay
+
+def report_audio(always=False):
+    """At exit: suspected mixer underruns are worth knowing about even when nobody asked."""
+    if always or AUDIO.underruns:
+        print(AUDIO.report(), file=sys.stderr)
+
+def report_latency():
+    print(PACER.report() if PACER else "Pacing: %s" % ("%d fps cap" % MAX_FPS if MAX_FPS else "uncapped"), file=sys.stderr)
+    print(LATENCY.report(), file=sys.stderr)
+
+def report_quality():
+    print(GOVERNOR.report(), file=sys.stderr)
+
+def report_memory():
+    if STEADY_GC:
+        print(STEADY_GC.report(), file=sys.stderr)
+    if ALLOC_PROFILER:
+        print(ALLOC_PROFILER.report(), file=sys.stderr)
+        ALLOC_PROFILER.stop()  # Otherwise tracing runs on through interpreter shutdown
+
+def close_telemetry():
+    global TELEMETRY
+    if TELEMETRY:
+        TELEMETRY.close()
+        print(TELEMETRY.report(), file=sys.stderr)
+        match.listener = TELEMETRY = None
+
+def close_capture():
+    global CAPTURE
+    if CAPTURE:
+        CAPTURE.close()
+        print(CAPTURE.report(), file=sys.stderr)
+        CAPTURE = None
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pong!")
+    parser.add_argument("--startup-report", action="store_true", help="print startup phase timings")
+    parser.add_argument("--audio-report", action="store_true", help="print the mixer buffer size and suspected underruns at exit")
+    parser.add_argument("--record", metavar="FILE", help="record the match (seed and inputs) to FILE")
+    parser.add_argument("--replay", metavar="FILE", help="play back a recording made with --record")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="playback rate for --replay")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="play online on a pong_net.py server")
+    parser.add_argument("--room", type=int, default=0, help="room to join with --connect")
+    parser.add_argument("--net-latency", type=float, default=0, help="simulated one-way latency in ms (testing)")
+    parser.add_argument("--net-loss", type=float, default=0, help="simulated packet loss, 0-1 (testing)")
+    parser.add_argument("--profile", action="store_true", help="show the frame-time profiler overlay (F3 toggles it)")
+    parser.add_argument("--profile-out", metavar="FILE", help="write per-frame phase timings to FILE at exit (.csv or JSON lines)")
+    parser.add_argument("--chaos", type=int, default=0, metavar="N", help="chaos mode: N extra balls (needs NumPy)")
+    parser.add_argument("--display", choices=DISPLAY_BACKENDS, default=DISPLAY_BACKEND,
+                        help="window: draw straight to the window; scaled / renderer: scale the %dx%d game to the window"
+                        % (WIDTH, HEIGHT))
+    parser.add_argument("--window-size", type=parse_size, metavar="WxH", help="window size for --display scaled/renderer")
+    parser.add_argument("--fullscreen", action="store_true", help="fill the screen (scaled with --display scaled/renderer)")
+    parser.add_argument("--vsync", action="store_true", help="wait for the display's refresh (--display scaled/renderer)")
+    parser.add_argument("--fps", type=int, help="frame rate cap (default: uncapped, or %d with --low-latency)" % LOW_LATENCY_FPS)
+    parser.add_argument("--low-latency", action="store_true", help="sleep before reading the input instead of after presenting")
+    parser.add_argument("--latency-report", action="store_true", help="print input-to-photon latency at exit")
+    parser.add_argument("--adaptive-quality", action="store_true",
+                        help="lower the drawing quality while frames run over budget (%d fps unless --fps is given)" % QUALITY_FPS)
+    parser.add_argument("--quality-report", action="store_true", help="print the quality level changes at exit")
+    parser.add_argument("--steady-gc", action="store_true",
+                        help="freeze startup objects and hold garbage collection for points and menus")
+    parser.add_argument("--alloc-profile", action="store_true",
+                        help="trace per-frame allocations and print them with the top allocation sites at exit")
+    parser.add_argument("--capture", metavar="PATH",
+                        help="record the frames shown: a raw video file, or a directory of PNGs with --capture-format png"
+                             " (a --replay being captured quits when it ends)")
+    parser.add_argument("--capture-format", choices=CAPTURE_FORMATS, default="raw", help="format for --capture")
+    parser.add_argument("--capture-fps", type=int, default=60, help="frames per second of game time --capture keeps")
+    parser.add_argument("--telemetry", metavar="DB", help="store paddle hits and rallies in the SQLite database DB")
+    return parser.parse_args(argv)
 
 # -------------------- MAIN GAME LOOP --------------------
-show_start_menu()
-reset_ball()
-
-while True:
-    keys_pressed = pygame.key.get_pressed()
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_p:
-                paused = not paused
-                if paused:
-                    pygame.mixer.music.pause()
-                    show_pause_menu()
-                else:
-                    pygame.mixer.music.unpause()
-
-    if not paused:
-        handle_ball_movement()
-        handle_paddle_movement()
-        move_opponent()
-
-
-    draw_screen()
-    pygame.display.update()
-    CLOCK.tick(60)
+def main(argv=None):
+    global match, paused, RECORDER, REPLAY, NET, STARTUP_REPORT, PROFILER, PROFILE_EXPORT, MAX_FPS, PACER, LATENCY
+    global DISPLAY_BACKEND, WINDOW_SIZE, FULLSCREEN, VSYNC, SWARM, DIRTY_RECTS, TELEMETRY
+    global GOVERNOR, STEADY_GC, ALLOC_PROFILER, CAPTURE
+
+    args = parse_args(argv)
+    DISPLAY_BACKEND, WINDOW_SIZE, FULLSCREEN, VSYNC = args.display, args.window_size, args.fullscreen, args.vsync
+    STARTUP_REPORT = args.startup_report or bool(os.environ.get("PONG_STARTUP_REPORT"))
+    atexit.register(report_audio, args.audio_report)
+    if args.record:
+        if args.replay or args.connect:
+            sys.exit("--record only records matches played locally, not --replay or --connect")
+        RECORDER = Recorder(match, args.record)
+        atexit.register(RECORDER.save)
+    if args.chaos:
+        if args.record or args.replay or args.connect:
+            sys.exit("--chaos can't be combined with --record, --replay or --connect")
+        from pong_multiball import BallSwarm
+        SWARM = BallSwarm(args.chaos, ball_speed=match.ball_speed)
+        SWARM.spawn(args.chaos)
+        DIRTY_RECTS = False  # With this many balls moving, repainting everything is cheaper than tracking them
+    if args.replay:
+        REPLAY = Replay(Recording.load(args.replay))
+        match = REPLAY.match
+    if args.telemetry:
+        if args.replay or args.connect:
+            sys.exit("--telemetry only records matches played locally, not --replay or --connect")
+        try:
+            TELEMETRY = Telemetry(args.telemetry).start()
+        except sqlite3.Error as error:
+            sys.exit("can't open the telemetry database %s: %s" % (args.telemetry, error))
+        match.listener = TELEMETRY
+        atexit.register(close_telemetry)
+    if args.profile or args.profile_out:
+        PROFILER = FrameProfiler()
+        PROFILER.overlay = args.profile
+        PROFILE_EXPORT = args.profile_out
+        if PROFILE_EXPORT:
+            atexit.register(PROFILER.export, PROFILE_EXPORT)
+    if args.fps:
+        MAX_FPS = args.fps
+    if args.latency_report and not REPLAY:
+        LATENCY = LatencyMonitor((pygame.K_UP, pygame.K_DOWN))
+        atexit.register(report_latency)
+    if args.low_latency:
+        PACER = FramePacer(MAX_FPS or LOW_LATENCY_FPS, late=True, monitor=LATENCY)
+    elif LATENCY and MAX_FPS:
+        PACER = FramePacer(MAX_FPS, late=False, monitor=LATENCY)  # Paced like CLOCK.tick, but noting key arrivals
+    if args.adaptive_quality:
+        GOVERNOR = QualityGovernor(MAX_FPS or QUALITY_FPS)
+        if args.quality_report:
+            atexit.register(report_quality)
+    if args.steady_gc:
+        STEADY_GC = SteadyGC()
+    if args.alloc_profile:
+        ALLOC_PROFILER = AllocationProfiler()
+    if STEADY_GC or ALLOC_PROFILER:
+        atexit.register(report_memory)
+
+    init_game()
+    if args.capture:
+        try:
+            CAPTURE = FrameCapture(args.capture, SCREEN, args.capture_format, args.capture_fps)
+        except (OSError, ValueError) as error:
+            sys.exit("can't capture to %s: %s" % (args.capture, error))
+        atexit.register(close_capture)
+    if args.connect:
+        try:
+            NET = NetClient(parse_address(args.connect), args.room, args.net_latency / 1000, loss=args.net_loss)
+            NET.connect()
+        except (OSError, ValueError) as error:  # Bad address, no answer or a full room (ConnectionError)
+            sys.exit("can't connect to %s: %s" % (args.connect, error))
+        atexit.register(NET.close)
+        match = NET.match
+        play_music(match.boss_mode)
+    elif REPLAY:
+        play_music(match.boss_mode)
+    else:
+        show_start_menu()
+        reset_ball()
+    RENDERER.invalidate()
+    if STEADY_GC:
+        STEADY_GC.freeze()  # Everything from startup and the start menu stays for the whole session
+
+    # Physics runs at PHYSICS_HZ no matter how fast frames are drawn; the accumulator
+    # carries the time not yet simulated and the leftover fraction is used to
+    # interpolate what gets drawn between the last two physics states.
+    accumulator = 0.0
+    time_scale = args.replay_speed if REPLAY else 1.0  # Replays can run faster or slower than real time
+    catch_up_steps = MAX_CATCH_UP_STEPS * max(1, int(time_scale))
+    # Frame timings start here, not from before init_game and the start menu
+    if PROFILER:
+        PROFILER.discard_frame()
+    if ALLOC_PROFILER:
+        ALLOC_PROFILER.start()
+    if PACER:
+        PACER.restart()
+    previous_time = PACER.frame_time() if PACER else time.perf_counter()
+    woke = time.perf_counter()  # Start of the frame's work, for the quality governor
+
+    while True:
+        now = PACER.frame_time() if PACER else time.perf_counter()
+        accumulator += (now - previous_time) * time_scale
+        previous_time = now
+
+        events = pygame.event.get()
+        if LATENCY:
+            LATENCY.events(events)
+        for event in events:
+            if event.type == pygame.QUIT:
+                quit_game()
+            if event.type == pygame.KEYDOWN:
+                if event.key == PROFILE_KEY:
+                    toggle_profiler_overlay()
+                elif NET:
+                    pass  # The match runs on the server: no pausing or settings
+                elif REPLAY:
+                    # Replay controls: P pauses, the arrow keys seek five seconds
+                    if event.key == pygame.K_p:
+                        paused = not paused
+                    elif event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                        seconds = 5 if event.key == pygame.K_RIGHT else -5
+                        REPLAY.seek(REPLAY.frame + seconds * PHYSICS_HZ)
+                        RENDERER.invalidate()
+                elif event.key == pygame.K_p:
+                    paused = not paused
+                    if paused:
+                        AUDIO.pause_music()
+                        show_pause_menu()
+                        sync_match_settings()
+                        record_event(SETTINGS)
+                        if RECORDER:
+                            RECORDER.note_pause()
+                        RENDERER.invalidate()  # The menu drew over the whole screen
+                        if STEADY_GC:
+                            STEADY_GC.collect()  # Between the menu and play, before the clock restarts
+                        previous_time = time.perf_counter()  # Time spent in the menu is not simulated
+                        if PROFILER:
+                            PROFILER.discard_frame()
+                        if ALLOC_PROFILER:
+                            ALLOC_PROFILER.discard_frame()
+                        if PACER:
+                            PACER.restart()
+                        woke = time.perf_counter()
+                    else:
+                        AUDIO.unpause_music()
+
+        AUDIO.update()  # Underrun check
+        if NET:
+            NET.poll()  # Snapshots from the server; the prediction is corrected before this frame's ticks
+        if PROFILER:
+            PROFILER.mark(EVENTS)
+
+        if paused:
+            accumulator = 0.0
+        else:
+            steps = 0
+            while accumulator >= PHYSICS_DT and steps < catch_up_steps:
+                physics_step()
+                accumulator -= PHYSICS_DT
+                steps += 1
+            if accumulator >= PHYSICS_DT:
+                # Too far behind (window dragged, debugger, slow machine): drop the backlog instead of spiralling
+                accumulator %= PHYSICS_DT
+
+        drawing = GOVERNOR is None or GOVERNOR.draw_frame()
+        if drawing:
+            draw_screen(accumulator / PHYSICS_DT)
+        if PROFILER:
+            PROFILER.mark(DRAW)
+        if GOVERNOR:
+            GOVERNOR.frame(time.perf_counter() - woke)  # Update and draw only: presenting can wait for vsync
+        if PACER:
+            PACER.presenting()
+        if drawing:
+            present_frame()
+            if STARTUP.mark_first_frame() and STARTUP_REPORT:  # --replay and --connect skip the start menu
+                print(STARTUP.report())
+            if LATENCY:
+                LATENCY.presented()
+            if CAPTURE:
+                CAPTURE.capture(SCREEN, match.frame / PHYSICS_HZ)  # Game time: pauses and menus aren't recorded
+        if PROFILER:
+            PROFILER.mark(PRESENT)
+        if PACER:
+            PACER.sleep()
+        else:
+            CLOCK.tick(MAX_FPS)
+        woke = time.perf_counter()
+        if STEADY_GC:
+            STEADY_GC.check()
+        if ALLOC_PROFILER:
+            ALLOC_PROFILER.end_frame()
+        if CAPTURE and REPLAY and REPLAY.finished:
+            quit_game()
+        if PROFILER:
+            PROFILER.mark(SLEEP)
+            PROFILER.end_frame()
+
+
+if __name__ == "__main__":
+    main()
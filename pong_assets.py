@@ -0,0 +1,117 @@
+import pygame, os, json, time, threading
+
+# Startup helpers: phase timing, a cached font lookup and sounds that load on a
+# background thread while the start menu is already on screen.
+
+FONT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pong", "fonts.json")
+
+
+class StartupTimer:
+    """Records how long each startup phase took, for the time-to-first-frame report."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.phases = []  # (name, seconds) in order
+        self.first_frame = None
+
+    def mark(self, name):
+        """End the current phase and name it."""
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def mark_first_frame(self):
+        """Call after every present; only the first call counts."""
+        if self.first_frame is None:
+            self.mark("first frame")
+            self.first_frame = self.last - self.start
+            return True
+        return False
+
+    def report(self):
+        lines = ["Startup timing:"]
+        for name, seconds in self.phases:
+            lines.append("  %-22s %8.1f ms" % (name, seconds * 1000))
+        total = (self.first_frame if self.first_frame is not None else self.last - self.start)
+        lines.append("  %-22s %8.1f ms" % ("time to first frame", total * 1000))
+        return "\n".join(lines)
+
+
+# -------------------- Fonts --------------------
+def find_font(name):
+    """
+    Path of a system font, like pygame.font.SysFont would find it. The lookup makes
+    pygame scan every installed font, so the answer is cached on disk and reused
+    for as long as the file still exists. Returns None when the font isn't installed
+    (pygame.font.Font(None, size) then gives the default font, as SysFont does).
+    """
+    cache = {}
+    try:
+        with open(FONT_CACHE_PATH) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    key = name.lower()
+    if key in cache and (cache[key] is None or os.path.exists(cache[key])):
+        return cache[key]
+
+    path = pygame.font.match_font(name)
+    cache[key] = path
+    try:
+        os.makedirs(os.path.dirname(FONT_CACHE_PATH), exist_ok=True)
+        with open(FONT_CACHE_PATH, "w") as f:
+            json.dump(cache, f)
+    except OSError:
+        pass  # Read-only home directory: we just scan again next time
+    return path
+
+
+# -------------------- Sounds --------------------
+class BackgroundLoader:
+    """
+    Decodes sound files on a worker thread. The mixer must already be initialized:
+    SDL's audio device is opened on the main thread, only the decoding runs here.
+    """
+
+    def __init__(self):
+        self._loaded = threading.Condition()  # Notified as each sound lands in self.sounds, and when done
+        self._done = False
+        self._error = None
+        self.sounds = {}
+
+    def start(self, paths):
+        def load():
+            try:
+                for path in paths:
+                    sound = pygame.mixer.Sound(path)
+                    with self._loaded:
+                        self.sounds[path] = sound
+                        self._loaded.notify_all()
+            except Exception as error:
+                self._error = error
+            finally:
+                with self._loaded:
+                    self._done = True
+                    self._loaded.notify_all()
+
+        threading.Thread(target=load, name="pong-audio-loader", daemon=True).start()
+
+    @property
+    def ready(self):
+        return self._done
+
+    def wait(self, path=None):
+        """
+        Block until path has loaded, or everything without one, and return its Sound
+        (None if it was never queued). Re-raises anything that went wrong on the worker.
+        """
+        with self._loaded:
+            self._loaded.wait_for(lambda: self._done or path in self.sounds)
+        if path in self.sounds:
+            return self.sounds[path]
+        if self._error is not None:
+            raise self._error
+        return None
+
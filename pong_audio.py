@@ -0,0 +1,167 @@
+import pygame, time
+from pong_assets import BackgroundLoader
+
+# Game audio. The mixer runs with a small buffer so sound effects play within
+# a few milliseconds of the event, the music tracks are decoded into memory up
+# front so switching them is a crossfade between two channels rather than a
+# stop/unload/load/play from disk, and the sound effects get channels of their
+# own so they never wait for (or cut off) the music.
+
+FREQUENCY = 44100
+BUFFER = 256  # Samples per mixer callback, about 6 ms at 44.1 kHz
+CROSSFADE_MS = 600
+
+# Reserved channels: two for the music (the outgoing and incoming tracks of a crossfade),
+# SFX_CHANNELS for sound effects and one that plays silence as the underrun check's clock.
+MUSIC_CHANNELS = (0, 1)
+SFX_CHANNELS = (2, 3)
+CLOCK_CHANNEL = 4
+TOTAL_CHANNELS = 8  # Anything above the reserved ones is left for pygame.mixer.find_channel
+
+# Underrun check, a heuristic: SDL doesn't report underruns, so the clock channel plays
+# back-to-back segments of silence and the count is inferred from its progress. If the
+# mixer is keeping up they finish at real-time pace; when they fall behind the wall
+# clock by more than a segment plus UNDERRUN_SLACK, the device has probably missed its
+# deadlines. A frame loop that stalls at the wrong moment can be counted too.
+CLOCK_SEGMENT = 0.1
+UNDERRUN_SLACK = 0.05
+
+
+class SoundEffect:
+    """A sound effect played on the reserved SFX channels. Playing it before it has loaded is a no-op."""
+
+    def __init__(self, audio, path):
+        self.audio = audio
+        self.path = path
+
+    def play(self):
+        return self.audio.play_sfx(self.path)
+
+
+class AudioManager:
+    """Mixer setup, preloaded music with crossfades, reserved SFX channels and an underrun estimate."""
+
+    def __init__(self, crossfade_ms=CROSSFADE_MS):
+        self.crossfade_ms = crossfade_ms
+        self.loader = BackgroundLoader()
+        self.current_music = None
+        self.underruns = 0
+        self._channels = None  # Set up on the main thread once the mixer is ready
+        self._music = 0  # Index into MUSIC_CHANNELS of the channel playing current_music
+        self._music_started = [0.0, 0.0]  # When each music channel last started (fading in)
+        self._next_sfx = 0
+        self._silence = None
+        self._clock_start = self._last_update = 0.0
+        self._segments = 0
+
+    # -------------------- Setup --------------------
+    @staticmethod
+    def init_mixer():
+        """Open the mixer with the low-latency settings. Call it on the main thread, before start()."""
+        pygame.mixer.pre_init(FREQUENCY, -16, 2, BUFFER)
+        pygame.mixer.init()
+
+    def start(self, sfx_paths, music_paths):
+        """Decode every sound on a background thread, sound effects first."""
+        self.loader.start(list(sfx_paths) + list(music_paths))
+
+    @property
+    def ready(self):
+        return self.loader.ready
+
+    @property
+    def sounds(self):
+        return self.loader.sounds
+
+    def wait(self, path=None):
+        """Block until path (without one, everything) has loaded and return it (re-raises loading errors)."""
+        sound = self.loader.wait(path)
+        self._setup_channels()
+        return sound
+
+    def _setup_channels(self):
+        if self._channels is None:
+            pygame.mixer.set_num_channels(TOTAL_CHANNELS)
+            pygame.mixer.set_reserved(CLOCK_CHANNEL + 1)
+            self._channels = [pygame.mixer.Channel(i) for i in range(CLOCK_CHANNEL + 1)]
+            frequency, size, channels = pygame.mixer.get_init()
+            self._silence = pygame.mixer.Sound(buffer=bytes(int(frequency * CLOCK_SEGMENT) * abs(size) // 8 * channels))
+        return self._channels
+
+    def sound_effect(self, path):
+        return SoundEffect(self, path)
+
+    # -------------------- Playback --------------------
+    def play_music(self, path):
+        """Crossfade to a track (no-op if it is already playing). Only waits if that track hasn't finished loading."""
+        if path == self.current_music:
+            return
+        sound = self.wait(path)
+        if sound is None:
+            return  # Never queued for loading
+        now = time.perf_counter()
+        incoming, outgoing = 1 - self._music, self._music
+        self._channels[MUSIC_CHANNELS[incoming]].play(sound, loops=-1, fade_ms=self.crossfade_ms)
+        self._music_started[incoming] = now
+        outgoing_channel = self._channels[MUSIC_CHANNELS[outgoing]]
+        if now - self._music_started[outgoing] < self.crossfade_ms / 1000:
+            # SDL_mixer ignores a fade-out while the channel is still fading in; it is still quiet, so just stop it
+            outgoing_channel.stop()
+        elif outgoing_channel.get_busy():
+            outgoing_channel.fadeout(self.crossfade_ms)
+        self._music = incoming
+        self.current_music = path
+
+    def pause_music(self):
+        if self._channels is not None:
+            for i in MUSIC_CHANNELS:
+                self._channels[i].pause()
+
+    def unpause_music(self):
+        if self._channels is not None:
+            for i in MUSIC_CHANNELS:
+                self._channels[i].unpause()
+
+    def play_sfx(self, path):
+        """Play a sound effect on a free SFX channel, or on the one used longest ago if both are busy."""
+        sound = self.sounds.get(path)
+        if sound is None:
+            return None  # Still loading (the mixer is up once any sound has loaded)
+        channels = self._setup_channels()
+        for i in SFX_CHANNELS:
+            if not channels[i].get_busy():
+                channel = channels[i]
+                break
+        else:
+            channel = channels[SFX_CHANNELS[self._next_sfx]]
+            self._next_sfx = (self._next_sfx + 1) % len(SFX_CHANNELS)
+        channel.play(sound)
+        return channel
+
+    # -------------------- Underruns --------------------
+    def update(self):
+        """Call once per frame: keeps the clock channel fed and counts the underruns it suggests."""
+        if self._channels is None:
+            if not self.ready:
+                return
+            self._setup_channels()
+        now = time.perf_counter()
+        clock = self._channels[CLOCK_CHANNEL]
+        if now - self._last_update > CLOCK_SEGMENT or not clock.get_busy():
+            # First call, or not called for a while (a menu was up): restart the clock
+            clock.play(self._silence)
+            clock.queue(self._silence)
+            self._clock_start, self._segments = now, 0
+        elif clock.get_queue() is None:
+            # A segment just finished; keep one queued behind the one playing
+            self._segments += 1
+            clock.queue(self._silence)
+            lag = (now - self._clock_start) - self._segments * CLOCK_SEGMENT
+            if lag > CLOCK_SEGMENT + UNDERRUN_SLACK:
+                self.underruns += 1
+                self._clock_start, self._segments = now, 0
+        self._last_update = now
+
+    def report(self):
+        frequency, _, _ = pygame.mixer.get_init() or (FREQUENCY, 0, 0)
+        return "Audio: %d-sample buffer (%.1f ms), %d suspected underruns" % (BUFFER, 1000 * BUFFER / frequency, self.underruns)
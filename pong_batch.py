@@ -0,0 +1,392 @@
+import random, sys, time, argparse
+import numpy as np
+
+from pong_engine import (Match, autopilot, WIDTH, HEIGHT, PADDLE_WIDTH, PADDLE_HEIGHT, PLAYER_X, OPPONENT_X,
+                         PADDLE_START_Y, PADDLE_ACCELERATION, MAX_PADDLE_SPEED, BOSS_PADDLE_SPEED,
+                         BALL_SIZE, MAX_BALL_SPEED, MIN_Y_SPEED, BOUNCE_SPEED_UP, MAX_BOUNCE_ANGLE,
+                         BOSS_SPEED_FACTOR, BOSS_PREDICTION_FACTOR, CounterRNG, GOLDEN_GAMMA)
+
+# Batched version of pong_engine.Match: N matches stored as structure-of-arrays
+# and stepped together with NumPy. The rules are the same as Match; every
+# random draw comes from a per-match counter-based RNG so a single Match
+# driven by CounterRNG(seed) replays row `i` of a batch seeded the same way
+# (CounterRNG lives in pong_engine.py so the game can use it without NumPy).
+#     python pong_batch.py [N]       throughput of N matches stepped together
+#     python pong_batch.py --check   batch vs scalar parity; exits 1 if any state differs at all
+
+
+# -------------------- Counter-based RNG --------------------
+def _splitmix64_array(z):
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+# -------------------- Batched match --------------------
+class BatchMatch:
+    """N independent Pong matches stepped together; each attribute of Match becomes an array of length N."""
+
+    def __init__(self, n, seed=None, ball_speed=14, boss_mode=False, ai_difficulty=0.2):
+        self.n = n
+
+        # One RNG stream per match: either explicit seeds or seed, seed + 1, ...
+        if seed is None:
+            seed = random.getrandbits(63)
+        if np.ndim(seed) == 0:
+            self.seeds = (np.arange(n, dtype=np.uint64) + np.uint64(seed))
+        else:
+            self.seeds = np.asarray(seed, dtype=np.uint64).copy()
+        self.rng_counter = np.zeros(n, dtype=np.uint64)
+
+        # Per-match settings (scalars are broadcast)
+        self.ball_speed = np.broadcast_to(np.asarray(ball_speed, dtype=np.float64), (n,)).copy()
+        self.boss_mode = np.broadcast_to(np.asarray(boss_mode, dtype=bool), (n,)).copy()
+        self.ai_difficulty = np.broadcast_to(np.asarray(ai_difficulty, dtype=np.float64), (n,)).copy()
+
+        # Ball
+        self.ball_x = np.full(n, WIDTH / 2 - 10, dtype=np.float64)
+        self.ball_y = np.full(n, HEIGHT / 2 - 10, dtype=np.float64)
+        self.x_speed = np.full(n, 20.0)
+        self.y_speed = np.full(n, 20.0)
+
+        # Paddles
+        self.player_y = np.full(n, PADDLE_START_Y, dtype=np.float64)
+        self.opponent_y = np.full(n, PADDLE_START_Y, dtype=np.float64)
+        self.player_paddle_speed = np.zeros(n)
+        self.opponent_paddle_speed = np.zeros(n)
+
+        self.player_score = np.zeros(n, dtype=np.int64)
+        self.opponent_score = np.zeros(n, dtype=np.int64)
+        self.frame = 0
+
+        # Cached Match.predicted_intercept per match, valid until the next wall/paddle event or serve
+        self.intercept = np.zeros(n)
+        self.intercept_valid = np.zeros(n, dtype=bool)
+
+        self.reset_ball(np.ones(n, dtype=bool), 'player')
+
+    # -------------------- RNG --------------------
+    def _random(self, mask):
+        """One uniform [0, 1) draw for every match selected by mask, advancing only those streams."""
+        self.rng_counter[mask] += np.uint64(1)
+        z = self.seeds[mask] + self.rng_counter[mask] * np.uint64(GOLDEN_GAMMA)
+        return (_splitmix64_array(z) >> np.uint64(11)) * (1.0 / (1 << 53))
+
+    # -------------------- Geometry helpers --------------------
+    def ball_hits_paddle(self, side):
+        paddle_x = PLAYER_X if side == 'player' else OPPONENT_X
+        paddle_y = self.player_y if side == 'player' else self.opponent_y
+        return ((self.ball_x < paddle_x + PADDLE_WIDTH) & (paddle_x < self.ball_x + BALL_SIZE) &
+                (self.ball_y < paddle_y + PADDLE_HEIGHT) & (paddle_y < self.ball_y + BALL_SIZE))
+
+    def predicted_intercept(self, mask):
+        """Vectorized Match.predicted_intercept for the matches selected by mask (other rows are stale)."""
+        stale = mask & ~self.intercept_valid
+        if stale.any():
+            self.intercept[stale] = predict_intercept(self.ball_x[stale] + BALL_SIZE / 2, self.ball_y[stale] + BALL_SIZE / 2,
+                                                      self.x_speed[stale], self.y_speed[stale])
+            self.intercept_valid[stale] = True
+        return self.intercept
+
+    def autopilot(self):
+        """Vectorized pong_engine.autopilot: (up, down) arrays for the player paddles."""
+        paddle_centery = self.player_y + PADDLE_HEIGHT / 2
+        ball_centery = self.ball_y + BALL_SIZE / 2
+        return ball_centery < paddle_centery - 10, ball_centery > paddle_centery + 10
+
+    # -------------------- Match control --------------------
+    def reset_ball(self, mask, starting_player='player'):
+        """Serve again in every match selected by mask."""
+        if not mask.any():
+            return
+        if starting_player == 'player':
+            self.ball_x[mask] = PLAYER_X + PADDLE_WIDTH / 2 - BALL_SIZE - BALL_SIZE / 2
+            self.ball_y[mask] = self.player_y[mask] + PADDLE_HEIGHT / 2 - BALL_SIZE / 2
+        else:
+            self.ball_x[mask] = OPPONENT_X + PADDLE_WIDTH / 2 + BALL_SIZE - BALL_SIZE / 2
+            self.ball_y[mask] = self.opponent_y[mask] + PADDLE_HEIGHT / 2 - BALL_SIZE / 2
+
+        boss = self.boss_mode[mask]
+        base_speed = np.where(boss, self.ball_speed[mask] * BOSS_SPEED_FACTOR, self.ball_speed[mask])
+        self.x_speed[mask] = -np.abs(base_speed) if starting_player == 'player' else np.abs(base_speed)
+
+        # Boss mode: uniform(-0.8 * base, 0.8 * base); normal: choice([base / 2, -base / 2])
+        u = self._random(mask)
+        low, high = -base_speed * 0.8, base_speed * 0.8
+        boss_y = low + (high - low) * u
+        normal_y = np.where(u < 0.5, base_speed / 2, -base_speed / 2)
+        self.y_speed[mask] = np.where(boss, boss_y, normal_y)
+        self.intercept_valid[mask] = False
+
+    def step(self, up=None, down=None):
+        """
+        Advance every match by one frame. up/down are boolean arrays (the autopilot is used when omitted).
+        Returns boolean arrays (player_scored, opponent_scored).
+        """
+        if up is None or down is None:
+            up, down = self.autopilot()
+        scored = self.move_ball()
+        self.move_paddles(up, down)
+        self.move_opponent()
+        self.frame += 1
+        return scored
+
+    def run(self, frames):
+        """Step every match `frames` times with the autopilot on the player's side."""
+        for _ in range(frames):
+            self.step()
+
+    # -------------------- Game Logic --------------------
+    def move_ball(self):
+        # Swept paddle collisions (see Match.move_ball)
+        remaining = np.ones(self.n)
+        for _ in range(2):
+            toward_player = self.x_speed > 0
+            time_of_impact = self.time_of_impact(toward_player, remaining)
+            hit = ~np.isnan(time_of_impact)
+            if not hit.any():
+                break
+            time_of_impact = np.where(hit, time_of_impact, 0.0)
+            self.ball_x += self.x_speed * time_of_impact
+            self.ball_y += self.y_speed * time_of_impact
+            self.bounce_off_paddle(hit & toward_player, 'player')
+            self.bounce_off_paddle(hit & ~toward_player, 'opponent')
+            remaining -= time_of_impact
+        self.ball_x += self.x_speed * remaining
+        self.ball_y += self.y_speed * remaining
+
+        # Walls
+        top = self.ball_y <= 0
+        self.ball_y[top] = 0
+        self.y_speed[top] = np.abs(self.y_speed[top])
+        bottom = ~top & (self.ball_y + BALL_SIZE >= HEIGHT)
+        self.ball_y[bottom] = HEIGHT - BALL_SIZE
+        self.y_speed[bottom] = -np.abs(self.y_speed[bottom])
+        self.intercept_valid[top | bottom] = False
+
+        # Scoring
+        player_scored = self.ball_x <= 0
+        opponent_scored = ~player_scored & (self.ball_x + BALL_SIZE >= WIDTH)
+        self.player_score += player_scored
+        self.opponent_score += opponent_scored
+        self.reset_ball(player_scored, 'player')
+        self.reset_ball(opponent_scored, 'opponent')
+
+        # Paddles the sweep couldn't see
+        hit_player = self.ball_hits_paddle('player')
+        hit_opponent = ~hit_player & self.ball_hits_paddle('opponent')
+        self.bounce_off_paddle(hit_player, 'player')
+        self.bounce_off_paddle(hit_opponent, 'opponent')
+
+        return player_scored, opponent_scored
+
+    def time_of_impact(self, toward_player, duration):
+        """Vectorized Match.time_of_impact against the paddle each ball moves towards; NaN where there is no hit."""
+        paddle_y = np.where(toward_player, self.player_y, self.opponent_y)
+        return paddle_time_of_impact(self.ball_x, self.ball_y, self.x_speed, self.y_speed, toward_player, paddle_y,
+                                     duration)
+
+    def bounce_off_paddle(self, mask, side):
+        """Angle-based bounce for every match selected by mask (see Match.bounce_off_paddle)."""
+        if not mask.any():
+            return
+        if side == 'player':
+            self.ball_x[mask] = PLAYER_X - BALL_SIZE
+            paddle_y = self.player_y[mask]
+        else:
+            self.ball_x[mask] = OPPONENT_X + PADDLE_WIDTH
+            paddle_y = self.opponent_y[mask]
+
+        self.x_speed[mask], self.y_speed[mask] = paddle_bounce(self.ball_y[mask], self.x_speed[mask], self.y_speed[mask],
+                                                              paddle_y, side, self._random(mask))
+        self.intercept_valid[mask] = False
+
+    def move_paddles(self, up, down):
+        # Player paddles: accelerate from input, otherwise decelerate towards zero
+        speed = self.player_paddle_speed
+        decelerated = np.where(speed > 0, np.maximum(speed - PADDLE_ACCELERATION, 0),
+                               np.minimum(speed + PADDLE_ACCELERATION, 0))
+        speed = np.where(up, np.maximum(speed - PADDLE_ACCELERATION, -MAX_PADDLE_SPEED),
+                         np.where(down, np.minimum(speed + PADDLE_ACCELERATION, MAX_PADDLE_SPEED), decelerated))
+        self.player_paddle_speed = speed
+        self.player_y = np.clip(self.player_y + speed, 0, HEIGHT - PADDLE_HEIGHT)
+
+        # Opponent paddles: apply downward speed, then accelerate towards the ball
+        speed = self.opponent_paddle_speed
+        self.opponent_y = np.where(speed > 0, self.opponent_y + speed, self.opponent_y)
+        ball_centery = self.ball_y + BALL_SIZE / 2
+        opponent_centery = self.opponent_y + PADDLE_HEIGHT / 2
+        decelerated = np.where(speed > 0, np.maximum(speed - PADDLE_ACCELERATION, 0),
+                               np.minimum(speed + PADDLE_ACCELERATION, 0))
+        speed = np.where(ball_centery > opponent_centery, np.minimum(speed + PADDLE_ACCELERATION, MAX_PADDLE_SPEED),
+                         np.where(ball_centery < opponent_centery,
+                                  np.maximum(speed - PADDLE_ACCELERATION, -MAX_PADDLE_SPEED), decelerated))
+        self.opponent_paddle_speed = speed
+        self.opponent_y = np.clip(self.opponent_y + speed, 0, HEIGHT - PADDLE_HEIGHT)
+
+    def move_opponent(self):
+        opponent_centery = self.opponent_y + PADDLE_HEIGHT / 2
+        ball_centery = self.ball_y + BALL_SIZE / 2
+        boss = self.boss_mode
+
+        # Boss AI: predict the intercept while the ball approaches, otherwise drift around the center
+        approaching = boss & (self.x_speed < 0)
+        predicted_y = np.zeros(self.n)
+        if approaching.any():
+            intercept = self.predicted_intercept(approaching)
+            predicted_y[approaching] = fold_into_field(
+                ball_centery[approaching] - (intercept[approaching] - ball_centery[approaching]) * BOSS_PREDICTION_FACTOR)
+
+        retreating = boss & ~approaching
+        if retreating.any():
+            predicted_y[retreating] = HEIGHT / 2 + (-50 + (self._random(retreating) * 101).astype(np.int64))
+
+        speed = self.opponent_paddle_speed
+        boss_speed = np.where(opponent_centery < predicted_y - 5,
+                              np.minimum(speed + PADDLE_ACCELERATION * 2, BOSS_PADDLE_SPEED),
+                              np.where(opponent_centery > predicted_y + 5,
+                                       np.maximum(speed - PADDLE_ACCELERATION * 2, -BOSS_PADDLE_SPEED), 0.0))
+        self.opponent_paddle_speed = np.where(boss, boss_speed, speed)
+
+        # Normal AI: follow the ball at a difficulty-scaled speed
+        follow = MAX_PADDLE_SPEED * self.ai_difficulty
+        step = np.where(opponent_centery < ball_centery, follow, np.where(opponent_centery > ball_centery, -follow, 0.0))
+        self.opponent_y = np.clip(np.where(boss, self.opponent_y, self.opponent_y + step), 0, HEIGHT - PADDLE_HEIGHT)
+
+    # -------------------- Scalar access --------------------
+    def match(self, i):
+        """A scalar Match with the same settings and RNG stream as row i (used by the parity check)."""
+        rng = CounterRNG(int(self.seeds[i]))
+        return Match(ball_speed=float(self.ball_speed[i]), boss_mode=bool(self.boss_mode[i]),
+                     ai_difficulty=float(self.ai_difficulty[i]), rng=rng)
+
+
+# -------------------- Vectorized rules --------------------
+# Shared with pong_multiball.py, whose balls all play against the same two paddles
+def paddle_time_of_impact(ball_x, ball_y, x_speed, y_speed, toward_player, paddle_y, duration):
+    """
+    Vectorized Match.time_of_impact: when each ball first touches the paddle it moves towards
+    (the player's where toward_player), as a fraction of a step; NaN where it doesn't within duration.
+    """
+    paddle_x = np.where(toward_player, PLAYER_X, OPPONENT_X)
+    x_entry, x_exit = sweep_interval(ball_x, BALL_SIZE, x_speed, paddle_x, PADDLE_WIDTH)
+    y_entry, y_exit = sweep_interval(ball_y, BALL_SIZE, y_speed, paddle_y, PADDLE_HEIGHT)
+    entry = np.maximum(x_entry, y_entry)
+    hit = (entry < np.minimum(x_exit, y_exit)) & (entry >= 0) & (entry <= duration)
+    return np.where(hit, entry, np.nan)
+
+
+def paddle_bounce(ball_y, x_speed, y_speed, paddle_y, side, u):
+    """
+    Vectorized Match.bounce_off_paddle: the (x_speed, y_speed) balls leave side's paddle with.
+    u holds one uniform [0, 1) draw per ball for the random variation.
+    """
+    ball_centery = ball_y + BALL_SIZE / 2
+    relative_intersect_y = (paddle_y + PADDLE_HEIGHT / 2 - ball_centery) / (PADDLE_HEIGHT / 2)
+    bounce_angle = np.clip(relative_intersect_y, -1.0, 1.0) * MAX_BOUNCE_ANGLE
+
+    speed = np.sqrt(x_speed * x_speed + y_speed * y_speed) * BOUNCE_SPEED_UP
+
+    direction = -1 if side == 'player' else 1
+    x_speed = direction * np.abs(speed * np.cos(bounce_angle))
+    y_speed = speed * -np.sin(bounce_angle)
+
+    small = np.abs(y_speed) < MIN_Y_SPEED
+    y_speed = np.where(small, np.where(y_speed > 0, MIN_Y_SPEED, -MIN_Y_SPEED), y_speed)
+
+    y_speed += -0.5 + 1.0 * u
+
+    current_speed = np.sqrt(x_speed * x_speed + y_speed * y_speed)
+    speed_multiplier = np.where(current_speed > MAX_BALL_SPEED, MAX_BALL_SPEED / current_speed, 1.0)
+    return x_speed * speed_multiplier, y_speed * speed_multiplier
+
+
+def predict_intercept(ball_centerx, ball_centery, x_speed, y_speed):
+    """Vectorized pong_engine.predict_intercept."""
+    target_x = np.where(x_speed > 0, PLAYER_X, OPPONENT_X) + PADDLE_WIDTH / 2
+    return ball_centery + y_speed * ((target_x - ball_centerx) / x_speed)
+
+
+def fold_into_field(y, height=HEIGHT):
+    """Vectorized pong_engine.fold_into_field."""
+    y = np.mod(y, 2 * height)
+    return np.where(y > height, 2 * height - y, y)
+
+
+def sweep_interval(position, size, velocity, target, target_size):
+    """Vectorized pong_engine.sweep_interval."""
+    moving = velocity != 0
+    safe_velocity = np.where(moving, velocity, 1.0)
+    near = (target - position - size) / safe_velocity
+    far = (target + target_size - position) / safe_velocity
+    entry = np.where(velocity > 0, near, far)
+    exit = np.where(velocity > 0, far, near)
+
+    # Not moving on this axis: overlapping for all time or never
+    overlapping = (position < target + target_size) & (target < position + size)
+    entry = np.where(moving, entry, np.where(overlapping, -np.inf, np.inf))
+    exit = np.where(moving, exit, np.where(overlapping, np.inf, -np.inf))
+    return entry, exit
+
+
+PARITY_FIELDS = ('ball_x', 'ball_y', 'x_speed', 'y_speed', 'player_y', 'opponent_y',
+                'player_paddle_speed', 'opponent_paddle_speed', 'player_score', 'opponent_score')
+
+
+def check_parity(n=64, frames=2000, seed=1234, tolerance=1e-6):
+    """
+    Step a batch and the equivalent scalar Matches side by side and return the largest
+    state difference seen. Raises AssertionError when a match diverges.
+    """
+    boss_mode = np.arange(n) % 2 == 1
+    ai_difficulty = np.array([0.2, 0.4, 0.6, 0.8, 1.0])[np.arange(n) % 5]
+    ball_speed = np.array([6, 8, 10, 12, 14, 16])[np.arange(n) % 6]
+    batch = BatchMatch(n, seed=seed, ball_speed=ball_speed, boss_mode=boss_mode, ai_difficulty=ai_difficulty)
+    matches = [batch.match(i) for i in range(n)]
+
+    worst = 0.0
+    for frame in range(frames):
+        for m in matches:
+            m.step(*autopilot(m))
+        batch.step()
+        for field in PARITY_FIELDS:
+            expected = np.array([getattr(m, field) for m in matches], dtype=np.float64)
+            diff = np.abs(getattr(batch, field) - expected)
+            worst = max(worst, float(diff.max()))
+            if worst > tolerance:
+                i = int(diff.argmax())
+                raise AssertionError("match %d diverged on %s at frame %d: %r != %r"
+                                     % (i, field, frame, getattr(batch, field)[i], expected[i]))
+    return worst
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batched Pong matches: throughput, or parity with the scalar Match")
+    parser.add_argument("n", type=int, nargs="?", default=4096, help="matches stepped together (throughput run)")
+    parser.add_argument("--frames", type=int, default=1000, help="frames to step")
+    parser.add_argument("--check", action="store_true",
+                        help="step --check-matches matches both ways and require identical states")
+    parser.add_argument("--check-matches", type=int, default=32, help="matches in the parity check")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        try:
+            worst = check_parity(args.check_matches, args.frames, tolerance=0.0)
+        except AssertionError as error:
+            print("parity FAILED: %s" % error, file=sys.stderr)
+            return 1
+        print("parity ok (max difference %.3g over %d matches x %d frames)" % (worst, args.check_matches, args.frames))
+        return 0
+
+    batch = BatchMatch(args.n, seed=0)
+    start = time.perf_counter()
+    batch.run(args.frames)
+    elapsed = time.perf_counter() - start
+    points = int(batch.player_score.sum() + batch.opponent_score.sum())
+    print("%d matches x %d frames in %.2fs: %.0f match-frames/s, %.0f points/s"
+          % (args.n, args.frames, elapsed, args.n * args.frames / elapsed, points / elapsed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
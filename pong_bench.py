@@ -0,0 +1,266 @@
+import os, sys, time, json, argparse, tempfile
+
+# Benchmarks for the game's hot paths, runnable on a headless box:
+#     python pong_bench.py                         run and print a report
+#     python pong_bench.py --save-baseline         store the results as the baseline
+#     python pong_bench.py --compare               compare against the stored baseline
+# The baseline (bench_baseline.json next to this file, or --baseline FILE) holds
+# timings of the machine it was saved on, so it isn't checked in: save one on
+# the box you compare on, before the change being measured.
+# Each benchmark times individual calls from a scripted ball/paddle state and
+# reports latency percentiles; the frame summary turns them into FPS headroom.
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import pong_MAIN as pong
+from pong_engine import Match, PLAYER_X, BALL_SIZE
+from pong_profiler import FrameProfiler
+from pong_telemetry import Telemetry, HOT_PATH_BUDGET
+from pong_capture import FrameCapture, CAPTURE_FORMATS
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+FRAME_BUDGET = 1 / 60
+REGRESSION_THRESHOLD = 0.20  # Slower than the baseline by more than this fraction counts as a regression...
+NOISE_FLOOR = 5e-6  # ...unless it is only a few microseconds, which is timer noise on calls this short
+
+# Display backends compared on a whole frame (draw + present): (backend, window size or None for the logical size)
+DISPLAY_CASES = [("window", None), ("scaled", None), ("scaled", (1920, 1080)),
+                 ("renderer", None), ("renderer", (1920, 1080)), ("renderer", (640, 350))]
+
+# Scripted states: (ball_x, ball_y, x_speed, y_speed, player_y, opponent_y, boss_mode)
+STATES = {
+    "open field": (600, 300, -14, 7, 280, 280, False),
+    "paddle hit": (PLAYER_X - BALL_SIZE - 5, 330, 14, 3, 280, 280, False),
+    "ball approaching boss": (700, 200, -18, 12, 280, 100, True),
+    "ball leaving boss": (700, 200, 18, -12, 280, 100, True),
+    "overlapping paddle": (PLAYER_X - 10, 320, 14, 3, 280, 280, False),
+}
+
+
+def scripted_match(name, seed=1):
+    ball_x, ball_y, x_speed, y_speed, player_y, opponent_y, boss_mode = STATES[name]
+    match = Match(seed=seed, boss_mode=boss_mode)
+    match.ball_x, match.ball_y, match.x_speed, match.y_speed = ball_x, ball_y, x_speed, y_speed
+    match.player_y, match.opponent_y = player_y, opponent_y
+    match.intercept = None
+    match.save_previous()
+    return match
+
+
+# -------------------- Timing --------------------
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples):
+    return {"calls": len(samples), "p50": percentile(samples, 0.50), "p90": percentile(samples, 0.90),
+            "p99": percentile(samples, 0.99), "max": max(samples)}
+
+
+def time_calls(function, calls, state_name=None, after=None):
+    """
+    Time `calls` separate calls of function(). The game's match is reset to a scripted
+    state before each one, and after() (untimed) runs after each one if given.
+    """
+    timer = time.perf_counter
+    samples = []
+    state = scripted_match(state_name).get_state() if state_name else None
+    for _ in range(calls):
+        if state is not None:
+            pong.match.set_state(state)
+        start = timer()
+        function()
+        samples.append(timer() - start)
+        if after is not None:
+            after()
+    return summarize(samples)
+
+
+def wait_written(capture):
+    """Let the capture writers finish every frame handed to them."""
+    while capture.written < capture.frames and capture.error is None:
+        time.sleep(0.0005)
+
+
+def time_menu(show_menu, hover_positions, exit_click, iterations):
+    """
+    Run a real menu loop with scripted mouse events: every event moves the hover to
+    another item (one redraw each), and the last one clicks the item that leaves the menu.
+    The time between consecutive redraws is one loop iteration.
+    """
+    stamps = []
+    display = pong.DISPLAY
+    update = display.update
+
+    def timed_update(*args):
+        update(*args)
+        stamps.append(time.perf_counter())
+
+    pygame.event.clear()
+    for i in range(iterations):
+        position = hover_positions[i % len(hover_positions)]
+        pygame.event.post(pygame.event.Event(pygame.MOUSEMOTION, pos=position, rel=(0, 0), buttons=(0, 0, 0)))
+    pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=exit_click, button=1))
+
+    display.update = timed_update
+    try:
+        show_menu()
+    finally:
+        del display.update
+    return summarize([b - a for a, b in zip(stamps, stamps[1:])])
+
+
+# -------------------- Benchmarks --------------------
+def run_benchmarks(calls):
+    pong.init_game(load_sounds=False)  # Nothing here plays sound, and the sound files may not be present
+
+    results = {}
+    match = pong.match
+
+    # Physics and AI
+    results["handle_ball_movement (open field)"] = time_calls(pong.handle_ball_movement, calls, "open field")
+    results["handle_ball_movement (paddle hit)"] = time_calls(pong.handle_ball_movement, calls, "paddle hit")
+    results["check_ball_paddle_collision"] = time_calls(lambda: match.check_ball_paddle_collision('player'),
+                                                        calls, "overlapping paddle")
+    results["handle_paddle_movement"] = time_calls(pong.handle_paddle_movement, calls, "open field")
+    results["move_opponent (normal)"] = time_calls(pong.move_opponent, calls, "open field")
+    results["move_opponent (boss, approaching)"] = time_calls(pong.move_opponent, calls, "ball approaching boss")
+    results["move_opponent (boss, leaving)"] = time_calls(pong.move_opponent, calls, "ball leaving boss")
+
+    # Profiler overhead on a whole physics tick (the marks should be lost in the noise)
+    results["physics_step"] = time_calls(pong.physics_step, calls, "open field")
+    pong.PROFILER = FrameProfiler()
+    results["physics_step (profiler on)"] = time_calls(pong.physics_step, calls, "open field")
+    pong.PROFILER = None
+
+    # Telemetry: what queueing an event costs the game thread, alone and inside a paddle hit
+    with tempfile.TemporaryDirectory() as directory:
+        telemetry = Telemetry(os.path.join(directory, "bench.db")).start()
+        results["telemetry paddle_hit"] = time_calls(lambda: telemetry.paddle_hit(match, 'player', 0.25), calls)
+        match.listener = telemetry
+        results["handle_ball_movement (hit, telemetry on)"] = time_calls(pong.handle_ball_movement, calls, "paddle hit")
+        match.listener = None
+        telemetry.close()
+
+    # Capture: what handing a frame to the writers costs the game thread (each one is written before the next)
+    with tempfile.TemporaryDirectory() as directory:
+        for capture_format in CAPTURE_FORMATS:
+            capture = FrameCapture(os.path.join(directory, capture_format), pong.SCREEN, capture_format, fps=0)
+            results["capture (%s)" % capture_format] = time_calls(lambda: capture.capture(pong.SCREEN, 0.0),
+                                                                 max(20, calls // 20), after=lambda: wait_written(capture))
+            capture.close()
+
+    # Rendering
+    pong.DIRTY_RECTS = True
+    pong.RENDERER.invalidate()
+    draw = lambda: pong.draw_screen(0.5)
+    results["draw_screen (dirty rects)"] = time_calls(draw, calls, "open field", after=pong.present_frame)
+    results["present_frame (dirty rects)"] = time_calls(pong.present_frame, calls, "open field", after=draw)
+    pong.DIRTY_RECTS = False
+    results["draw_screen (full redraw)"] = time_calls(draw, calls, "open field", after=pong.present_frame)
+    results["present_frame (full redraw)"] = time_calls(pong.present_frame, calls, "open field", after=draw)
+    pong.DIRTY_RECTS = True
+
+    # Menus: alternate the hover between two items so every iteration redraws
+    iterations = max(10, calls // 10)
+    left, height = pong.LEFT_MARGIN + 5, pong.HEIGHT
+    results["start menu iteration"] = time_menu(
+        pong.show_start_menu, [(left, height / 2 - 140), (left, height / 2 - 40)], (left, height / 2 - 140), iterations)
+
+    pong.paused = True
+    center = pong.WIDTH / 2
+    results["pause menu iteration"] = time_menu(
+        pong.show_pause_menu, [(center, height / 2), (center, height / 2 + 100)], (center, height / 2 - 100), iterations)
+
+    start_y = height / 2 - 225
+    results["settings menu iteration"] = time_menu(
+        pong.show_settings_menu, [(left, start_y + 5), (left, start_y + 80)], (left, start_y + 6 * 75 + 5), iterations)
+
+    # Display backends: the same frame drawn at the logical resolution and scaled to the window
+    def frame():
+        pong.draw_screen(0.5)
+        pong.present_frame()
+
+    for backend, window_size in DISPLAY_CASES:
+        pong.DISPLAY_BACKEND, pong.WINDOW_SIZE = backend, window_size
+        pong.init_display()
+        if pong.DISPLAY.backend != backend:
+            continue  # Not available here (the fallback reason has been printed)
+        width, height = pong.DISPLAY.window_size
+        results["frame, %s backend (%dx%d window)" % (backend, width, height)] = time_calls(frame, calls, "open field")
+    pong.DISPLAY_BACKEND, pong.WINDOW_SIZE = "window", None
+    pong.init_display()
+
+    return results
+
+
+# -------------------- Reporting --------------------
+FRAME_PARTS = ["handle_ball_movement (open field)", "handle_paddle_movement", "move_opponent (normal)",
+               "draw_screen (dirty rects)", "present_frame (dirty rects)"]
+
+
+def report(results, baseline=None):
+    lines = ["%-44s %8s %10s %10s %10s %10s" % ("benchmark", "calls", "p50 us", "p90 us", "p99 us", "vs base")]
+    regressions = []
+    for name, stats in results.items():
+        change = ""
+        if baseline and name in baseline:
+            delta = stats["p50"] / baseline[name]["p50"] - 1
+            change = "%+.0f%%" % (delta * 100)
+            if delta > REGRESSION_THRESHOLD and stats["p50"] - baseline[name]["p50"] > NOISE_FLOOR:
+                change += " !"
+                regressions.append(name)
+        lines.append("%-44s %8d %10.1f %10.1f %10.1f %10s" % (name, stats["calls"], stats["p50"] * 1e6,
+                                                               stats["p90"] * 1e6, stats["p99"] * 1e6, change))
+
+    # A game frame is one physics tick plus one draw and present
+    frame_p50 = sum(results[name]["p50"] for name in FRAME_PARTS)
+    frame_p99 = sum(results[name]["p99"] for name in FRAME_PARTS)
+    lines.append("")
+    lines.append("game frame: p50 %.2f ms (%.0f fps), p99 %.2f ms (%.0f fps); %.1fx headroom over 60 Hz at p99"
+                 % (frame_p50 * 1e3, 1 / frame_p50, frame_p99 * 1e3, 1 / frame_p99, FRAME_BUDGET / frame_p99))
+    if regressions:
+        lines.append("regressions (> %d%% slower than baseline): %s"
+                     % (REGRESSION_THRESHOLD * 100, ", ".join(regressions)))
+    telemetry = results.get("telemetry paddle_hit")
+    if telemetry and telemetry["p50"] > HOT_PATH_BUDGET:
+        lines.append("telemetry costs %.1f us per event, over its %.1f us budget"
+                     % (telemetry["p50"] * 1e6, HOT_PATH_BUDGET * 1e6))
+        regressions.append("telemetry paddle_hit")
+    return "\n".join(lines), regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pong hot-path benchmarks")
+    parser.add_argument("--calls", type=int, default=2000, help="timed calls per benchmark")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="compare against the baseline, exit 1 on regressions")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print("no baseline at %s, run with --save-baseline first" % args.baseline, file=sys.stderr)
+            return 2
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = run_benchmarks(args.calls)
+    text, regressions = report(results, baseline)
+    print(text)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print("baseline saved to %s" % args.baseline)
+
+    pygame.quit()
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
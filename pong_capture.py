@@ -0,0 +1,150 @@
+import os, time, zlib, struct, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+
+# Gameplay capture for highlight reels. Saving an image in the main loop
+# (pygame.image.save holds the interpreter for the whole PNG encode, tens of
+# milliseconds a frame) would wreck the frame rate, so the main thread only
+# blits the screen into one of a few pooled surfaces and hands it to a thread
+# pool; the pooled surface goes back to the pool once it is written. The
+# writers read the pooled surface's pixels in place and spend their time in
+# zlib and file writes, which let the game thread run. If every pooled surface
+# is still being written, the frame is dropped and counted. Formats:
+#     raw  one file of frames back to back in the display's pixel layout
+#          (report() gives the ffmpeg command that turns it into a video)
+#     png  a directory of frame_000000.png, frame_000001.png, ...
+
+CAPTURE_FORMATS = ("raw", "png")
+POOL_SIZE = 8  # Frames that can be waiting for or being written; the bound on the writers' backlog
+WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))  # Leave a core to the game thread
+PNG_LEVEL = 1  # zlib level: fast, and the mostly black frames compress well anyway
+PNG_MASKS = (0xFF, 0xFF00, 0xFF0000, 0)  # 24-bit RGB, the byte order PNG wants
+
+# ffmpeg names of the pixel layouts a 32-bit display surface has on a little-endian machine
+RAW_PIXEL_FORMATS = {(0xFF0000, 0xFF00, 0xFF): "bgr0", (0xFF, 0xFF00, 0xFF0000): "rgb0"}
+
+
+class FrameCapture:
+    """
+    Captures frames of surface to path (a file for raw, a directory for png).
+    capture(surface, seconds) is called after each presented frame with the game
+    time it shows and keeps at most fps frames per second of it (fps=0 keeps every
+    frame); close() waits for the writers.
+    """
+
+    def __init__(self, path, surface, format="raw", fps=60, pool_size=POOL_SIZE, workers=WORKERS):
+        if format not in CAPTURE_FORMATS:
+            raise ValueError("unknown capture format %r" % format)
+        self.path = path
+        self.size = surface.get_size()
+        self.format = format
+        self.fps = fps
+        self.interval = 1 / fps if fps else 0.0
+        self.frames = 0  # Frames handed to the writers
+        self.written = 0
+        self.dropped = 0  # Frames due while every pooled surface was busy
+        self.copy_times = deque(maxlen=600)  # Seconds the game thread spent per captured frame, recent frames
+        self.error = None
+        self._pool = deque()  # Free pooled surfaces; the writers put them back when done
+        self._pool_size = pool_size
+        self._created = 0
+        self._next = None
+        self._lock = threading.Lock()
+        self._file = None
+        if format == "png":
+            os.makedirs(path, exist_ok=True)
+        else:
+            if surface.get_bytesize() != 4 or surface.get_pitch() != 4 * surface.get_width():
+                raise ValueError("raw capture needs a 32-bit surface without row padding")
+            self._frame_bytes = surface.get_pitch() * surface.get_height()
+            self._pixel_format = RAW_PIXEL_FORMATS.get(surface.get_masks()[:3], "bgr0")
+            self._file = open(path, "wb")
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="capture")
+
+    def _new_buffer(self, surface):
+        if self.format == "png":
+            return pygame.Surface(self.size, 0, 24, PNG_MASKS)
+        return pygame.Surface(self.size, 0, surface)  # Same layout as the display: the blit is a plain copy
+
+    def capture(self, surface, seconds):
+        if self._next is not None and seconds + 1e-9 < self._next:
+            return
+        self._next = seconds + self.interval
+        start = time.perf_counter()
+        if self._pool:
+            buffer = self._pool.popleft()
+        elif self._created < self._pool_size:
+            buffer = self._new_buffer(surface)  # The pool fills up over the first frames
+            self._created += 1
+        else:
+            self.dropped += 1
+            return
+        buffer.blit(surface, (0, 0))
+        index = self.frames
+        self.frames += 1
+        self._executor.submit(self._write, buffer, index)
+        self.copy_times.append(time.perf_counter() - start)
+
+    # -------------------- Writer threads --------------------
+    def _write(self, buffer, index):
+        try:
+            proxy = buffer.get_buffer()  # The pooled surface's own memory (padding included), locked while the proxy lives
+            with memoryview(proxy) as pixels:
+                if self.format == "raw":
+                    with self._lock:
+                        self._file.seek(index * self._frame_bytes)  # Frames can finish out of order
+                        self._file.write(pixels)
+                else:
+                    with open(os.path.join(self.path, "frame_%06d.png" % index), "wb") as f:
+                        f.write(encode_png(pixels, self.size, buffer.get_pitch()))
+            del proxy
+            with self._lock:
+                self.written += 1
+        except Exception as error:  # Shown in the report; the game keeps running
+            self.error = error
+        self._pool.append(buffer)
+
+    def close(self):
+        """Wait for the frames still being written. Safe to call twice."""
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        if self._file is not None:
+            self._file.close()
+        self._pool.clear()
+
+    def report(self):
+        copies = sorted(self.copy_times)
+        text = ("Capture: %d frames (%s) to %s, %d dropped; game thread %.2f ms per frame (p50), %.2f ms max"
+                % (self.frames, self.format, self.path, self.dropped,
+                   copies[len(copies) // 2] * 1000 if copies else 0.0, copies[-1] * 1000 if copies else 0.0))
+        if self.error is not None:
+            text += "\nCapture error: %s" % self.error
+        if self.format == "raw":
+            text += ("\n  ffmpeg -f rawvideo -pixel_format %s -video_size %dx%d -framerate %d -i %s capture.mp4"
+                     % ((self._pixel_format,) + self.size + (self.fps or 60, self.path)))
+        return text
+
+
+# -------------------- PNG --------------------
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def encode_png(pixels, size, pitch, level=PNG_LEVEL):
+    """
+    A PNG of 24-bit RGB pixels (rows `pitch` bytes apart). Rows go through zlib one at
+    a time with PNG's 'no filter' byte in front; zlib lets other threads run meanwhile.
+    """
+    width, height = size
+    row_bytes = 3 * width
+    compressor = zlib.compressobj(level)
+    parts = []
+    for y in range(height):
+        parts.append(compressor.compress(b"\x00"))
+        parts.append(compressor.compress(pixels[y * pitch:y * pitch + row_bytes]))
+    parts.append(compressor.flush())
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)  # 8 bits per channel, RGB
+    return b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", header) + _png_chunk(b"IDAT", b"".join(parts)) + _png_chunk(b"IEND", b"")
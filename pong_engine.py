@@ -0,0 +1,524 @@
+import random, math
+
+# Headless match engine. Holds the same rules as the game in pong_MAIN.py but
+# keeps all state on a Match object, so it can be stepped without a window,
+# a mixer or a frame cap.
+
+# Playfield
+WIDTH, HEIGHT = 1280, 700
+
+# Paddles
+PADDLE_WIDTH, PADDLE_HEIGHT = 20, 140
+PLAYER_X = WIDTH - 30
+OPPONENT_X = 30
+PADDLE_START_Y = HEIGHT / 2 - 50
+
+# Paddle properties
+PADDLE_ACCELERATION = 1.25
+MAX_PADDLE_SPEED = 15
+BOSS_PADDLE_SPEED = 20
+
+# Ball
+BALL_SIZE = 27
+MAX_BALL_SPEED = 20
+MIN_Y_SPEED = 2.0
+BOUNCE_SPEED_UP = 1.03
+MAX_BOUNCE_ANGLE = math.pi / 3  # 60 degrees
+BOSS_SPEED_FACTOR = 1.3
+BOSS_PREDICTION_FACTOR = 0.95
+
+# Counter-based RNG constants (see CounterRNG)
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+# -------------------- Counter-based RNG --------------------
+def _splitmix64(z):
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9 & MASK64
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EB & MASK64
+    return z ^ (z >> 31)
+
+
+class CounterRNG:
+    """
+    Scalar RNG with the same stream as a pong_batch.BatchMatch row: draw k of a
+    match seeded with `seed` is splitmix64(seed + k * golden_gamma). Its whole
+    state is two integers, so it is cheap to snapshot or send over the network.
+    Implements the subset of random.Random used by Match.
+    """
+
+    __slots__ = ('seed', 'counter')
+
+    def __init__(self, seed=0):
+        self.seed = seed & MASK64
+        self.counter = 0
+
+    def random(self):
+        self.counter += 1
+        z = _splitmix64((self.seed + self.counter * GOLDEN_GAMMA) & MASK64)
+        return (z >> 11) * (1.0 / (1 << 53))
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.random()
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def randint(self, a, b):
+        return a + int(self.random() * (b - a + 1))
+
+    def getstate(self):
+        return self.seed, self.counter
+
+    def setstate(self, state):
+        self.seed, self.counter = state
+
+
+# Everything that describes a match at a point in time (see Match.get_state)
+STATE_FIELDS = ('ball_speed', 'boss_mode', 'ai_difficulty', 'prediction_factor', 'boss_paddle_speed',
+                'ball_x', 'ball_y', 'x_speed', 'y_speed',
+                'player_y', 'opponent_y', 'player_paddle_speed', 'opponent_paddle_speed',
+                'player_score', 'opponent_score', 'frame', 'intercept',
+                'previous_ball_x', 'previous_ball_y', 'previous_player_y', 'previous_opponent_y')
+
+
+class Match:
+    """A single Pong match: ball, paddles, speeds and scores, stepped one frame at a time."""
+
+    __slots__ = STATE_FIELDS + ('seed', 'rng', 'listener')  # No per-instance dict: smaller, faster attribute access
+
+    def __init__(self, seed=None, ball_speed=14, boss_mode=False, ai_difficulty=0.2, rng=None):
+        # Every random draw goes through the match's own RNG so matches are reproducible
+        if seed is None and rng is None:
+            seed = random.getrandbits(63)
+        self.seed = seed
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.ball_speed = ball_speed
+        self.boss_mode = boss_mode
+        self.ai_difficulty = ai_difficulty
+        # Boss AI tuning (the game always uses the defaults; the tournament runner varies them)
+        self.prediction_factor = BOSS_PREDICTION_FACTOR
+        self.boss_paddle_speed = BOSS_PADDLE_SPEED
+
+        # Ball (top-left corner, like pygame.Rect.x / .y)
+        self.ball_x = WIDTH / 2 - 10
+        self.ball_y = HEIGHT / 2 - 10
+        self.x_speed, self.y_speed = 20, 20
+
+        # Paddles (top edge; the x positions are fixed)
+        self.player_y = PADDLE_START_Y
+        self.opponent_y = PADDLE_START_Y
+        self.player_paddle_speed = 0
+        self.opponent_paddle_speed = 0
+
+        self.player_score, self.opponent_score = 0, 0
+        self.frame = 0
+
+        # Where the ball's current path meets the paddle it is heading for (None until needed)
+        self.intercept = None
+
+        # Positions at the start of the current step, for render interpolation
+        self.save_previous()
+
+        # Told about paddle hits and points as they happen: paddle_hit(match, side, offset) and point(match, scorer)
+        self.listener = None
+
+        self.reset_ball()
+
+    # -------------------- Geometry helpers --------------------
+    @property
+    def ball_centerx(self):
+        return self.ball_x + BALL_SIZE / 2
+
+    @property
+    def ball_centery(self):
+        return self.ball_y + BALL_SIZE / 2
+
+    def save_previous(self):
+        """Remember the current positions as the start of the next step."""
+        self.previous_ball_x, self.previous_ball_y = self.ball_x, self.ball_y
+        self.previous_player_y, self.previous_opponent_y = self.player_y, self.opponent_y
+
+    def interpolate(self, alpha):
+        """Positions (ball_x, ball_y, player_y, opponent_y) a fraction alpha of the way through the last step."""
+        return (self.previous_ball_x + (self.ball_x - self.previous_ball_x) * alpha,
+                self.previous_ball_y + (self.ball_y - self.previous_ball_y) * alpha,
+                self.previous_player_y + (self.player_y - self.previous_player_y) * alpha,
+                self.previous_opponent_y + (self.opponent_y - self.previous_opponent_y) * alpha)
+
+    def predicted_intercept(self):
+        """
+        Height (unfolded, see fold_into_field) at which the ball's center reaches the center line of
+        the paddle it is moving towards. It is constant along a straight path, so it is computed once
+        per trajectory and only recomputed after a wall bounce, a paddle bounce or a serve.
+        """
+        if self.intercept is None:
+            self.intercept = predict_intercept(self.ball_centerx, self.ball_centery, self.x_speed, self.y_speed)
+        return self.intercept
+
+    def get_state(self):
+        """A snapshot of the match (including its RNG) that set_state can restore."""
+        return tuple(getattr(self, field) for field in STATE_FIELDS) + (self.rng.getstate(),)
+
+    def set_state(self, state):
+        for field, value in zip(STATE_FIELDS, state):
+            setattr(self, field, value)
+        self.rng.setstate(state[-1])
+
+    def paddle_y(self, side):
+        return self.player_y if side == 'player' else self.opponent_y
+
+    def ball_hits_paddle(self, side):
+        """Same test as ball.colliderect(paddle): the rectangles must overlap, touching edges don't count."""
+        paddle_x = PLAYER_X if side == 'player' else OPPONENT_X
+        paddle_y = self.paddle_y(side)
+        return (self.ball_x < paddle_x + PADDLE_WIDTH and paddle_x < self.ball_x + BALL_SIZE and
+                self.ball_y < paddle_y + PADDLE_HEIGHT and paddle_y < self.ball_y + BALL_SIZE)
+
+    # -------------------- Match control --------------------
+    def restart(self):
+        """Reset the scores and serve from the player's side."""
+        self.player_score, self.opponent_score = 0, 0
+        self.reset_ball()
+
+    def reset_ball(self, starting_player='player'):
+        """Reset the ball position and speed based on the player who starts it."""
+        # Position the ball at the center of the appropriate paddle
+        if starting_player == 'player':
+            self.ball_x = PLAYER_X + PADDLE_WIDTH / 2 - BALL_SIZE - BALL_SIZE / 2
+            self.ball_y = self.player_y + PADDLE_HEIGHT / 2 - BALL_SIZE / 2
+        else:
+            self.ball_x = OPPONENT_X + PADDLE_WIDTH / 2 + BALL_SIZE - BALL_SIZE / 2
+            self.ball_y = self.opponent_y + PADDLE_HEIGHT / 2 - BALL_SIZE / 2
+
+        # Set initial speed (faster in boss mode)
+        base_speed = self.ball_speed
+        if self.boss_mode:
+            base_speed *= BOSS_SPEED_FACTOR
+
+        # Set direction based on starting player
+        if starting_player == 'player':
+            self.x_speed = -abs(base_speed)  # Move towards opponent
+        else:
+            self.x_speed = abs(base_speed)   # Move towards player
+
+        # Add more vertical variation in boss mode
+        if self.boss_mode:
+            self.y_speed = self.rng.uniform(-base_speed * 0.8, base_speed * 0.8)
+        else:
+            self.y_speed = self.rng.choice([base_speed / 2, -base_speed / 2])
+
+        # A served ball jumps, it should not be drawn sliding across the field
+        self.previous_ball_x, self.previous_ball_y = self.ball_x, self.ball_y
+        self.intercept = None
+
+    def step(self, up=False, down=False):
+        """
+        Advance the match by one frame with the player's up/down input.
+        Returns the side that scored during the frame ('player' / 'opponent') or None.
+        """
+        self.save_previous()
+        scorer = self.move_ball()
+        self.move_paddles(up, down)
+        self.move_opponent()
+        self.frame += 1
+        return scorer
+
+    def play_rally(self, controller=None, max_frames=100000):
+        """Step until someone scores and return (scorer, frames). The player is driven by controller(match) -> (up, down)."""
+        if controller is None:
+            controller = autopilot
+        for frames in range(1, max_frames + 1):
+            up, down = controller(self)
+            scorer = self.step(up, down)
+            if scorer is not None:
+                return scorer, frames
+        return None, max_frames
+
+    # -------------------- Game Logic --------------------
+    def move_ball(self):
+        """
+        Updates ball position and handles wall collisions with classic pong physics.
+        Returns the side that scored, if any.
+        """
+        # Move the ball, bouncing off a paddle at the exact moment it is reached
+        # and using the rest of the step with the new velocity, so fast balls
+        # can't pass through a paddle between two frames.
+        remaining = 1.0
+        for _ in range(2):
+            side = 'player' if self.x_speed > 0 else 'opponent'
+            time_of_impact = self.time_of_impact(side, remaining)
+            if time_of_impact is None:
+                break
+            self.ball_x += self.x_speed * time_of_impact
+            self.ball_y += self.y_speed * time_of_impact
+            self.bounce_off_paddle(side)
+            remaining -= time_of_impact
+        self.ball_x += self.x_speed * remaining
+        self.ball_y += self.y_speed * remaining
+
+        # Perfect elastic collisions with walls (no dampening)
+        if self.ball_y <= 0:
+            self.ball_y = 0
+            self.y_speed = abs(self.y_speed)
+            self.intercept = None
+        elif self.ball_y + BALL_SIZE >= HEIGHT:
+            self.ball_y = HEIGHT - BALL_SIZE
+            self.y_speed = -abs(self.y_speed)
+            self.intercept = None
+
+        # Scoring logic
+        scorer = None
+        if self.ball_x <= 0:
+            self.player_score += 1
+            scorer = 'player'
+            if self.listener is not None:
+                self.listener.point(self, scorer)  # Before the serve replaces the ball's final speed
+            self.reset_ball('player')
+        elif self.ball_x + BALL_SIZE >= WIDTH:
+            self.opponent_score += 1
+            scorer = 'opponent'
+            if self.listener is not None:
+                self.listener.point(self, scorer)
+            self.reset_ball('opponent')
+
+        # Overlaps the sweep can't see (a paddle moved into the ball, a wall clamp)
+        if not self.check_ball_paddle_collision('player'):
+            self.check_ball_paddle_collision('opponent')
+
+        return scorer
+
+    def time_of_impact(self, side, duration=1.0):
+        """
+        Swept AABB test of the moving ball against a paddle (paddles don't move while the ball does).
+        Returns the fraction of a step at which the ball first touches the paddle, or None if it doesn't within duration.
+        """
+        paddle_x = PLAYER_X if side == 'player' else OPPONENT_X
+        x_entry, x_exit = sweep_interval(self.ball_x, BALL_SIZE, self.x_speed, paddle_x, PADDLE_WIDTH)
+        y_entry, y_exit = sweep_interval(self.ball_y, BALL_SIZE, self.y_speed, self.paddle_y(side), PADDLE_HEIGHT)
+        entry = max(x_entry, y_entry)
+        if entry < min(x_exit, y_exit) and 0 <= entry <= duration:
+            return entry
+        return None
+
+    def check_ball_paddle_collision(self, side):
+        """Bounce the ball off a paddle it overlaps. Returns whether there was a collision."""
+        if not self.ball_hits_paddle(side):
+            return False
+        self.bounce_off_paddle(side)
+        return True
+
+    def bounce_off_paddle(self, side):
+        """
+        Handles ball-paddle collisions with realistic physics.
+        The return angle is calculated based on where the ball hits the paddle.
+        """
+        # Move the ball out of the paddle it hit
+        if side == 'player':
+            self.ball_x = PLAYER_X - BALL_SIZE
+        else:
+            self.ball_x = OPPONENT_X + PADDLE_WIDTH
+
+        # Calculate relative intersection point, normalized between -1 and 1
+        paddle_centery = self.paddle_y(side) + PADDLE_HEIGHT / 2
+        relative_intersect_y = (paddle_centery - self.ball_centery) / (PADDLE_HEIGHT / 2)
+        normalized_intersect = min(max(relative_intersect_y, -1.0), 1.0)
+
+        # Calculate return angle
+        bounce_angle = normalized_intersect * MAX_BOUNCE_ANGLE
+
+        # Increase speed slightly with each hit
+        speed = math.sqrt(self.x_speed * self.x_speed + self.y_speed * self.y_speed)
+        speed *= BOUNCE_SPEED_UP
+
+        # Ensure the ball moves in the correct direction after collision
+        direction = -1 if side == 'player' else 1
+
+        # Calculate new x and y speeds based on the bounce angle
+        x_speed = direction * abs(speed * math.cos(bounce_angle))
+        y_speed = speed * -math.sin(bounce_angle)
+
+        # Ensure minimum vertical movement to prevent horizontal stalemates
+        if abs(y_speed) < MIN_Y_SPEED:
+            y_speed = MIN_Y_SPEED if y_speed > 0 else -MIN_Y_SPEED
+
+        # Add small random variation to prevent predictable patterns
+        y_speed += self.rng.uniform(-0.5, 0.5)
+
+        # Ensure speed doesn't exceed maximum
+        current_speed = math.sqrt(x_speed * x_speed + y_speed * y_speed)
+        if current_speed > MAX_BALL_SPEED:
+            speed_multiplier = MAX_BALL_SPEED / current_speed
+            x_speed *= speed_multiplier
+            y_speed *= speed_multiplier
+
+        self.x_speed, self.y_speed = x_speed, y_speed
+        self.intercept = None
+        if self.listener is not None:
+            self.listener.paddle_hit(self, side, normalized_intersect)
+
+    def move_paddles(self, up=False, down=False):
+        """Accelerate the player's paddle from the up/down input and apply both paddle speeds."""
+        self.steer_paddle('player', up, down)
+
+        # Opponent paddle follows the ball
+        self.track_ball('opponent')
+
+    def steer_paddle(self, side, up=False, down=False):
+        """Accelerate a paddle from up/down input (decelerating when neither is held) and move it."""
+        paddle_speed = self.player_paddle_speed if side == 'player' else self.opponent_paddle_speed
+        if up:
+            paddle_speed = max(paddle_speed - PADDLE_ACCELERATION, -MAX_PADDLE_SPEED)
+        elif down:
+            paddle_speed = min(paddle_speed + PADDLE_ACCELERATION, MAX_PADDLE_SPEED)
+        else:
+            # Decelerate when no key is pressed
+            if paddle_speed > 0:
+                paddle_speed = max(paddle_speed - PADDLE_ACCELERATION, 0)
+            elif paddle_speed < 0:
+                paddle_speed = min(paddle_speed + PADDLE_ACCELERATION, 0)
+
+        # Move the paddle and keep it in bounds
+        if side == 'player':
+            self.player_paddle_speed = paddle_speed
+            self.player_y = clamp_paddle(self.player_y + paddle_speed)
+        else:
+            self.opponent_paddle_speed = paddle_speed
+            self.opponent_y = clamp_paddle(self.opponent_y + paddle_speed)
+
+    def track_ball(self, side):
+        """The opponent paddle's built-in momentum: keep moving, accelerate towards the ball and move again."""
+        if side == 'player':
+            paddle_y, paddle_speed = self.player_y, self.player_paddle_speed
+        else:
+            paddle_y, paddle_speed = self.opponent_y, self.opponent_paddle_speed
+
+        if paddle_speed > 0:
+            paddle_y += paddle_speed
+
+        ball_centery = self.ball_centery
+        paddle_centery = paddle_y + PADDLE_HEIGHT / 2
+        if ball_centery > paddle_centery:
+            paddle_speed = min(paddle_speed + PADDLE_ACCELERATION, MAX_PADDLE_SPEED)
+        elif ball_centery < paddle_centery:
+            paddle_speed = max(paddle_speed - PADDLE_ACCELERATION, -MAX_PADDLE_SPEED)
+        else:
+            # Decelerate when not moving
+            if paddle_speed > 0:
+                paddle_speed = max(paddle_speed - PADDLE_ACCELERATION, 0)
+            elif paddle_speed < 0:
+                paddle_speed = min(paddle_speed + PADDLE_ACCELERATION, 0)
+
+        # Move the paddle and keep it in bounds
+        paddle_y = clamp_paddle(paddle_y + paddle_speed)
+        if side == 'player':
+            self.player_y, self.player_paddle_speed = paddle_y, paddle_speed
+        else:
+            self.opponent_y, self.opponent_paddle_speed = paddle_y, paddle_speed
+
+    # -------------------- OPPONENT AI --------------------
+    def move_opponent(self):
+        self.move_ai('opponent', self)
+
+    def move_ai(self, side, config):
+        """
+        Move a paddle the way the opponent AI does. config supplies ai_difficulty, boss_mode,
+        prediction_factor and boss_paddle_speed; the opponent uses the match's own settings.
+        """
+        if side == 'player':
+            paddle_y, paddle_speed, approaching = self.player_y, self.player_paddle_speed, self.x_speed > 0
+        else:
+            paddle_y, paddle_speed, approaching = self.opponent_y, self.opponent_paddle_speed, self.x_speed < 0
+        paddle_centery = paddle_y + PADDLE_HEIGHT / 2
+
+        if config.boss_mode:
+            # Boss mode AI - Enhanced prediction and faster movement
+            max_speed = config.boss_paddle_speed
+
+            # Predict where the ball will intersect with the paddle's y-position
+            if approaching:  # Ball is moving towards the paddle
+                # The boss's time to intercept has always come out negative, so it aims at the mirror
+                # image of the real intercept about the ball's height. Kept as-is: it sets the boss difficulty.
+                ball_centery = self.ball_centery
+                predicted_y = ball_centery - (self.predicted_intercept() - ball_centery) * config.prediction_factor
+                # Account for bounces
+                predicted_y = fold_into_field(predicted_y)
+            else:
+                # If ball is moving away, return to center with some randomization
+                predicted_y = HEIGHT / 2 + self.rng.randint(-50, 50)
+
+            # Move towards the predicted position
+            if paddle_centery < predicted_y - 5:
+                paddle_speed = min(paddle_speed + PADDLE_ACCELERATION * 2, max_speed)
+            elif paddle_centery > predicted_y + 5:
+                paddle_speed = max(paddle_speed - PADDLE_ACCELERATION * 2, -max_speed)
+            else:
+                paddle_speed = 0
+        else:
+            # Simple AI for normal mode - directly follow the ball
+            speed = MAX_PADDLE_SPEED * config.ai_difficulty
+
+            if paddle_centery < self.ball_centery:
+                paddle_y += speed
+            elif paddle_centery > self.ball_centery:
+                paddle_y -= speed
+
+        # Keep paddle in bounds
+        paddle_y = clamp_paddle(paddle_y)
+        if side == 'player':
+            self.player_y, self.player_paddle_speed = paddle_y, paddle_speed
+        else:
+            self.opponent_y, self.opponent_paddle_speed = paddle_y, paddle_speed
+
+
+# -------------------- Helper Functions --------------------
+def clamp_paddle(y):
+    """Keep a paddle's top edge inside the playfield."""
+    if y < 0:
+        return 0
+    if y > HEIGHT - PADDLE_HEIGHT:
+        return HEIGHT - PADDLE_HEIGHT
+    return y
+
+
+def predict_intercept(ball_centerx, ball_centery, x_speed, y_speed):
+    """
+    Unfolded height at which a ball moving in a straight line reaches the center of the paddle
+    it is moving towards. Pass it through fold_into_field for the height after wall bounces.
+    """
+    target_x = (PLAYER_X if x_speed > 0 else OPPONENT_X) + PADDLE_WIDTH / 2
+    time_to_intercept = (target_x - ball_centerx) / x_speed
+    return ball_centery + y_speed * time_to_intercept
+
+
+def fold_into_field(y, height=HEIGHT):
+    """Reflect y back into [0, height] the way the walls would (a triangle wave), in constant time."""
+    y %= 2 * height
+    return 2 * height - y if y > height else y
+
+
+def sweep_interval(position, size, velocity, target, target_size):
+    """
+    Times (in steps) at which a moving interval [position, position + size] starts and stops
+    overlapping the fixed interval [target, target + target_size].
+    """
+    if velocity > 0:
+        return (target - position - size) / velocity, (target + target_size - position) / velocity
+    if velocity < 0:
+        return (target + target_size - position) / velocity, (target - position - size) / velocity
+    if position < target + target_size and target < position + size:
+        return -math.inf, math.inf
+    return math.inf, -math.inf
+
+
+def autopilot(match):
+    """Simple player-side controller for headless runs: chase the ball with the player's paddle."""
+    paddle_centery = match.player_y + PADDLE_HEIGHT / 2
+    ball_centery = match.ball_centery
+    return ball_centery < paddle_centery - 10, ball_centery > paddle_centery + 10
+
+
+def assist(match):
+    """Player-side assist: move to where the ball will arrive, or back to the middle while it moves away."""
+    paddle_centery = match.player_y + PADDLE_HEIGHT / 2
+    target_y = fold_into_field(match.predicted_intercept()) if match.x_speed > 0 else HEIGHT / 2
+    return target_y < paddle_centery - 10, target_y > paddle_centery + 10
@@ -0,0 +1,253 @@
+import sys, time, random
+import numpy as np
+
+from pong_engine import (Match, CounterRNG, WIDTH, HEIGHT, PADDLE_WIDTH, PADDLE_HEIGHT, PLAYER_X, OPPONENT_X,
+                         PADDLE_START_Y, BALL_SIZE, MAX_BALL_SPEED, MAX_PADDLE_SPEED)
+from pong_batch import BatchMatch
+
+# Reinforcement-learning environments over the game's rules, gym-style:
+# reset() -> (observation, info), step(action) -> (observation, reward,
+# terminated, truncated, info). The agent plays the right paddle against the
+# opponent AI. Observations are in the agent's frame of reference (its own
+# paddle is always on the right), so observe(match, 'opponent') lets a trained
+# policy drive the left paddle in place of move_opponent.
+#
+# Throughput: only VecPongEnv meets the 100k steps/s target on one core (about
+# 650k steps/s at n=4096). PongEnv runs about 35k steps/s: a step is frame_skip
+# calls of Match.step at about 5 us each, the same code the game runs, so the
+# single environment is for debugging and evaluation, not for training.
+#     python pong_env.py          steps/s of PongEnv and VecPongEnv
+
+# Actions
+STAY, UP, DOWN = 0, 1, 2
+ACTION_COUNT = 3
+
+# Compact observation: float32, positions scaled to [0, 1], speeds to about [-1, 1]
+OBSERVATION_FIELDS = ('ball_x', 'ball_y', 'ball_x_speed', 'ball_y_speed',
+                      'paddle_y', 'paddle_speed', 'other_paddle_y', 'score', 'other_score')
+
+# Pixel observation: uint8, one pixel per PIXEL_SCALE x PIXEL_SCALE playfield pixels (80 x 44)
+PIXEL_SCALE = 16
+PIXEL_SHAPE = (-(-HEIGHT // PIXEL_SCALE), -(-WIDTH // PIXEL_SCALE))
+
+
+def observe(match, side='player'):
+    """The compact observation of a Match for the agent playing `side`."""
+    ball_x = (match.ball_x + BALL_SIZE / 2) / WIDTH
+    ball_y = (match.ball_y + BALL_SIZE / 2) / HEIGHT
+    player_y = (match.player_y + PADDLE_HEIGHT / 2) / HEIGHT
+    opponent_y = (match.opponent_y + PADDLE_HEIGHT / 2) / HEIGHT
+    if side == 'player':
+        return np.array([ball_x, ball_y, match.x_speed / MAX_BALL_SPEED, match.y_speed / MAX_BALL_SPEED,
+                         player_y, match.player_paddle_speed / MAX_PADDLE_SPEED, opponent_y,
+                         match.player_score, match.opponent_score], dtype=np.float32)
+    # Mirrored left to right, so the left paddle looks like the right one
+    return np.array([1 - ball_x, ball_y, -match.x_speed / MAX_BALL_SPEED, match.y_speed / MAX_BALL_SPEED,
+                     opponent_y, match.opponent_paddle_speed / MAX_PADDLE_SPEED, player_y,
+                     match.opponent_score, match.player_score], dtype=np.float32)
+
+
+def render_pixels(ball_x, ball_y, player_y, opponent_y, out):
+    """Rasterize the ball and paddles of N matches (arrays of length N) into out, an (N, *PIXEL_SHAPE) uint8 array."""
+    out.fill(0)
+    index = np.arange(len(out))
+    _fill_rects(out, index, np.full(len(out), PLAYER_X, dtype=np.float64), player_y, PADDLE_WIDTH, PADDLE_HEIGHT)
+    _fill_rects(out, index, np.full(len(out), OPPONENT_X, dtype=np.float64), opponent_y, PADDLE_WIDTH, PADDLE_HEIGHT)
+    _fill_rects(out, index, ball_x, ball_y, BALL_SIZE, BALL_SIZE)
+    return out
+
+
+def _fill_rect(frame, x, y, width, height):
+    """Scalar version of _fill_rects for a single (rows, cols) frame."""
+    rows, cols = PIXEL_SHAPE
+    top, bottom = max(int(y // PIXEL_SCALE), 0), min(int((y + height - 1) // PIXEL_SCALE), rows - 1)
+    left, right = max(int(x // PIXEL_SCALE), 0), min(int((x + width - 1) // PIXEL_SCALE), cols - 1)
+    frame[top:bottom + 1, left:right + 1] = 255
+
+
+def _fill_rects(out, index, x, y, width, height):
+    """Light every observation pixel touched by the playfield rect (x[i], y[i], width, height) of match i."""
+    rows, cols = PIXEL_SHAPE
+    top = np.clip(y // PIXEL_SCALE, 0, rows - 1).astype(np.int64)
+    bottom = np.clip((y + height - 1) // PIXEL_SCALE, 0, rows - 1).astype(np.int64)
+    left = np.clip(x // PIXEL_SCALE, 0, cols - 1).astype(np.int64)
+    right = np.clip((x + width - 1) // PIXEL_SCALE, 0, cols - 1).astype(np.int64)
+    # A rect covers at most this many observation pixels per axis, so loop over offsets instead of pixels
+    for dy in range(-(-height // PIXEL_SCALE) + 1):
+        row = top + dy
+        row_ok = row <= bottom
+        for dx in range(-(-width // PIXEL_SCALE) + 1):
+            col = left + dx
+            ok = row_ok & (col <= right)
+            out[index[ok], row[ok], col[ok]] = 255
+
+
+class PongEnv:
+    """
+    One match as an environment. Each step repeats the action for frame_skip physics
+    ticks; the reward is +1 for every point the agent scores and -1 for every point
+    the opponent AI scores. An episode ends when a side reaches points_to_win
+    (terminated) or after max_steps steps (truncated). Too slow to train on at scale
+    (see above); use VecPongEnv for that.
+    """
+
+    def __init__(self, seed=None, frame_skip=4, points_to_win=11, max_steps=10000, pixels=False,
+                 ball_speed=14, boss_mode=False, ai_difficulty=0.2):
+        self.frame_skip = frame_skip
+        self.points_to_win = points_to_win
+        self.max_steps = max_steps
+        self.pixels = pixels
+        self.settings = (ball_speed, boss_mode, ai_difficulty)
+        self.observation_shape = PIXEL_SHAPE if pixels else (len(OBSERVATION_FIELDS),)
+        self.action_count = ACTION_COUNT
+        self._seeds = random.Random(seed)
+        self.match = None
+        self.steps = 0
+
+    def reset(self, seed=None):
+        """Start a new episode; seed makes it (and the episodes after it) reproducible."""
+        if seed is not None:
+            self._seeds.seed(seed)
+        ball_speed, boss_mode, ai_difficulty = self.settings
+        self.match = Match(ball_speed=ball_speed, boss_mode=boss_mode, ai_difficulty=ai_difficulty,
+                           rng=CounterRNG(self._seeds.getrandbits(63)))
+        self.steps = 0
+        return self.observation(), {}
+
+    def step(self, action):
+        match = self.match
+        up, down = action == UP, action == DOWN
+        reward = 0.0
+        terminated = False
+        for _ in range(self.frame_skip):
+            scorer = match.step(up, down)
+            if scorer is not None:
+                reward += 1.0 if scorer == 'player' else -1.0
+                if max(match.player_score, match.opponent_score) >= self.points_to_win:
+                    terminated = True
+                    break
+        self.steps += 1
+        truncated = not terminated and self.steps >= self.max_steps
+        return self.observation(), reward, terminated, truncated, {}
+
+    def observation(self):
+        match = self.match
+        if self.pixels:
+            frame = np.zeros(PIXEL_SHAPE, dtype=np.uint8)
+            _fill_rect(frame, PLAYER_X, match.player_y, PADDLE_WIDTH, PADDLE_HEIGHT)
+            _fill_rect(frame, OPPONENT_X, match.opponent_y, PADDLE_WIDTH, PADDLE_HEIGHT)
+            _fill_rect(frame, match.ball_x, match.ball_y, BALL_SIZE, BALL_SIZE)
+            return frame
+        return observe(match)
+
+
+class VecPongEnv:
+    """
+    n independent environments stepped together on a pong_batch.BatchMatch. step takes
+    an array of n actions and returns arrays; environments that finish are reset in
+    place, with the observation they finished on in info['final_observation'].
+    Settings may be scalars or per-environment arrays.
+    """
+
+    def __init__(self, n, seed=None, frame_skip=4, points_to_win=11, max_steps=10000, pixels=False,
+                 ball_speed=14, boss_mode=False, ai_difficulty=0.2):
+        self.n = n
+        self.frame_skip = frame_skip
+        self.points_to_win = points_to_win
+        self.max_steps = max_steps
+        self.pixels = pixels
+        self.settings = (ball_speed, boss_mode, ai_difficulty)
+        self.observation_shape = PIXEL_SHAPE if pixels else (len(OBSERVATION_FIELDS),)
+        self.action_count = ACTION_COUNT
+        self.seed = seed
+        self.batch = None
+        self.steps = np.zeros(n, dtype=np.int64)
+        self._observations = np.zeros((n,) + self.observation_shape, dtype=np.uint8 if pixels else np.float32)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seed = seed
+        ball_speed, boss_mode, ai_difficulty = self.settings
+        self.batch = BatchMatch(self.n, seed=self.seed, ball_speed=ball_speed, boss_mode=boss_mode,
+                                ai_difficulty=ai_difficulty)
+        if self.seed is not None:
+            self.seed += self.n  # The next reset gets fresh streams
+        self.steps[:] = 0
+        return self.observation(), {}
+
+    def step(self, actions):
+        batch = self.batch
+        actions = np.asarray(actions)
+        up, down = actions == UP, actions == DOWN
+        reward = np.zeros(self.n, dtype=np.float32)
+        terminated = np.zeros(self.n, dtype=bool)
+        for _ in range(self.frame_skip):
+            player_scored, opponent_scored = batch.step(up, down)
+            # Environments that finished earlier in this step keep ticking but earn nothing more
+            reward += player_scored & ~terminated
+            reward -= opponent_scored & ~terminated
+            terminated |= np.maximum(batch.player_score, batch.opponent_score) >= self.points_to_win
+        self.steps += 1
+        truncated = ~terminated & (self.steps >= self.max_steps)
+
+        observation = self.observation()
+        info = {}
+        finished = terminated | truncated
+        if finished.any():
+            info['final_observation'] = observation.copy()
+            self._reset_rows(finished)
+            observation = self.observation()
+        return observation, reward, terminated, truncated, info
+
+    def _reset_rows(self, mask):
+        """Start new episodes in the environments selected by mask (their RNG streams carry on)."""
+        batch = self.batch
+        batch.player_score[mask] = 0
+        batch.opponent_score[mask] = 0
+        batch.player_y[mask] = PADDLE_START_Y
+        batch.opponent_y[mask] = PADDLE_START_Y
+        batch.player_paddle_speed[mask] = 0.0
+        batch.opponent_paddle_speed[mask] = 0.0
+        batch.reset_ball(mask, 'player')
+        self.steps[mask] = 0
+
+    def observation(self):
+        """Observations of every environment (a shared buffer: copy it to keep it past the next step)."""
+        batch, out = self.batch, self._observations
+        if self.pixels:
+            return render_pixels(batch.ball_x, batch.ball_y, batch.player_y, batch.opponent_y, out)
+        out[:, 0] = (batch.ball_x + BALL_SIZE / 2) / WIDTH
+        out[:, 1] = (batch.ball_y + BALL_SIZE / 2) / HEIGHT
+        out[:, 2] = batch.x_speed / MAX_BALL_SPEED
+        out[:, 3] = batch.y_speed / MAX_BALL_SPEED
+        out[:, 4] = (batch.player_y + PADDLE_HEIGHT / 2) / HEIGHT
+        out[:, 5] = batch.player_paddle_speed / MAX_PADDLE_SPEED
+        out[:, 6] = (batch.opponent_y + PADDLE_HEIGHT / 2) / HEIGHT
+        out[:, 7] = batch.player_score
+        out[:, 8] = batch.opponent_score
+        return out
+
+
+# -------------------- Throughput --------------------
+def steps_per_second(env, steps, vectorized):
+    rng = np.random.default_rng(0)
+    env.reset(seed=0)
+    if vectorized:
+        actions = rng.integers(0, ACTION_COUNT, size=(steps, env.n))
+    else:
+        actions = rng.integers(0, ACTION_COUNT, size=steps).tolist()
+    start = time.perf_counter()
+    for action in actions:
+        observation, reward, terminated, truncated, info = env.step(action)
+        if not vectorized and (terminated or truncated):
+            env.reset()
+    elapsed = time.perf_counter() - start
+    return steps * (env.n if vectorized else 1) / elapsed
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    print("PongEnv:                  %9.0f steps/s" % steps_per_second(PongEnv(), 20000, False))
+    print("PongEnv, pixels:          %9.0f steps/s" % steps_per_second(PongEnv(pixels=True), 20000, False))
+    print("VecPongEnv(%d):         %9.0f steps/s" % (n, steps_per_second(VecPongEnv(n), 200, True)))
+    print("VecPongEnv(%d), pixels: %9.0f steps/s" % (n, steps_per_second(VecPongEnv(n, pixels=True), 50, True)))
@@ -0,0 +1,180 @@
+import pygame, time
+from collections import deque
+
+# Frame pacing and input-to-photon latency. By default the main loop draws,
+# presents and then sleeps (CLOCK.tick), so a key pressed just after the input
+# was read waits out the sleep and a whole frame before it is seen on screen.
+# FramePacer in late mode moves the sleep to the other end of the frame: it
+# learns how long input + simulation + render + present take and wakes just
+# that long before the next present is due, so the input is read as late as
+# possible. LatencyMonitor timestamps key events and reports how long each took
+# to reach a presented frame.
+
+SPIN = 0.001  # The last stretch of a wait is spun instead of slept; sleeps overshoot by about this much
+WORK_HISTORY = 60  # Frames of work time the late pacer's estimate is taken from
+WORK_PERCENTILE = 0.95  # The wake-up leaves room for this share of recent frames (one-off stalls just miss)
+WORK_MARGIN = 0.0015  # Slack added to that when scheduling the wake-up
+VSYNC_FRAMES = 3  # Presents in a row that must wait for the refresh before the pacer locks onto it
+ALLOWANCE_DECAY = 0.998  # Per frame; the room left for present shrinks slowly back after a missed refresh
+
+KEY_EVENTS = (pygame.KEYDOWN, pygame.KEYUP)
+
+
+class FramePacer:
+    """
+    Holds the frame rate at fps. Call presenting() right before presenting a frame and
+    sleep() right after. late=False waits like pygame.time.Clock.tick (a full period
+    after the previous frame started); late=True wakes as late as the recent frames
+    allow while still presenting on time. If presents block (vsync), late mode locks
+    its deadlines onto the display's refresh. With a monitor, the wait keeps noting
+    when key events arrive.
+    """
+
+    def __init__(self, fps, late=True, monitor=None):
+        self.period = 1 / fps
+        self.late = late
+        self.monitor = monitor
+        self.work = deque(maxlen=WORK_HISTORY)  # Seconds from waking to handing the frame over, recent frames
+        self.allowance = 0.0  # Room left for present itself (not counting any wait for the refresh)
+        self.vsync = False  # Presents wait for the display's refresh
+        self._blocked = 0  # Presents in a row that took long enough to have waited for a refresh
+        self.woke = self.handed_over = time.perf_counter()
+        self.deadline = self.woke + self.period  # When the frame being built should be on screen
+        self.missed = 0  # Frames presented after their deadline (late mode)
+
+    def estimate(self):
+        """How long before a present is due the pacer wakes up."""
+        if not self.work:
+            return self.period / 2
+        work = sorted(self.work)
+        return work[int(WORK_PERCENTILE * (len(work) - 1))] + self.allowance + WORK_MARGIN
+
+    def frame_time(self):
+        """
+        The time the frame being built shows: its present deadline in late mode. Simulating up
+        to it rather than to the wake-up keeps the physics ticks in step with the frames, so
+        each frame's tick runs right after its input is read.
+        """
+        return self.deadline if self.late else time.perf_counter()
+
+    def restart(self):
+        """Forget the frame in progress (e.g. it was spent in a menu)."""
+        self.woke = self.handed_over = self.deadline = time.perf_counter()
+
+    def presenting(self):
+        self.handed_over = time.perf_counter()
+
+    def sleep(self):
+        now = time.perf_counter()
+        self.work.append(self.handed_over - self.woke)
+        if self.late:
+            presenting = now - self.handed_over
+            self.allowance *= ALLOWANCE_DECAY
+            # Nothing but waiting for the display's refresh makes present take that long, frame after frame
+            self._blocked = self._blocked + 1 if presenting > self.period / 4 else 0
+            if self._blocked >= VSYNC_FRAMES and not self.vsync:
+                self.vsync = True
+                self.allowance = 0.0  # Those presents were mostly waiting, not working
+            elif now > self.deadline + self.period / 2:
+                self.missed += 1
+                self.allowance = min(self.allowance + WORK_MARGIN, self.period)  # Handed over too late: leave more room
+            if self.vsync:
+                self.deadline = now  # Presents return at the refresh: stay in phase with the display
+            elif not self._blocked:
+                self.allowance = max(self.allowance, presenting)
+            estimate = min(self.estimate(), self.period)
+            deadline = self.deadline + self.period
+            while deadline - estimate < now:
+                deadline += self.period  # Too late for that slot: skip it rather than present late
+            self.deadline = deadline
+            wake = deadline - estimate
+        else:
+            wake = max(self.woke + self.period, now)
+        self._wait_until(wake)
+        self.woke = time.perf_counter()
+
+    def _wait_until(self, wake):
+        monitor = self.monitor
+        while True:
+            if monitor:
+                monitor.poll()
+            remaining = wake - time.perf_counter()
+            if remaining <= 0:
+                return
+            if remaining > SPIN:
+                # Short sleeps while monitoring, so a key event's arrival is noted within a millisecond
+                time.sleep(min(remaining - SPIN, SPIN) if monitor else remaining - SPIN)
+
+    def report(self):
+        mode = ("late input (wakes %.2f ms before present%s)" % (self.estimate() * 1000, ", vsync" if self.vsync else "")
+                if self.late else "sleep after present")
+        text = "Pacing: %.0f fps, %s" % (1 / self.period, mode)
+        if self.late:
+            text += ", %d missed deadlines" % self.missed
+        return text
+
+
+class LatencyMonitor:
+    """
+    Input-to-photon latency of the keys in `keys`. The main loop passes each frame's
+    events to events(), calls sampled() wherever the simulation reads the keyboard
+    and presented() once the frame is on screen. An event's latency runs from when
+    it was first seen in the queue to the present of the first frame simulated after
+    it; photons leave the display later by its own (fixed) processing lag. Arrival
+    times come from looking at the queue, so they are only as exact as the gaps
+    between looks (see events()).
+    """
+
+    def __init__(self, keys):
+        self.keys = set(keys)
+        self.queued_since = None  # When poll() first saw key events waiting in the queue
+        self.checked = time.perf_counter()  # When the queue was last seen without key events
+        self.pending = []  # Arrival times of events no frame has simulated yet
+        self.in_frame = []  # Arrival times of events the frame being drawn reflects
+        self.latencies = []  # Seconds, one per event
+
+    def poll(self):
+        """Notice key events waiting in the queue (cheap; called while the main loop sleeps)."""
+        if self.queued_since is None:
+            if pygame.event.peek(KEY_EVENTS):
+                self.queued_since = time.perf_counter()
+            else:
+                self.checked = time.perf_counter()
+
+    def events(self, events):
+        # The events arrived somewhere between the last empty look at the queue and the first one that
+        # saw them: a millisecond apart while the pacer sleeps, up to a frame apart when present blocks
+        now = time.perf_counter()
+        arrived = (self.checked + (self.queued_since or now)) / 2
+        self.queued_since = None
+        self.checked = now
+        for event in events:
+            if event.type in KEY_EVENTS and event.key in self.keys:
+                self.pending.append(arrived)
+
+    def sampled(self):
+        """The simulation just read the keyboard: everything pending is in this frame."""
+        if self.pending:
+            self.in_frame.extend(self.pending)
+            self.pending.clear()
+
+    def presented(self):
+        if self.in_frame:
+            now = time.perf_counter()
+            self.latencies.extend(now - arrived for arrived in self.in_frame)
+            self.in_frame.clear()
+
+    def stats(self):
+        """Count, mean, p50, p95 and max latency in seconds."""
+        ordered = sorted(self.latencies)
+        if not ordered:
+            return 0, 0.0, 0.0, 0.0, 0.0
+        return (len(ordered), sum(ordered) / len(ordered), ordered[len(ordered) // 2],
+                ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], ordered[-1])
+
+    def report(self):
+        count, mean, p50, p95, worst = self.stats()
+        if not count:
+            return "Input latency: no key events measured"
+        return ("Input latency (key event to present, %d events): mean %.1f ms, p50 %.1f ms, p95 %.1f ms, max %.1f ms"
+                % (count, mean * 1000, p50 * 1000, p95 * 1000, worst * 1000))
@@ -0,0 +1,131 @@
+import gc, sys, time, tracemalloc
+from array import array
+
+# Garbage collection control and allocation profiling. Almost everything a
+# frame allocates is freed again by reference counting the moment it is no
+# longer used; the cyclic collector only runs once enough container objects
+# (tuples, lists, dicts, instances) have been created without being freed, and
+# then it walks every tracked object, startup ones included. SteadyGC moves the
+# startup objects out of its way (gc.freeze) and holds collections back for
+# the breaks in play: a point, a menu. AllocationProfiler measures what each
+# frame allocates and where memory is being kept, so a change that starts
+# allocating in the loop shows up.
+
+YOUNG_CEILING = 50000  # Uncollected container objects after which a young collection runs anyway (a very long rally)
+PROFILE_FRAMES = 36000  # Frames the allocation profiler keeps (10 minutes at 60 fps)
+TOP_SITES = 10  # Allocation sites listed in the profiler's report
+
+
+class SteadyGC:
+    """
+    Steady-state garbage collection. freeze() once startup is done moves every object
+    alive at that point out of the collector's reach and switches automatic collection
+    off; the game then calls collect() at a break in play and check() once per frame,
+    which only collects if garbage has piled up far past the usual threshold.
+    """
+
+    def __init__(self):
+        self.frozen = 0  # Objects moved out of the collector's reach
+        self.collections = 0  # Collections at breaks
+        self.forced = 0  # Collections check() had to run mid-play
+        self.longest = 0.0  # Seconds, the longest collection
+
+    def freeze(self):
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+        self.frozen = gc.get_freeze_count()
+
+    def collect(self):
+        """Collect now; call it where a pause in the action hides the time it takes."""
+        start = time.perf_counter()
+        gc.collect()
+        self.longest = max(self.longest, time.perf_counter() - start)
+        self.collections += 1
+
+    def check(self):
+        if gc.get_count()[0] > YOUNG_CEILING:
+            start = time.perf_counter()
+            gc.collect(0)
+            self.longest = max(self.longest, time.perf_counter() - start)
+            self.forced += 1
+
+    def report(self):
+        return ("GC: %d objects frozen at startup, %d collections at breaks, %d forced mid-play, longest %.2f ms"
+                % (self.frozen, self.collections, self.forced, self.longest * 1000))
+
+
+class AllocationProfiler:
+    """
+    Per-frame allocations, traced with tracemalloc. start() begins tracing and takes the
+    baseline; end_frame() records, for the frame just finished, the memory blocks still
+    allocated at its end (net, so anything kept shows up), the bytes allocated and freed
+    again within it (the peak over where it started) and the container objects it left
+    for the collector. report() summarizes them and lists the sites holding the most
+    memory allocated since start().
+    """
+
+    def __init__(self, frames=PROFILE_FRAMES, top=TOP_SITES):
+        self.top = top
+        self.blocks = array('q')  # Net memory blocks per frame
+        self.transient = array('q')  # Bytes allocated and freed again within the frame
+        self.containers = array('q')  # Net container objects per frame (what advances the collector)
+        self.frames = frames
+        self._baseline = None
+
+    def start(self):
+        tracemalloc.start()
+        self._baseline = tracemalloc.take_snapshot()
+        self._mark()
+
+    def _mark(self):
+        tracemalloc.reset_peak()
+        self._memory = tracemalloc.get_traced_memory()[0]
+        self._blocks = sys.getallocatedblocks()
+        self._containers = gc.get_count()[0]
+
+    def end_frame(self):
+        if self._baseline is None or len(self.blocks) >= self.frames:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        count = gc.get_count()[0]
+        self.blocks.append(sys.getallocatedblocks() - self._blocks)
+        self.transient.append(peak - max(current, self._memory))
+        # A collection in the frame resets the count; the frame's own share is then unknown
+        self.containers.append(count - self._containers if count >= self._containers else 0)
+        self._mark()
+
+    def discard_frame(self):
+        """Don't count the frame in progress (e.g. it was spent in a menu)."""
+        self._mark()
+
+    def top_sites(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),  # The profiler's own per-frame arrays
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+        differences = snapshot.compare_to(self._baseline, 'lineno')
+        return [difference for difference in differences if difference.size_diff > 0][:self.top]
+
+    def report(self):
+        if not self.blocks:
+            return "Allocations: no frames profiled"
+        frames = len(self.blocks)
+        lines = ["Allocations over %d frames (per frame): net blocks mean %.2f, max %d; "
+                 "transient KiB mean %.1f, max %.1f; containers left for the GC mean %.2f, total %d"
+                 % (frames, sum(self.blocks) / frames, max(self.blocks),
+                    sum(self.transient) / frames / 1024, max(self.transient) / 1024,
+                    sum(self.containers) / frames, sum(self.containers))]
+        lines.append("Top allocation sites since startup:")
+        for difference in self.top_sites():
+            frame = difference.traceback[0]
+            lines.append("  %8.1f KiB %7d blocks  %s:%d"
+                         % (difference.size_diff / 1024, difference.count_diff, frame.filename, frame.lineno))
+        return "\n".join(lines)
+
+    def stop(self):
+        """Stop tracing (and free the traces); call it once the report is written."""
+        tracemalloc.stop()
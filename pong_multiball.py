@@ -0,0 +1,329 @@
+import sys, time, argparse
+import numpy as np
+
+from pong_engine import WIDTH, HEIGHT, PLAYER_X, OPPONENT_X, PADDLE_WIDTH, PADDLE_HEIGHT, BALL_SIZE, MAX_BALL_SPEED
+from pong_batch import paddle_time_of_impact, paddle_bounce, sweep_interval
+
+# Chaos mode: hundreds to thousands of balls in one field, bouncing off the
+# paddles (same swept test and bounce model as the single ball, through the
+# vectorized rules in pong_batch.py), the walls and each other. Balls live in
+# flat arrays; ball-ball contacts are found with a uniform-grid spatial hash so
+# only balls in neighbouring cells are ever compared.
+#     python pong_multiball.py                    frame time against ball count
+#     python pong_multiball.py --plot scaling.png  ...and plot it (needs matplotlib)
+
+CELL_SIZE = BALL_SIZE  # At least a ball wide: touching balls share a cell or are in neighbouring ones
+MIN_X_SPEED = 2.0  # Ball-ball hits can leave a ball moving almost vertically; keep it crossing the field
+SERVE_SPEED = 14
+
+# Neighbouring cells to compare with, as (column, row) offsets. Half of the 3x3 block is
+# enough: the other half is covered when the neighbour compares back with this cell.
+HALF_NEIGHBOURHOOD = ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+
+class SpatialHash:
+    """Uniform grid over the field. Rebuilt from scratch each step by sorting the balls by cell."""
+
+    def __init__(self, width=WIDTH, height=HEIGHT, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cols = int(width // cell_size) + 1
+        self.rows = int(height // cell_size) + 1
+
+    def pairs(self, x, y):
+        """
+        Candidate pairs (first, second) of indices into x/y (ball centers) that are in the same or
+        neighbouring cells, each pair once.
+        """
+        col = np.clip((x // self.cell_size).astype(np.int64), 0, self.cols - 1)
+        row = np.clip((y // self.cell_size).astype(np.int64), 0, self.rows - 1)
+        cell = row * self.cols + col
+        order = np.argsort(cell, kind='stable')  # Ball indices grouped by cell
+        counts = np.bincount(cell, minlength=self.rows * self.cols)
+        starts = np.cumsum(counts) - counts
+
+        firsts, seconds = [], []
+        for column_offset, row_offset in HALF_NEIGHBOURHOOD:
+            neighbour_col, neighbour_row = col + column_offset, row + row_offset
+            inside = (neighbour_col >= 0) & (neighbour_col < self.cols) & (neighbour_row < self.rows)
+            balls = np.nonzero(inside)[0]
+            neighbour = neighbour_row[balls] * self.cols + neighbour_col[balls]
+            # k-th ball of each neighbouring cell, for as long as any cell still has one
+            k = 0
+            while len(balls):
+                more = counts[neighbour] > k
+                balls, neighbour = balls[more], neighbour[more]
+                other = order[starts[neighbour] + k]
+                if column_offset == row_offset == 0:
+                    keep = other > balls  # Same cell: each pair once, and not a ball with itself
+                    firsts.append(balls[keep])
+                    seconds.append(other[keep])
+                else:
+                    firsts.append(balls)
+                    seconds.append(other)
+                k += 1
+        if not firsts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(firsts), np.concatenate(seconds)
+
+
+def naive_pairs(x, y):
+    """Every pair (first, second), first < second: what the spatial hash saves us from testing."""
+    return np.triu_indices(len(x), 1)
+
+
+class BallSwarm:
+    """
+    The extra balls of chaos mode. The live balls are the first `count` entries of the
+    arrays; a ball that scores is served again in its own slot, so balls are only ever added.
+    """
+
+    def __init__(self, capacity=256, seed=None, ball_speed=SERVE_SPEED, broadphase=None):
+        self.count = 0
+        self.ball_speed = ball_speed
+        self.rng = np.random.default_rng(seed)
+        self.broadphase = broadphase or SpatialHash().pairs
+        self.capacity = capacity
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.x_speed = np.zeros(capacity)
+        self.y_speed = np.zeros(capacity)
+        self.previous_x = np.zeros(capacity)
+        self.previous_y = np.zeros(capacity)
+        self.contacts = 0  # Ball-ball contacts resolved by the last step
+
+    def _allocate(self, capacity):
+        """Grow the arrays to hold capacity balls, keeping the live ones."""
+        def grow(values):
+            array = np.zeros(capacity)
+            array[:self.count] = values[:self.count]
+            return array
+
+        self.x, self.y = grow(self.x), grow(self.y)
+        self.x_speed, self.y_speed = grow(self.x_speed), grow(self.y_speed)
+        self.previous_x, self.previous_y = grow(self.previous_x), grow(self.previous_y)
+        self.capacity = capacity
+
+    def spawn(self, n):
+        """Add n balls served from random points on the center line."""
+        if self.count + n > self.capacity:
+            self._allocate(max(self.count + n, 2 * self.capacity))
+        new = slice(self.count, self.count + n)
+        self.count += n
+        self.x[new] = WIDTH / 2 - BALL_SIZE / 2
+        self.y[new] = self.rng.uniform(0, HEIGHT - BALL_SIZE, n)
+        self._serve(np.arange(new.start, new.stop))
+        self.previous_x[new], self.previous_y[new] = self.x[new], self.y[new]
+
+    def _serve(self, index):
+        """Send the balls at index off in random directions, like Match.reset_ball outside boss mode."""
+        n = len(index)
+        self.x_speed[index] = np.where(self.rng.random(n) < 0.5, -self.ball_speed, self.ball_speed)
+        self.y_speed[index] = np.where(self.rng.random(n) < 0.5, -self.ball_speed / 2, self.ball_speed / 2)
+
+    # -------------------- Simulation --------------------
+    def step(self, player_y, opponent_y):
+        """One physics tick against the paddles at player_y / opponent_y. Returns (player_points, opponent_points)."""
+        n = self.count
+        x, y, x_speed, y_speed = self.x[:n], self.y[:n], self.x_speed[:n], self.y_speed[:n]
+        self.previous_x[:n], self.previous_y[:n] = x, y
+
+        # Swept paddle collisions, as in Match.move_ball
+        remaining = np.ones(n)
+        for _ in range(2):
+            toward_player = x_speed > 0
+            time_of_impact = paddle_time_of_impact(x, y, x_speed, y_speed, toward_player,
+                                                   np.where(toward_player, player_y, opponent_y), remaining)
+            hit = ~np.isnan(time_of_impact)
+            if not hit.any():
+                break
+            time_of_impact = np.where(hit, time_of_impact, 0.0)
+            x += x_speed * time_of_impact
+            y += y_speed * time_of_impact
+            self._bounce(hit & toward_player, 'player', player_y)
+            self._bounce(hit & ~toward_player, 'opponent', opponent_y)
+            remaining -= time_of_impact
+        x += x_speed * remaining
+        y += y_speed * remaining
+
+        self.collide()
+
+        # Walls
+        top = y <= 0
+        y[top] = 0
+        y_speed[top] = np.abs(y_speed[top])
+        bottom = y + BALL_SIZE >= HEIGHT
+        y[bottom] = HEIGHT - BALL_SIZE
+        y_speed[bottom] = -np.abs(y_speed[bottom])
+
+        # Scoring: a ball that leaves the field is served again from the center line
+        player_scored = x <= 0
+        opponent_scored = x + BALL_SIZE >= WIDTH
+        out = np.nonzero(player_scored | opponent_scored)[0]
+        if len(out):
+            x[out] = WIDTH / 2 - BALL_SIZE / 2
+            self.previous_x[out], self.previous_y[out] = x[out], y[out]
+            self._serve(out)
+
+        # Paddles the sweep couldn't see (a paddle moved into a ball, a ball pushed into a paddle)
+        self._bounce(overlaps_paddle(x, y, PLAYER_X, player_y), 'player', player_y)
+        self._bounce(overlaps_paddle(x, y, OPPONENT_X, opponent_y), 'opponent', opponent_y)
+        return int(player_scored.sum()), int(opponent_scored.sum())
+
+    def _bounce(self, mask, side, paddle_y):
+        if not mask.any():
+            return
+        index = np.nonzero(mask)[0]
+        self.x[index] = PLAYER_X - BALL_SIZE if side == 'player' else OPPONENT_X + PADDLE_WIDTH
+        self.x_speed[index], self.y_speed[index] = paddle_bounce(self.y[index], self.x_speed[index], self.y_speed[index],
+                                                                 paddle_y, side, self.rng.random(len(index)))
+
+    def collide(self):
+        """Elastic collisions between touching balls (equal masses, balls as circles of BALL_SIZE diameter)."""
+        n = self.count
+        x, y, x_speed, y_speed = self.x[:n], self.y[:n], self.x_speed[:n], self.y_speed[:n]
+        first, second = self.broadphase(x + BALL_SIZE / 2, y + BALL_SIZE / 2)
+
+        # Narrow phase: keep the candidate pairs that really touch
+        dx, dy = x[second] - x[first], y[second] - y[first]
+        distance_squared = dx * dx + dy * dy
+        touching = (distance_squared < BALL_SIZE * BALL_SIZE) & (distance_squared > 0)
+        first, second, dx, dy = first[touching], second[touching], dx[touching], dy[touching]
+        self.contacts = len(first)
+        if not self.contacts:
+            return
+        distance = np.sqrt(distance_squared[touching])
+        normal_x, normal_y = dx / distance, dy / distance
+
+        # Swap the velocity components along the line between the centers, for pairs moving together
+        closing = (x_speed[first] - x_speed[second]) * normal_x + (y_speed[first] - y_speed[second]) * normal_y
+        closing = np.maximum(closing, 0.0)
+        np.add.at(x_speed, first, -closing * normal_x)
+        np.add.at(y_speed, first, -closing * normal_y)
+        np.add.at(x_speed, second, closing * normal_x)
+        np.add.at(y_speed, second, closing * normal_y)
+
+        # Push overlapping balls apart, half the overlap each
+        push = (BALL_SIZE - distance) / 2
+        np.add.at(x, first, -push * normal_x)
+        np.add.at(y, first, -push * normal_y)
+        np.add.at(x, second, push * normal_x)
+        np.add.at(y, second, push * normal_y)
+
+        # Same limits as a paddle bounce, plus enough horizontal speed to keep the ball in play
+        speed = np.sqrt(x_speed * x_speed + y_speed * y_speed)
+        scale = np.where(speed > MAX_BALL_SPEED, MAX_BALL_SPEED / np.maximum(speed, 1e-9), 1.0)
+        x_speed *= scale
+        y_speed *= scale
+        slow = np.abs(x_speed) < MIN_X_SPEED
+        x_speed[slow] = np.where(x_speed[slow] < 0, -MIN_X_SPEED, MIN_X_SPEED)
+
+    def positions(self, alpha=1.0):
+        """Ball positions alpha of the way through the last tick, as lists for blitting."""
+        n = self.count
+        x = self.previous_x[:n] + (self.x[:n] - self.previous_x[:n]) * alpha
+        y = self.previous_y[:n] + (self.y[:n] - self.previous_y[:n]) * alpha
+        return x.tolist(), y.tolist()
+
+
+def overlaps_paddle(x, y, paddle_x, paddle_y):
+    """Vectorized Match.ball_hits_paddle for every ball against one paddle."""
+    return (x < paddle_x + PADDLE_WIDTH) & (paddle_x < x + BALL_SIZE) & (y < paddle_y + PADDLE_HEIGHT) & (paddle_y < y + BALL_SIZE)
+
+
+# -------------------- Scaling benchmark --------------------
+def time_steps(count, broadphase, steps, seed=1):
+    """Seconds per step of a swarm of count balls (median of steps after a short warm-up)."""
+    swarm = BallSwarm(count, seed=seed, broadphase=broadphase)
+    swarm.spawn(count)
+    paddle_y = HEIGHT / 2 - PADDLE_HEIGHT / 2
+    for _ in range(10):
+        swarm.step(paddle_y, paddle_y)
+    samples = []
+    for _ in range(steps):
+        start = time.perf_counter()
+        swarm.step(paddle_y, paddle_y)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2], swarm.contacts
+
+
+def time_draw(count, steps, seed=1):
+    """Seconds to blit count ball sprites onto a game-sized surface (median), headless."""
+    import os
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from pong_render import render_ball
+    pygame.display.init()
+    screen = pygame.Surface((WIDTH, HEIGHT))
+    swarm = BallSwarm(count, seed=seed)
+    swarm.spawn(count)
+    sprite = render_ball("orange", (BALL_SIZE, BALL_SIZE))
+    xs, ys = swarm.positions()
+    samples = []
+    for _ in range(steps):
+        start = time.perf_counter()
+        screen.blits([(sprite, (bx, by)) for bx, by in zip(xs, ys)], doreturn=False)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def ascii_plot(counts, series, width=60):
+    """One bar per ball count for each series of milliseconds, scaled to the largest value."""
+    longest = max(value for values in series.values() for value in values if value is not None)
+    lines = []
+    for name, values in series.items():
+        lines.append(name)
+        for count, value in zip(counts, values):
+            if value is not None:
+                lines.append("%6d |%-*s %.2f ms" % (count, width, "#" * max(1, int(width * value / longest)), value))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chaos-mode frame time against ball count")
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 250, 500, 1000, 2000, 4000])
+    parser.add_argument("--steps", type=int, default=60, help="timed steps per ball count")
+    parser.add_argument("--naive-limit", type=int, default=2000, help="largest count to time with naive pairwise checks")
+    parser.add_argument("--plot", metavar="FILE", help="also save a plot to FILE (needs matplotlib)")
+    args = parser.parse_args(argv)
+
+    grid, naive, draw = [], [], []
+    print("%6s %12s %12s %12s %12s %9s" % ("balls", "grid ms", "naive ms", "draw ms", "frame ms", "contacts"))
+    for count in args.counts:
+        grid_time, contacts = time_steps(count, None, args.steps)
+        naive_time = time_steps(count, naive_pairs, max(3, args.steps // 10))[0] if count <= args.naive_limit else None
+        draw_time = time_draw(count, args.steps)
+        grid.append(grid_time * 1000)
+        naive.append(naive_time * 1000 if naive_time is not None else None)
+        draw.append(draw_time * 1000)
+        print("%6d %12.3f %12s %12.3f %12.3f %9d" % (count, grid[-1], "%.3f" % naive[-1] if naive[-1] is not None else "-",
+                                                   draw[-1], grid[-1] + draw[-1], contacts))
+    print("")
+    print(ascii_plot(args.counts, {"grid physics + draw (frame)": [g + d for g, d in zip(grid, draw)],
+                                   "naive physics": naive}))
+    print("(60 FPS budget: 16.7 ms)")
+
+    if args.plot:
+        try:
+            import matplotlib
+            matplotlib.use("Agg")
+            import matplotlib.pyplot as plt
+        except ImportError:
+            print("matplotlib is not installed; no plot written", file=sys.stderr)
+            return 1
+        plt.plot(args.counts, [g + d for g, d in zip(grid, draw)], marker="o", label="spatial hash (physics + draw)")
+        plt.plot(args.counts, grid, marker="o", label="spatial hash (physics)")
+        measured = [(count, value) for count, value in zip(args.counts, naive) if value is not None]
+        plt.plot([count for count, _ in measured], [value for _, value in measured], marker="o", label="naive pairs (physics)")
+        plt.axhline(1000 / 60, color="gray", linestyle="--", label="60 FPS budget")
+        plt.xlabel("balls")
+        plt.ylabel("ms per frame")
+        plt.legend()
+        plt.savefig(args.plot)
+        print("plot saved to %s" % args.plot)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
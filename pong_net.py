@@ -0,0 +1,586 @@
+import asyncio, socket, struct, random, time, heapq, argparse, sys
+from collections import deque, OrderedDict
+
+from pong_engine import Match, CounterRNG, autopilot
+from pong_replay import INPUT_UP, INPUT_DOWN
+
+# Online play. One server process runs many rooms, each an authoritative Match,
+# on a shared fixed-tick scheduler; clients send their inputs over UDP and get
+# back snapshots of the match, delta-compressed against the last snapshot they
+# acknowledged. Clients predict their own paddle (and the ball) by running the
+# same rules locally and reconcile whenever a snapshot arrives.
+#     python pong_net.py --port 7777                               run a server
+#     python pong_MAIN.py --connect 127.0.0.1:7777 --room 3        play in room 3
+#     python pong_net.py --bots 100 --connect 127.0.0.1:7777 --latency 60 --loss 0.05
+#     python pong_net.py --bench 500                               server cost for 500 full rooms
+
+TICK_HZ = 60  # Same as PHYSICS_HZ in pong_MAIN.py
+TICK = 1 / TICK_HZ
+SNAPSHOT_EVERY = 2  # Ticks between snapshots (30 per second)
+SNAPSHOT_HISTORY = 32  # Snapshots kept per client as delta bases
+REDUNDANT_INPUTS = 8  # Each input packet repeats this many recent inputs, so a lost packet costs nothing
+MAX_QUEUED_INPUTS = 6  # Inputs buffered per seat on the server; beyond that the oldest are dropped to cut latency
+MAX_CATCH_UP_TICKS = 5
+CLIENT_TIMEOUT = 5.0  # Seconds of silence before a client loses its seat
+
+# Seats: the first client in a room plays the right paddle (the game's player), the
+# second the left one; until a second client joins, the opponent AI plays it.
+PLAYER_SEAT, OPPONENT_SEAT = 0, 1
+SIDES = ('player', 'opponent')
+
+# -------------------- Protocol --------------------
+# Every packet starts with its type byte.
+JOIN, WELCOME, FULL, INPUT, SNAPSHOT, LEAVE = range(6)
+JOIN_PACKET = struct.Struct("<BI")  # type, room
+WELCOME_PACKET = struct.Struct("<BBI")  # type, seat, room
+INPUT_HEADER = struct.Struct("<BIIB")  # type, newest input seq, last snapshot tick received, count; then count input bytes
+SNAPSHOT_HEADER = struct.Struct("<BIIIHH")  # type, tick, base tick, last input seq applied for you,
+                                            # ticks run since then on a repeat of it, changed-field mask
+MAX_REPEATED = 0xFFFF
+NO_BASE = 0xFFFFFFFF  # Base tick of a full snapshot
+
+# Snapshot contents. Doubles are sent exactly so prediction runs on the server's numbers.
+NET_FIELDS = (('ball_x', 'd'), ('ball_y', 'd'), ('x_speed', 'd'), ('y_speed', 'd'),
+              ('player_y', 'd'), ('opponent_y', 'd'), ('player_paddle_speed', 'd'), ('opponent_paddle_speed', 'd'),
+              ('player_score', 'H'), ('opponent_score', 'H'), ('rng_seed', 'Q'), ('rng_counter', 'Q'),
+              ('ball_speed', 'd'), ('boss_mode', 'B'), ('ai_difficulty', 'd'), ('inputs', 'B'))
+INPUTS_OPPONENT_HUMAN = 0x10  # Flag in the 'inputs' field: a client plays the left paddle
+_field_structs = {}  # Changed-field mask -> Struct for those fields
+
+
+def field_struct(mask):
+    packer = _field_structs.get(mask)
+    if packer is None:
+        packer = struct.Struct("<" + "".join(code for i, (_, code) in enumerate(NET_FIELDS) if mask >> i & 1))
+        _field_structs[mask] = packer
+    return packer
+
+
+def encode_snapshot(tick, base_tick, ack_seq, repeated, values, base_values=None):
+    """A snapshot packet holding only the fields that differ from base_values (all of them without a base)."""
+    if base_values is None:
+        mask = (1 << len(NET_FIELDS)) - 1
+        changed = values
+    else:
+        mask = 0
+        changed = []
+        for i, value in enumerate(values):
+            if value != base_values[i]:
+                mask |= 1 << i
+                changed.append(value)
+    return (SNAPSHOT_HEADER.pack(SNAPSHOT, tick, base_tick, ack_seq, min(repeated, MAX_REPEATED), mask)
+            + field_struct(mask).pack(*changed))
+
+
+def decode_snapshot(data, bases):
+    """(tick, ack_seq, repeated, values) from a snapshot packet, or None if its delta base is no longer in `bases`."""
+    _, tick, base_tick, ack_seq, repeated, mask = SNAPSHOT_HEADER.unpack_from(data)
+    changed = iter(field_struct(mask).unpack_from(data, SNAPSHOT_HEADER.size))
+    if base_tick == NO_BASE:
+        return tick, ack_seq, repeated, tuple(changed)
+    base = bases.get(base_tick)
+    if base is None:
+        return None
+    return tick, ack_seq, repeated, tuple(next(changed) if mask >> i & 1 else value for i, value in enumerate(base))
+
+
+def match_values(match, inputs):
+    """The NET_FIELDS of a match; `inputs` packs both seats' current input bits."""
+    seed, counter = match.rng.getstate()
+    return (match.ball_x, match.ball_y, match.x_speed, match.y_speed,
+            match.player_y, match.opponent_y, match.player_paddle_speed, match.opponent_paddle_speed,
+            match.player_score, match.opponent_score, seed, counter,
+            match.ball_speed, match.boss_mode, match.ai_difficulty, inputs)
+
+
+def apply_values(match, values):
+    """Put a snapshot's values into a match. Returns the 'inputs' field."""
+    (match.ball_x, match.ball_y, match.x_speed, match.y_speed,
+     match.player_y, match.opponent_y, match.player_paddle_speed, match.opponent_paddle_speed,
+     match.player_score, match.opponent_score, seed, counter,
+     match.ball_speed, boss_mode, match.ai_difficulty, inputs) = values
+    match.boss_mode = bool(boss_mode)
+    match.rng.setstate((seed, counter))
+    match.intercept = None
+    return inputs
+
+
+def advance(match, player_input, opponent_input=None):
+    """
+    One tick of a networked match, identical on server and client. Inputs are INPUT_UP/INPUT_DOWN
+    bits; with opponent_input None the opponent AI plays the left paddle, exactly as in Match.step.
+    """
+    up, down = bool(player_input & INPUT_UP), bool(player_input & INPUT_DOWN)
+    if opponent_input is None:
+        return match.step(up, down)
+    match.save_previous()
+    scorer = match.move_ball()
+    match.steer_paddle('player', up, down)
+    match.steer_paddle('opponent', bool(opponent_input & INPUT_UP), bool(opponent_input & INPUT_DOWN))
+    match.frame += 1
+    return scorer
+
+
+class LinkConditioner:
+    """
+    Outgoing packets go through here so a localhost test can see a bad network:
+    each packet is dropped with probability `loss`, otherwise held back for
+    latency + up to `jitter` seconds. flush() sends whatever is due.
+    """
+
+    def __init__(self, sendto, latency=0.0, jitter=0.0, loss=0.0, seed=None):
+        self.sendto = sendto
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.queue = []  # Heap of (due time, order, data, address)
+        self.order = 0
+        self.sent = self.dropped = self.bytes = 0
+
+    def send(self, data, address):
+        if self.loss and self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        self.sent += 1
+        self.bytes += len(data)
+        if not self.latency and not self.jitter:
+            self._sendto(data, address)
+            return
+        self.order += 1
+        due = time.perf_counter() + self.latency + self.rng.random() * self.jitter
+        heapq.heappush(self.queue, (due, self.order, data, address))
+
+    def flush(self):
+        now = time.perf_counter()
+        queue = self.queue
+        while queue and queue[0][0] <= now:
+            _, _, data, address = heapq.heappop(queue)
+            self._sendto(data, address)
+
+    def _sendto(self, data, address):
+        try:
+            self.sendto(data, address)
+        except OSError:
+            pass  # UDP: an unreachable peer is the same as a lost packet
+
+
+# -------------------- Server --------------------
+class Seat:
+    """A client's place in a room: its address, queued inputs and delta-compression state."""
+
+    def __init__(self, address, room, seat):
+        self.address = address
+        self.room = room
+        self.seat = seat
+        self.inputs = deque()  # (seq, bits) not yet applied
+        self.received_seq = 0  # Newest input seq received
+        self.applied_seq = 0  # Newest input seq applied to the match
+        self.bits = 0  # Input in use (repeated while the queue is empty)
+        self.repeated = 0  # Ticks run on a repeat of bits since applied_seq, because the queue was empty
+        self.acked_tick = NO_BASE  # Newest snapshot the client says it has
+        self.sent = OrderedDict()  # tick -> values of the snapshots sent, for delta bases
+        self.last_heard = time.monotonic()
+
+    def queue_inputs(self, newest_seq, inputs):
+        first_seq = newest_seq - len(inputs) + 1
+        for offset, bits in enumerate(inputs):
+            seq = first_seq + offset
+            if seq > self.received_seq:
+                self.inputs.append((seq, bits))
+                self.received_seq = seq
+        while len(self.inputs) > MAX_QUEUED_INPUTS:
+            self.inputs.popleft()
+
+    def next_input(self):
+        """
+        The input for this tick. Inputs are consumed one per tick: when the queue runs dry the last
+        bits stand in for the missing input, and the late one is skipped when it arrives, so every
+        input seq still maps to exactly one tick and the client's replay lines up with the server.
+        """
+        while self.inputs and self.repeated:
+            self.applied_seq = self.inputs.popleft()[0]  # Its tick already ran on the repeated bits
+            self.repeated -= 1
+        if self.inputs:
+            self.applied_seq, self.bits = self.inputs.popleft()
+        elif self.applied_seq:
+            self.repeated += 1  # (Ticks before the first input are the snapshot the client starts from)
+        return self.bits
+
+
+class Room:
+    """One authoritative match and the (up to two) clients playing it."""
+
+    def __init__(self, room_id, seed, ball_speed=14, boss_mode=False, ai_difficulty=0.2):
+        self.id = room_id
+        self.match = Match(ball_speed=ball_speed, boss_mode=boss_mode, ai_difficulty=ai_difficulty,
+                           rng=CounterRNG(seed))
+        self.seats = [None, None]
+        self.tick_count = 0
+
+    def tick(self):
+        player, opponent = self.seats
+        player_input = player.next_input() if player else 0
+        opponent_input = opponent.next_input() if opponent else None
+        advance(self.match, player_input, opponent_input)
+        self.tick_count += 1
+
+    def send_snapshots(self, send):
+        player, opponent = self.seats
+        inputs = (player.bits if player else 0) | ((opponent.bits << 2 | INPUTS_OPPONENT_HUMAN) if opponent else 0)
+        values = match_values(self.match, inputs)
+        tick = self.tick_count
+        for seat in self.seats:
+            if seat is None:
+                continue
+            base = seat.sent.get(seat.acked_tick)
+            if base is None:
+                data = encode_snapshot(tick, NO_BASE, seat.applied_seq, seat.repeated, values)
+            else:
+                data = encode_snapshot(tick, seat.acked_tick, seat.applied_seq, seat.repeated, values, base)
+            seat.sent[tick] = values
+            if len(seat.sent) > SNAPSHOT_HISTORY:
+                seat.sent.popitem(last=False)
+            send(data, seat.address)
+
+
+class GameServer(asyncio.DatagramProtocol):
+    """UDP endpoint plus the fixed-tick scheduler that steps every room."""
+
+    def __init__(self, ball_speed=14, boss_mode=False, ai_difficulty=0.2, latency=0.0, jitter=0.0, loss=0.0,
+                 seed=None):
+        self.settings = (ball_speed, boss_mode, ai_difficulty)
+        self.rng = random.Random(seed)
+        self.rooms = {}  # room id -> Room
+        self.clients = {}  # address -> Seat
+        self.link = LinkConditioner(None, latency, jitter, loss, seed)
+        self.ticks = 0
+        self.late_ticks = 0  # Ticks the scheduler had to drop because it fell behind
+        self.busy = 0.0  # Seconds spent ticking since the last stats line
+
+    # -------------------- Network --------------------
+    def connection_made(self, transport):
+        self.link.sendto = transport.sendto
+
+    def datagram_received(self, data, address):
+        if not data:
+            return
+        kind = data[0]
+        seat = self.clients.get(address)
+        if kind == INPUT and seat is not None and len(data) >= INPUT_HEADER.size:
+            _, newest_seq, acked_tick, count = INPUT_HEADER.unpack_from(data)
+            if len(data) < INPUT_HEADER.size + count:
+                return  # Cut short or garbled: drop it, the next packet repeats the inputs
+            seat.queue_inputs(newest_seq, data[INPUT_HEADER.size:INPUT_HEADER.size + count])
+            if acked_tick != NO_BASE and (seat.acked_tick == NO_BASE or acked_tick > seat.acked_tick):
+                seat.acked_tick = acked_tick
+            seat.last_heard = time.monotonic()
+        elif kind == JOIN and len(data) >= JOIN_PACKET.size:
+            self.join(JOIN_PACKET.unpack_from(data)[1], address)
+        elif kind == LEAVE and seat is not None:
+            self.leave(seat)
+
+    def join(self, room_id, address):
+        seat = self.clients.get(address)
+        if seat is None:
+            room = self.rooms.get(room_id)
+            if room is None:
+                room = self.rooms[room_id] = Room(room_id, self.rng.getrandbits(63), *self.settings)
+            if None not in room.seats:
+                self.link.send(bytes([FULL]), address)
+                return
+            seat = Seat(address, room, room.seats.index(None))
+            room.seats[seat.seat] = seat
+            self.clients[address] = seat
+        seat.last_heard = time.monotonic()
+        self.link.send(WELCOME_PACKET.pack(WELCOME, seat.seat, seat.room.id), address)  # Again if the first was lost
+
+    def leave(self, seat):
+        room = seat.room
+        room.seats[seat.seat] = None
+        del self.clients[seat.address]
+        if room.seats == [None, None]:
+            del self.rooms[room.id]
+
+    # -------------------- Scheduling --------------------
+    def tick(self):
+        """Step every room once, then send snapshots on snapshot ticks."""
+        start = time.perf_counter()
+        rooms = self.rooms.values()
+        for room in rooms:
+            room.tick()
+        self.ticks += 1
+        if self.ticks % SNAPSHOT_EVERY == 0:
+            send = self.link.send
+            for room in rooms:
+                room.send_snapshots(send)
+        if self.ticks % TICK_HZ == 0:
+            self.expire_clients()
+        self.busy += time.perf_counter() - start
+
+    def expire_clients(self):
+        cutoff = time.monotonic() - CLIENT_TIMEOUT
+        for seat in [seat for seat in self.clients.values() if seat.last_heard < cutoff]:
+            self.leave(seat)
+
+    async def run(self, stats_interval=0):
+        """Tick all rooms at TICK_HZ forever, catching up a few ticks at most after a stall."""
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        next_stats = next_tick + stats_interval
+        while True:
+            steps = 0
+            while loop.time() >= next_tick and steps < MAX_CATCH_UP_TICKS:
+                self.tick()
+                next_tick += TICK
+                steps += 1
+            if loop.time() >= next_tick:
+                self.late_ticks += int((loop.time() - next_tick) / TICK) + 1
+                next_tick = loop.time() + TICK
+            self.link.flush()
+            if stats_interval and loop.time() >= next_stats:
+                print(self.stats(stats_interval), flush=True)
+                next_stats += stats_interval
+            # Sleep until the next tick, or until a delayed packet is due if that comes first
+            wake = next_tick - loop.time()
+            if self.link.queue:
+                wake = min(wake, self.link.queue[0][0] - time.perf_counter())
+            await asyncio.sleep(max(0.0, wake))
+
+    def stats(self, interval):
+        line = ("%d rooms, %d clients: %.1f%% of a core, %.0f kB/s out, %d packets dropped, %d late ticks"
+                % (len(self.rooms), len(self.clients), 100 * self.busy / interval,
+                   self.link.bytes / interval / 1024, self.link.dropped, self.late_ticks))
+        self.busy = 0.0
+        self.link.bytes = 0
+        return line
+
+
+async def serve(host, port, server, stats_interval):
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(lambda: server, local_addr=(host, port))
+    print("Pong server on %s:%d" % (host, port), flush=True)
+    try:
+        await server.run(stats_interval)
+    finally:
+        transport.close()
+
+
+# -------------------- Client --------------------
+class NetClient:
+    """
+    The game's side of a networked match. step() applies the local input to a
+    predicted match immediately and sends it; poll() takes in snapshots, resets
+    the prediction to the server's state and replays the inputs the server had
+    not applied yet. Non-blocking, so it fits in the game loop.
+    """
+
+    def __init__(self, address, room=0, latency=0.0, jitter=0.0, loss=0.0, seed=None):
+        self.address = address
+        self.room = room
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.link = LinkConditioner(self.socket.sendto, latency, jitter, loss, seed)
+        self.match = Match(rng=CounterRNG(0))
+        self.seat = None
+        self.seq = 0
+        self.pending = deque()  # (seq, bits) sent but not yet applied by the server
+        self.recent = deque(maxlen=REDUNDANT_INPUTS)  # Newest inputs, resent with every packet
+        self.bases = OrderedDict()  # tick -> values of received snapshots
+        self.tick = NO_BASE  # Newest snapshot applied
+        self.other_input = None  # The other seat's last input (None: the AI plays the left paddle)
+        self.snapshots = self.stale = self.bytes = 0
+        self.correction = 0.0  # Sum of how far the local paddle moved when reconciling
+
+    @property
+    def side(self):
+        return SIDES[self.seat]
+
+    def connect(self, timeout=5.0):
+        """Join the room and wait for the first snapshot. Raises ConnectionError on a full room or a timeout."""
+        deadline = time.monotonic() + timeout
+        next_join = 0.0
+        while self.tick == NO_BASE:
+            now = time.monotonic()
+            if now > deadline:
+                raise ConnectionError("no answer from %s:%d" % self.address)
+            if now >= next_join:
+                self.link.send(JOIN_PACKET.pack(JOIN, self.room), self.address)
+                next_join = now + 0.25
+            self.poll()
+            time.sleep(0.005)
+
+    def close(self):
+        self.socket.sendto(bytes([LEAVE]), self.address)
+        self.socket.close()
+
+    def poll(self):
+        """Handle everything that has arrived and send what the link has due."""
+        newest = None
+        while True:
+            try:
+                data = self.socket.recv(2048)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break  # e.g. ICMP port unreachable while the server is down
+            if not data:
+                continue
+            kind = data[0]
+            if kind == SNAPSHOT and self.seat is not None:
+                self.bytes += len(data)
+                decoded = decode_snapshot(data, self.bases)
+                if decoded is None or (self.tick != NO_BASE and decoded[0] <= self.tick):
+                    self.stale += 1
+                    continue
+                tick, ack_seq, repeated, values = decoded
+                self.bases[tick] = values
+                if len(self.bases) > SNAPSHOT_HISTORY:
+                    self.bases.popitem(last=False)
+                if newest is None or tick > newest[0]:
+                    newest = decoded
+            elif kind == WELCOME:
+                _, self.seat, _ = WELCOME_PACKET.unpack_from(data)
+            elif kind == FULL:
+                raise ConnectionError("room %d is full" % self.room)
+        if newest is not None:
+            self.reconcile(*newest)
+        self.link.flush()
+
+    def reconcile(self, tick, ack_seq, repeated, values):
+        """
+        Rewind the prediction to the snapshot and re-apply the inputs the server hasn't simulated
+        yet: those after ack_seq, minus the `repeated` ticks it already ran in their place.
+        """
+        match = self.match
+        predicted_y = match.paddle_y(self.side)
+        inputs = apply_values(match, values)
+        if inputs & INPUTS_OPPONENT_HUMAN:
+            self.other_input = inputs >> 2 & 3 if self.seat == PLAYER_SEAT else inputs & 3
+        else:
+            self.other_input = None
+        self.tick = tick
+        self.snapshots += 1
+
+        while self.pending and self.pending[0][0] <= ack_seq:
+            self.pending.popleft()
+        for i, (_, bits) in enumerate(self.pending):
+            if i >= repeated:
+                self.advance(bits)
+        match.save_previous()  # No interpolation across the correction
+        self.correction += abs(match.paddle_y(self.side) - predicted_y)
+
+    def advance(self, bits):
+        if self.seat == PLAYER_SEAT:
+            return advance(self.match, bits, self.other_input)
+        return advance(self.match, self.other_input or 0, bits)
+
+    def step(self, up, down):
+        """Send this tick's input and predict its effect. Returns the side that scored in the prediction."""
+        bits = (INPUT_UP if up else 0) | (INPUT_DOWN if down else 0)
+        self.seq += 1
+        self.pending.append((self.seq, bits))
+        self.recent.append(bits)
+        self.link.send(INPUT_HEADER.pack(INPUT, self.seq, self.tick, len(self.recent)) + bytes(self.recent),
+                       self.address)
+        return self.advance(bits)
+
+
+# -------------------- Load tests --------------------
+def run_bots(address, count, seconds, latency, jitter, loss):
+    """`count` headless clients (two per room) playing for `seconds`, then a summary of what they saw."""
+    clients = [NetClient(address, room=i // 2, latency=latency, jitter=jitter, loss=loss, seed=i) for i in range(count)]
+    for client in clients:
+        client.connect()
+    start = next_tick = time.perf_counter()
+    ticks = 0
+    while time.perf_counter() - start < seconds:
+        for client in clients:
+            client.poll()
+            if client.seat == PLAYER_SEAT:
+                up, down = autopilot(client.match)
+            else:
+                up, down = random.random() < 0.3, random.random() < 0.3
+            client.step(up, down)
+        ticks += 1
+        next_tick += TICK
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+    elapsed = time.perf_counter() - start
+    snapshots = sum(client.snapshots for client in clients)
+    print("%d clients, %.1fs: %d ticks (%.0f/s per client), %.1f snapshots/s per client, %.1f bytes per snapshot, "
+          "%d stale or undecodable, mean paddle correction %.2f px"
+          % (count, elapsed, ticks, ticks / elapsed, snapshots / elapsed / count,
+             sum(client.bytes for client in clients) / max(snapshots, 1), sum(client.stale for client in clients),
+             sum(client.correction for client in clients) / max(snapshots, 1)))
+    for client in clients:
+        client.close()
+
+
+def bench_rooms(rooms, ticks=600):
+    """Server cost of `rooms` full rooms (two clients sending inputs every tick), without real sockets."""
+    server = GameServer(seed=1)
+    sent = [0, 0]
+
+    def sink(data, address):
+        sent[0] += 1
+        sent[1] += len(data)
+
+    server.link.sendto = sink
+    for room in range(rooms):
+        for seat in range(2):
+            server.datagram_received(JOIN_PACKET.pack(JOIN, room), (room, seat))
+    rng = random.Random(2)
+    start = time.perf_counter()
+    for tick in range(1, ticks + 1):
+        for address, seat in list(server.clients.items()):
+            acked = tick - 4 - tick % SNAPSHOT_EVERY if tick > 4 else NO_BASE  # Clients a few ticks behind
+            server.datagram_received(INPUT_HEADER.pack(INPUT, tick, acked, 1) + bytes([rng.randrange(4)]), address)
+        server.tick()
+    elapsed = time.perf_counter() - start
+    per_tick = elapsed / ticks
+    print("%d rooms: %.2f ms per tick (inputs, simulation, snapshots), %.0f%% of a core at %d Hz; "
+          "%.0f bytes per snapshot; about %d rooms per core"
+          % (rooms, per_tick * 1000, 100 * per_tick * TICK_HZ, TICK_HZ, sent[1] / max(sent[0], 1),
+             rooms / (per_tick * TICK_HZ)))
+
+
+def parse_address(text):
+    """(host, port) from HOST:PORT, or :PORT for this machine. ValueError if it isn't one."""
+    host, _, port = text.rpartition(":")
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError("expected HOST:PORT, got %r" % text)
+    return host or "127.0.0.1", int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pong game server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--ball-speed", type=float, default=14)
+    parser.add_argument("--boss", action="store_true", help="boss mode in every room")
+    parser.add_argument("--ai-difficulty", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0, help="simulated one-way latency in ms")
+    parser.add_argument("--jitter", type=float, default=0, help="simulated extra random latency in ms")
+    parser.add_argument("--loss", type=float, default=0, help="simulated packet loss (0-1)")
+    parser.add_argument("--stats", type=float, default=5, help="seconds between stats lines (0 = none)")
+    parser.add_argument("--bots", type=int, metavar="N", help="run N headless clients against --connect instead")
+    parser.add_argument("--connect", default="127.0.0.1:7777", help="server for --bots")
+    parser.add_argument("--seconds", type=float, default=10, help="how long the bots play")
+    parser.add_argument("--bench", type=int, metavar="ROOMS", help="measure the server cost of ROOMS full rooms")
+    args = parser.parse_args(argv)
+
+    latency, jitter = args.latency / 1000, args.jitter / 1000
+    if args.bench:
+        bench_rooms(args.bench)
+    elif args.bots:
+        run_bots(parse_address(args.connect), args.bots, args.seconds, latency, jitter, args.loss)
+    else:
+        server = GameServer(args.ball_speed, args.boss, args.ai_difficulty, latency, jitter, args.loss)
+        try:
+            asyncio.run(serve(args.host, args.port, server, args.stats))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,157 @@
+import pygame, time, json, csv
+from array import array
+from pong_assets import find_font
+from pong_render import display_format
+
+# Frame-time instrumentation. The main loop calls mark(phase) after each phase
+# of a frame, which charges the time since the previous mark to that phase, and
+# end_frame() once the frame is done. Frames go into a ring buffer that feeds
+# the on-screen overlay (toggled with F3) and the CSV/JSON lines export.
+
+PHASES = ("events", "ball", "paddles", "opponent", "draw", "present", "sleep")
+EVENTS, BALL, PADDLES, OPPONENT, DRAW, PRESENT, SLEEP = range(len(PHASES))
+
+HISTOGRAM_EDGES_MS = (2, 4, 8, 12, 16.7, 25, 33.3, 50)  # Frame-time buckets; the last one holds everything slower
+OVERLAY_REFRESH = 0.25  # Seconds between overlay redraws; the numbers would be unreadable at full frame rate
+OVERLAY_COLOR = (220, 220, 220)
+OVERLAY_BACKGROUND = (0, 0, 0, 170)
+OVERLAY_MARGIN = 10
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+class FrameProfiler:
+    """
+    Per-phase frame timings over the last `history` frames. The overlay and its
+    histogram cover the last `window` of them.
+    """
+
+    def __init__(self, history=36000, window=120):
+        self.history = history
+        self.window = window
+        self.samples = array('d', bytes(8 * history * len(PHASES)))  # One row of phase seconds per frame
+        self.frames = 0  # Frames recorded since the profiler started
+        self.current = [0.0] * len(PHASES)
+        self.last = time.perf_counter()
+        self.overlay = False
+        self._overlay_surface = None
+        self._overlay_time = 0.0
+        self._font = None
+
+    # -------------------- Recording --------------------
+    def mark(self, phase):
+        """Charge the time since the previous mark to phase."""
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        """File the frame in progress and start the next one."""
+        samples, current = self.samples, self.current
+        row = (self.frames % self.history) * len(PHASES)
+        for phase in range(len(PHASES)):
+            samples[row + phase] = current[phase]
+            current[phase] = 0.0
+        self.frames += 1
+
+    def discard_frame(self):
+        """Forget the frame in progress (e.g. it was spent in a menu)."""
+        for phase in range(len(PHASES)):
+            self.current[phase] = 0.0
+        self.last = time.perf_counter()
+
+    # -------------------- Statistics --------------------
+    def recent(self, count):
+        """The last `count` frames (at most `history`), oldest first, as lists of phase seconds."""
+        count = min(count, self.frames, self.history)
+        width = len(PHASES)
+        rows = []
+        for frame in range(self.frames - count, self.frames):
+            row = (frame % self.history) * width
+            rows.append(self.samples[row:row + width].tolist())
+        return rows
+
+    def stats(self, count=None):
+        """FPS, p50/p99 frame time and per-phase mean/p99 (seconds) over the last `count` frames."""
+        rows = self.recent(count or self.window)
+        totals = sorted(sum(row) for row in rows)
+        phases = {}
+        for phase, name in enumerate(PHASES):
+            values = sorted(row[phase] for row in rows)
+            phases[name] = (sum(values) / len(values) if values else 0.0, percentile(values, 0.99))
+        return {"frames": len(rows), "fps": len(totals) / sum(totals) if sum(totals) else 0.0,
+                "p50": percentile(totals, 0.50), "p99": percentile(totals, 0.99), "phases": phases}
+
+    def histogram(self, count=None):
+        """Frame counts per HISTOGRAM_EDGES_MS bucket over the last `count` frames."""
+        counts = [0] * (len(HISTOGRAM_EDGES_MS) + 1)
+        for row in self.recent(count or self.window):
+            total = sum(row) * 1000
+            bucket = 0
+            while bucket < len(HISTOGRAM_EDGES_MS) and total >= HISTOGRAM_EDGES_MS[bucket]:
+                bucket += 1
+            counts[bucket] += 1
+        return counts
+
+    # -------------------- Overlay --------------------
+    def draw_overlay(self, surface):
+        """Draw the overlay in the bottom-left corner of surface and return the rect it covers."""
+        now = time.perf_counter()
+        if self._overlay_surface is None or now - self._overlay_time >= OVERLAY_REFRESH:
+            self._overlay_surface = self._render_overlay()
+            self._overlay_time = now
+        position = (OVERLAY_MARGIN, surface.get_height() - self._overlay_surface.get_height() - OVERLAY_MARGIN)
+        return surface.blit(self._overlay_surface, position)
+
+    def _render_overlay(self):
+        if self._font is None:
+            self._font = pygame.font.Font(find_font("Consolas"), 16)
+        stats = self.stats()
+        lines = ["FPS %6.0f   frame p50 %6.2f ms   p99 %6.2f ms" % (stats["fps"], stats["p50"] * 1000, stats["p99"] * 1000)]
+        for name in PHASES:
+            mean, p99 = stats["phases"][name]
+            lines.append("%-9s mean %7.3f ms   p99 %7.3f ms" % (name, mean * 1000, p99 * 1000))
+        labels = [self._font.render(line, True, OVERLAY_COLOR) for line in lines]
+        line_height = self._font.get_linesize()
+
+        # Frame-time histogram under the text, one bar per bucket
+        counts = self.histogram()
+        bar_width, bar_height = 34, 40
+        edges = ["<%g" % edge for edge in HISTOGRAM_EDGES_MS] + [">%g" % HISTOGRAM_EDGES_MS[-1]]
+        edge_labels = [self._font.render(edge, True, OVERLAY_COLOR) for edge in edges]
+
+        width = max(max(label.get_width() for label in labels), bar_width * len(counts)) + 2 * OVERLAY_MARGIN
+        height = line_height * (len(labels) + 1) + bar_height + 2 * OVERLAY_MARGIN
+        overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+        overlay.fill(OVERLAY_BACKGROUND)
+        for i, label in enumerate(labels):
+            overlay.blit(label, (OVERLAY_MARGIN, OVERLAY_MARGIN + i * line_height))
+
+        base = OVERLAY_MARGIN + len(labels) * line_height + bar_height
+        most = max(counts) or 1
+        for i, count in enumerate(counts):
+            x = OVERLAY_MARGIN + i * bar_width
+            bar = int(bar_height * count / most)
+            pygame.draw.rect(overlay, OVERLAY_COLOR, (x + 2, base - bar, bar_width - 4, bar))
+            overlay.blit(edge_labels[i], (x, base))
+        return display_format(overlay, alpha=True)
+
+    # -------------------- Export --------------------
+    def export(self, path):
+        """Write every frame still in the history: CSV if path ends in .csv, otherwise JSON lines. Times in ms."""
+        rows = self.recent(self.history)
+        first = self.frames - len(rows)
+        columns = ["%s_ms" % name for name in PHASES] + ["total_ms"]
+        with open(path, "w", newline="") as f:
+            if path.lower().endswith(".csv"):
+                writer = csv.writer(f)
+                writer.writerow(["frame"] + columns)
+                for i, row in enumerate(rows):
+                    writer.writerow([first + i] + ["%.4f" % (value * 1000) for value in row + [sum(row)]])
+            else:
+                for i, row in enumerate(rows):
+                    record = {"frame": first + i}
+                    record.update(zip(columns, (round(value * 1000, 4) for value in row + [sum(row)])))
+                    f.write(json.dumps(record) + "\n")
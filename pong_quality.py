@@ -0,0 +1,108 @@
+import time
+from collections import deque
+
+# Adaptive quality. The governor is told how long each frame took to build
+# (updating and drawing; not presenting, which can block until the next vblank
+# with vsync, nor the sleep) and compares the recent average with the frame
+# budget. When the game can't hold its frame rate it steps down one level;
+# once there is plenty of headroom again for long enough it steps back up.
+# Levels are cumulative, each one keeps the savings of the ones before it:
+#     full             everything as designed
+#     deferred scores  a changed score redraws the scoreboard at most every SCORE_INTERVAL
+#                      (each redraw rebuilds the background and presents the whole screen)
+#     half rate        only every other frame is drawn and presented; physics keeps ticking
+
+QUALITY_LEVELS = ("full", "deferred scores", "half rate")
+FULL, DEFERRED_SCORES, HALF_RATE = range(len(QUALITY_LEVELS))
+
+WINDOW_FRAMES = 30  # Frames the load is averaged over; also the frames a new level gets before it is judged
+STEP_DOWN_LOAD = 0.9  # Share of the frame budget the average frame may use before quality drops
+STEP_UP_LOAD = 0.6  # ...and the share it must stay under, for restore_frames in a row, before it comes back
+RESTORE_FRAMES = 120  # Frames of headroom needed before a level is restored...
+MAX_RESTORE_FRAMES = 16 * RESTORE_FRAMES  # ...doubled, up to this, each time a restore has to be taken back
+SCORE_INTERVAL = 0.5  # Seconds between scoreboard redraws at DEFERRED_SCORES
+
+
+class QualityGovernor:
+    """
+    Steps through QUALITY_LEVELS to hold fps. The main loop calls frame(seconds) once
+    per frame with the time spent building it and asks draw_frame() and redraw_scores()
+    what to skip. level is the current level; history holds (seconds since start,
+    frame, old level, new level, load) for every change.
+    """
+
+    def __init__(self, fps, max_level=HALF_RATE):
+        self.budget = 1 / fps
+        self.max_level = max_level
+        self.level = FULL
+        self.history = []
+        self.work = deque(maxlen=WINDOW_FRAMES)
+        self.frames = 0
+        self.restore_frames = RESTORE_FRAMES
+        self._changed = 0  # Frame of the last level change
+        self._restored = None  # Frame of the last step up, until it has held for restore_frames
+        self._headroom = 0  # Frames in a row with the load under STEP_UP_LOAD
+        self._scores_drawn = 0.0
+        self._started = time.perf_counter()
+
+    @property
+    def name(self):
+        return QUALITY_LEVELS[self.level]
+
+    def load(self):
+        """Average frame time over the window, as a share of the budget."""
+        return sum(self.work) / len(self.work) / self.budget if self.work else 0.0
+
+    def frame(self, seconds):
+        self.frames += 1
+        self.work.append(seconds)
+        if self.frames - self._changed < WINDOW_FRAMES:
+            return  # Not enough frames at this level to judge it
+        load = self.load()
+        if load > STEP_DOWN_LOAD:
+            self._headroom = 0
+            if self._restored is not None and self.frames - self._restored < self.restore_frames:
+                # The level just restored can't be held after all: wait longer before trying it again
+                self.restore_frames = min(2 * self.restore_frames, MAX_RESTORE_FRAMES)
+            self._restored = None
+            if self.level < self.max_level:
+                self._change(self.level + 1, load)
+        elif load < STEP_UP_LOAD:
+            self._headroom += 1
+            if self._restored is not None and self.frames - self._restored >= self.restore_frames:
+                self._restored = None  # The restore held
+                self.restore_frames = RESTORE_FRAMES
+            if self._headroom >= self.restore_frames and self.level > FULL:
+                self._change(self.level - 1, load)
+                self._restored = self.frames
+        else:
+            self._headroom = 0
+
+    def _change(self, level, load):
+        self.history.append((time.perf_counter() - self._started, self.frames, self.level, level, load))
+        self.level = level
+        self._changed = self.frames
+        self._headroom = 0
+        self.work.clear()  # Frames from the old level say little about the new one
+
+    def draw_frame(self):
+        """Whether this frame is drawn and presented (at HALF_RATE only every other one is)."""
+        return self.level < HALF_RATE or self.frames % 2 == 0
+
+    def redraw_scores(self):
+        """Whether a changed score may be drawn this frame."""
+        if self.level < DEFERRED_SCORES:
+            return True
+        now = time.perf_counter()
+        if now - self._scores_drawn < SCORE_INTERVAL:
+            return False
+        self._scores_drawn = now
+        return True
+
+    def report(self):
+        lines = ["Quality: %s at exit, %d level changes in %d frames (budget %.1f ms)"
+                 % (self.name, len(self.history), self.frames, self.budget * 1000)]
+        for seconds, frame, old, new, load in self.history:
+            lines.append("  %8.2f s  frame %7d  %-15s -> %-15s  load %.0f%%"
+                         % (seconds, frame, QUALITY_LEVELS[old], QUALITY_LEVELS[new], load * 100))
+        return "\n".join(lines)
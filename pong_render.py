@@ -0,0 +1,208 @@
+import pygame
+
+# Rendering helpers for the game screen.
+
+# How the logical surface (everything is drawn at the game's own resolution) reaches the window:
+#     window    the window is the logical surface, pygame.display.update (no scaling)
+#     scaled    pygame.SCALED: SDL scales the display surface to the window
+#     renderer  pygame._sdl2.video: the surface is uploaded to a texture and the renderer scales it
+#               (GPU if there is one, otherwise SDL's software renderer)
+DISPLAY_BACKENDS = ("window", "scaled", "renderer")
+
+
+class Display:
+    """
+    The logical surface the game draws on and the window it is shown in. update(rects)
+    shows the surface, or only the given areas of it. If the requested backend can't be
+    set up, the window backend is used and fallback_reason says why.
+    """
+
+    def __init__(self, backend, logical_size, window_size=None, fullscreen=False, vsync=False, caption=""):
+        self.logical_size = tuple(logical_size)
+        self.fallback_reason = None
+        self._window = self._renderer = self._texture = None
+        try:
+            self._open(backend, window_size, fullscreen, vsync, caption)
+        except (ImportError, pygame.error) as error:
+            if backend == "window":
+                raise
+            self.fallback_reason = "%s backend unavailable (%s), using window" % (backend, error)
+            self._open("window", None, fullscreen, False, caption)
+
+    def _open(self, backend, window_size, fullscreen, vsync, caption):
+        self.backend = backend
+        if backend == "renderer":
+            from pygame._sdl2 import video
+            self._window = video.Window(caption, size=window_size or self.logical_size, resizable=True,
+                                        fullscreen_desktop=fullscreen)
+            self._renderer = video.Renderer(self._window, vsync=vsync)
+            self._renderer.logical_size = self.logical_size  # Scales with letterboxing; mouse events come in logical units
+            self._texture = video.Texture(self._renderer, self.logical_size, streaming=True)
+            self.surface = pygame.Surface(self.logical_size, 0, 32)
+            return
+        flags = 0
+        if backend == "scaled":
+            flags = pygame.SCALED | pygame.RESIZABLE
+        elif backend != "window":
+            raise ValueError("unknown display backend %r" % backend)
+        if fullscreen:
+            flags |= pygame.FULLSCREEN
+        self.surface = pygame.display.set_mode(self.logical_size, flags, vsync=int(vsync))
+        pygame.display.set_caption(caption)
+        if backend == "scaled" and window_size and not fullscreen:
+            from pygame._sdl2 import video
+            video.Window.from_display_module().size = window_size
+
+    @property
+    def window_size(self):
+        if self._window is not None:
+            return self._window.size
+        if self.backend == "scaled":
+            from pygame._sdl2 import video
+            return video.Window.from_display_module().size
+        return self.surface.get_size()
+
+    def update(self, rects=None):
+        if self._renderer is None:
+            if rects is None:
+                pygame.display.update()
+            else:
+                pygame.display.update(rects)
+            return
+        # Upload what changed into the texture, then draw the whole texture scaled to the window
+        if rects is None:
+            self._texture.update(self.surface)
+        else:
+            bounds = self.surface.get_rect()
+            for rect in rects:
+                rect = bounds.clip(rect)
+                if rect:
+                    self._texture.update(self.surface.subsurface(rect), rect)
+        self._renderer.clear()
+        self._texture.draw()
+        self._renderer.present()
+
+    def mouse_pos(self):
+        """pygame.mouse.get_pos() in logical coordinates (event positions already are)."""
+        x, y = pygame.mouse.get_pos()
+        if self._renderer is None:
+            return x, y  # pygame.SCALED maps it already
+        (width, height), (logical_width, logical_height) = self._window.size, self.logical_size
+        scale = min(width / logical_width, height / logical_height)
+        return (int((x - (width - logical_width * scale) / 2) / scale),
+                int((y - (height - logical_height * scale) / 2) / scale))
+
+    def describe(self):
+        return "%s backend, %dx%d logical in a %dx%d window" % ((self.backend,) + self.logical_size + tuple(self.window_size))
+
+
+def parse_size(text):
+    """'1920x1080' -> (1920, 1080)"""
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height)
+
+
+def display_format(surface, alpha=False):
+    """
+    surface converted to the display's pixel format so blitting it is a plain copy. The
+    renderer backend has no display surface; its logical surface is already in the
+    32-bit format new surfaces get, so there is nothing to convert to.
+    """
+    if pygame.display.get_surface() is None:
+        return surface
+    return surface.convert_alpha() if alpha else surface.convert()
+
+
+class DirtyRectRenderer:
+    """
+    Redraws only what moved. The static part of the screen (background, center
+    line, scores) lives on its own surface; each frame the areas covered by the
+    moving objects last frame are restored from it and only those areas, plus
+    the new object bounds, are sent to update (pygame.display.update or Display.update).
+    """
+
+    def __init__(self, screen, update=pygame.display.update):
+        self.screen = screen
+        self.update = update
+        self.background = None
+        self.background_key = None
+        self.full_redraw = True
+        self._previous = []
+        self._current = []
+
+    def invalidate(self):
+        """Repaint and present the whole screen next frame (e.g. after a menu drew over it)."""
+        self.full_redraw = True
+
+    def begin(self, background_key, draw_background):
+        """
+        Start a frame. draw_background(surface) paints the static layer; it is only
+        called again when background_key changes (a point was scored, colors changed).
+        """
+        if background_key != self.background_key or self.background is None:
+            if self.background is None or self.background.get_size() != self.screen.get_size():
+                self.background = pygame.Surface(self.screen.get_size()).convert(self.screen)
+            draw_background(self.background)
+            self.background_key = background_key
+            self.full_redraw = True
+
+        if self.full_redraw:
+            self.screen.blit(self.background, (0, 0))
+        else:
+            # Erase last frame's objects by copying the static layer back over them
+            for rect in self._previous:
+                self.screen.blit(self.background, rect, rect)
+        self._current = []
+
+    def mark(self, *rects):
+        """Record the screen areas drawn this frame."""
+        for rect in rects:
+            self._current.append(pygame.Rect(rect))
+
+    def present(self):
+        """Push this frame to the display: the whole surface after an invalidate, otherwise only the changed rects."""
+        if self.full_redraw:
+            self.update()
+            self.full_redraw = False
+        else:
+            self.update(self._previous + self._current)
+        self._previous = self._current
+
+
+class SpriteCache:
+    """
+    The ball and paddles, rendered once and converted to the display's pixel format
+    so that drawing them is a plain blit. A sprite is only rendered again when its
+    color or size changes (settings menu, randomize, boss mode).
+    """
+
+    def __init__(self):
+        self._sprites = {}  # name -> (color, size, surface)
+        self.builds = 0
+
+    def ball(self, color, size):
+        return self._get("ball", color, size, render_ball)
+
+    def paddle(self, name, color, size):
+        return self._get(name, color, size, render_paddle)
+
+    def _get(self, name, color, size, render):
+        entry = self._sprites.get(name)
+        if entry is None or entry[0] != color or entry[1] != size:
+            entry = (color, size, render(color, size))
+            self._sprites[name] = entry
+            self.builds += 1
+        return entry[2]
+
+
+def render_ball(color, size):
+    """A ball sprite: the same ellipse pygame.draw.ellipse gives, on a transparent background."""
+    surface = pygame.Surface(size, pygame.SRCALPHA)
+    pygame.draw.ellipse(surface, color, surface.get_rect())
+    return display_format(surface, alpha=True)
+
+
+def render_paddle(color, size):
+    surface = pygame.Surface(size)
+    surface.fill(color)
+    return display_format(surface)
@@ -0,0 +1,207 @@
+import struct, sys, time, zlib
+
+from pong_engine import Match
+
+# Match recordings. A match is fully determined by its seed, its settings and
+# the player's input on every physics tick, so a recording stores exactly that:
+# the seed, a short list of setting changes/serves/restarts, and a packed
+# bitstream with 3 bits (up, down, pause) per tick. Replaying re-runs the
+# physics, headless at full speed or rendered by pong_MAIN.py.
+
+MAGIC = b"PONGREC1"
+HEADER = struct.Struct("<QdBdIIHH")  # seed, initial settings, frames, events, final scores
+EVENT = struct.Struct("<IBdBd")  # frame, action, ball_speed, boss_mode, ai_difficulty
+
+# Input bits per tick
+INPUT_UP, INPUT_DOWN, INPUT_PAUSE = 1, 2, 4
+BITS_PER_TICK = 3
+
+# Event actions, applied before the tick they are stamped with
+SETTINGS, SERVE, RESTART = 0, 1, 2
+
+
+class InputBits:
+    """Growable bitstream of 3-bit input values, one per physics tick."""
+
+    def __init__(self, data=b"", length=0):
+        self.data = bytearray(data)
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def append(self, value):
+        bit = self.length * BITS_PER_TICK
+        needed = (bit + BITS_PER_TICK + 7) // 8
+        if len(self.data) < needed:
+            self.data.extend(bytes(needed - len(self.data)))
+        index, offset = divmod(bit, 8)
+        word = value << offset
+        self.data[index] |= word & 0xFF
+        if word > 0xFF:
+            self.data[index + 1] |= word >> 8
+        self.length += 1
+
+    def __getitem__(self, tick):
+        index, offset = divmod(tick * BITS_PER_TICK, 8)
+        word = self.data[index]
+        if offset > 8 - BITS_PER_TICK:
+            word |= self.data[index + 1] << 8
+        return (word >> offset) & 0b111
+
+
+class Recording:
+    """Seed, initial settings, events and per-tick inputs of one session."""
+
+    def __init__(self, seed, ball_speed=14, boss_mode=False, ai_difficulty=0.2):
+        self.seed = seed
+        self.settings = (ball_speed, boss_mode, ai_difficulty)
+        self.events = []  # (frame, action, ball_speed, boss_mode, ai_difficulty), in frame order
+        self.inputs = InputBits()
+        self.final_score = None  # (player, opponent) when the recording ended
+
+    @property
+    def frames(self):
+        return len(self.inputs)
+
+    def new_match(self):
+        """A match in the state the recording started from."""
+        ball_speed, boss_mode, ai_difficulty = self.settings
+        return Match(seed=self.seed, ball_speed=ball_speed, boss_mode=boss_mode, ai_difficulty=ai_difficulty)
+
+    def save(self, path):
+        ball_speed, boss_mode, ai_difficulty = self.settings
+        player_score, opponent_score = self.final_score or (0, 0)
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(HEADER.pack(self.seed, ball_speed, boss_mode, ai_difficulty, self.frames, len(self.events),
+                                player_score, opponent_score))
+            for event in self.events:
+                f.write(EVENT.pack(*event))
+            f.write(zlib.compress(bytes(self.inputs.data), 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("%s is not a Pong recording" % path)
+        offset = len(MAGIC)
+        seed, ball_speed, boss_mode, ai_difficulty, frames, event_count, player_score, opponent_score = \
+            HEADER.unpack_from(data, offset)
+        offset += HEADER.size
+
+        recording = cls(seed, ball_speed, bool(boss_mode), ai_difficulty)
+        for _ in range(event_count):
+            frame, action, ball_speed, boss_mode, ai_difficulty = EVENT.unpack_from(data, offset)
+            recording.events.append((frame, action, ball_speed, bool(boss_mode), ai_difficulty))
+            offset += EVENT.size
+        recording.inputs = InputBits(zlib.decompress(data[offset:]), frames)
+        recording.final_score = (player_score, opponent_score)
+        return recording
+
+
+class Recorder:
+    """Captures a live match into a Recording."""
+
+    def __init__(self, match, path):
+        self.match = match
+        self.path = path
+        self.recording = Recording(match.seed, match.ball_speed, match.boss_mode, match.ai_difficulty)
+        self._pause = False
+
+    def event(self, action):
+        """Record a serve/restart/settings change; call after applying it to the match's settings, before acting on it."""
+        match = self.match
+        self.recording.events.append((self.recording.frames, action, match.ball_speed, match.boss_mode,
+                                      match.ai_difficulty))
+
+    def note_pause(self):
+        """The game was paused; flagged on the next recorded tick."""
+        self._pause = True
+
+    def record(self, up, down):
+        """Input used for the tick that is about to run."""
+        value = (INPUT_UP if up else 0) | (INPUT_DOWN if down else 0) | (INPUT_PAUSE if self._pause else 0)
+        self.recording.inputs.append(value)
+        self._pause = False
+
+    def save(self):
+        self.recording.final_score = (self.match.player_score, self.match.opponent_score)
+        self.recording.save(self.path)
+
+
+class Replay:
+    """Re-runs a Recording tick by tick, keeping periodic snapshots so it can seek."""
+
+    def __init__(self, recording, snapshot_interval=600):
+        self.recording = recording
+        self.snapshot_interval = snapshot_interval
+        self.match = recording.new_match()
+        self.frame = 0
+        self._event_frames = [event[0] for event in recording.events]
+        self._next_event = 0
+        self.snapshots = {0: (self.match.get_state(), 0)}
+
+    @property
+    def finished(self):
+        return self.frame >= self.recording.frames
+
+    def input(self, frame=None):
+        """(up, down, pause) for a tick, the current one by default."""
+        value = self.recording.inputs[self.frame if frame is None else frame]
+        return bool(value & INPUT_UP), bool(value & INPUT_DOWN), bool(value & INPUT_PAUSE)
+
+    def step(self):
+        """Play one tick. Returns the side that scored, like Match.step."""
+        match = self.match
+        events = self.recording.events
+        while self._next_event < len(events) and events[self._next_event][0] == self.frame:
+            frame, action, match.ball_speed, match.boss_mode, match.ai_difficulty = events[self._next_event]
+            if action == SERVE:
+                match.reset_ball()
+            elif action == RESTART:
+                match.restart()
+            self._next_event += 1
+
+        up, down, pause = self.input()
+        scorer = match.step(up, down)
+        self.frame += 1
+        if self.frame % self.snapshot_interval == 0 and self.frame not in self.snapshots:
+            self.snapshots[self.frame] = (match.get_state(), self._next_event)
+        return scorer
+
+    def seek(self, frame):
+        """Jump to a tick: restore the closest snapshot at or before it and simulate the rest."""
+        frame = max(0, min(frame, self.recording.frames))
+        start = max(f for f in self.snapshots if f <= frame)
+        if not start <= self.frame <= frame:
+            state, self._next_event = self.snapshots[start]
+            self.match.set_state(state)
+            self.frame = start
+        while self.frame < frame:
+            self.step()
+
+    def run(self):
+        """Play to the end as fast as possible and return the final (player, opponent) score."""
+        while not self.finished:
+            self.step()
+        return self.match.player_score, self.match.opponent_score
+
+
+def verify(path):
+    """Replay a file headlessly; returns (matches_recorded_score, final_score, ticks, seconds)."""
+    recording = Recording.load(path)
+    start = time.perf_counter()
+    score = Replay(recording).run()
+    return score == recording.final_score, score, recording.frames, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    failures = 0
+    for path in sys.argv[1:]:
+        ok, score, frames, seconds = verify(path)
+        failures += not ok
+        print("%s: %s %d-%d, %d ticks in %.2fs (%.0f ticks/s)"
+              % (path, "ok" if ok else "MISMATCH", score[0], score[1], frames, seconds, frames / max(seconds, 1e-9)))
+    sys.exit(1 if failures else 0)
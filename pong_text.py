@@ -0,0 +1,88 @@
+import pygame
+from collections import OrderedDict
+
+# Cached text rendering. Menu labels and the scoreboard only change when the
+# player does something, so render each (font, text, color) once and keep the
+# surface around instead of calling font.render every frame.
+
+MAX_ATLASES = 16  # Digit atlases kept (one per font and color; the scoreboard color can be changed in settings)
+
+
+class TextCache:
+    """LRU cache of rendered text surfaces keyed by font, text, color and antialiasing."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._surfaces = OrderedDict()
+        self._sizes = OrderedDict()
+        self._atlases = OrderedDict()
+        # Counters for profiling: renders is the number of actual font rasterizations
+        self.hits = 0
+        self.renders = 0
+
+    def render(self, font, text, color, antialias=True):
+        """Drop-in replacement for font.render(text, antialias, color)."""
+        key = (font, text, color, antialias)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        surface = font.render(text, antialias, color)
+        self.renders += 1
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)  # Evict the least recently used surface
+        return surface
+
+    def size(self, font, text):
+        """Drop-in replacement for font.size(text)."""
+        key = (font, text)
+        size = self._sizes.get(key)
+        if size is not None:
+            self._sizes.move_to_end(key)
+            return size
+
+        size = font.size(text)
+        self._sizes[key] = size
+        if len(self._sizes) > self.max_entries:
+            self._sizes.popitem(last=False)
+        return size
+
+    def digits(self, font, color, antialias=True):
+        """The DigitAtlas for a font and color, built on first use."""
+        key = (font, color, antialias)
+        atlas = self._atlases.get(key)
+        if atlas is not None:
+            self._atlases.move_to_end(key)
+            return atlas
+
+        atlas = self._atlases[key] = DigitAtlas(font, color, antialias)
+        self.renders += 10
+        if len(self._atlases) > MAX_ATLASES:
+            self._atlases.popitem(last=False)
+        return atlas
+
+    def clear(self):
+        self._surfaces.clear()
+        self._sizes.clear()
+        self._atlases.clear()
+
+
+class DigitAtlas:
+    """The digits 0-9 rendered once, so numbers like the scores can be drawn with blits only."""
+
+    def __init__(self, font, color, antialias=True):
+        self.glyphs = [font.render(str(digit), antialias, color) for digit in range(10)]
+        self.widths = [glyph.get_width() for glyph in self.glyphs]
+        self.height = font.get_height()
+
+    def blit_number(self, surface, number, position):
+        """Blit a non-negative integer with its top-left corner at position and return the covered Rect."""
+        x, y = position
+        for digit in str(number):
+            index = ord(digit) - 48
+            surface.blit(self.glyphs[index], (x, y))
+            x += self.widths[index]
+        return pygame.Rect(position[0], y, x - position[0], self.height)
@@ -0,0 +1,202 @@
+import sys, time, random, argparse, itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pong_engine import Match, BOSS_PREDICTION_FACTOR, BOSS_PADDLE_SPEED
+
+# AI-vs-AI tournaments for tuning the opponent. Every pair of configurations
+# plays a number of games with the opponent AI on both paddles; games are
+# sharded across a process pool and each shard's results are printed as soon
+# as it finishes. Example, the difficulty ladder against two boss tunings:
+#     python pong_tournament.py --ladder boss:0.95:20 boss:0.9:18 --games 400
+
+PHYSICS_HZ = 60  # Ticks per second of game time, as in pong_MAIN.py
+DIFFICULTY_LADDER = [0.2, 0.4, 0.6, 0.8, 1.0]  # difficulty_levels in pong_MAIN.py
+MAX_RALLY_FRAMES = 5 * 60 * PHYSICS_HZ  # A rally longer than five minutes ends the game undecided
+
+
+class AIConfig:
+    """One opponent-AI setup. Has the same setting names as Match, so Match.move_ai can take either."""
+
+    def __init__(self, ai_difficulty=0.2, boss_mode=False, prediction_factor=BOSS_PREDICTION_FACTOR,
+                 boss_paddle_speed=BOSS_PADDLE_SPEED):
+        self.ai_difficulty = ai_difficulty
+        self.boss_mode = boss_mode
+        self.prediction_factor = prediction_factor
+        self.boss_paddle_speed = boss_paddle_speed
+
+    @classmethod
+    def parse(cls, spec):
+        """'normal:<difficulty>' or 'boss[:<prediction_factor>[:<paddle_speed>]]'."""
+        kind, *values = spec.split(":")
+        if kind == "normal" and len(values) == 1:
+            return cls(ai_difficulty=float(values[0]))
+        if kind == "boss" and len(values) <= 2:
+            config = cls(boss_mode=True)
+            if values:
+                config.prediction_factor = float(values[0])
+            if len(values) > 1:
+                config.boss_paddle_speed = float(values[1])
+            return config
+        raise ValueError("bad AI spec %r (expected normal:<difficulty> or boss[:<prediction>[:<speed>]])" % spec)
+
+    @property
+    def name(self):
+        if self.boss_mode:
+            return "boss:%g:%g" % (self.prediction_factor, self.boss_paddle_speed)
+        return "normal:%g" % self.ai_difficulty
+
+
+# -------------------- Playing --------------------
+def play_game(left, right, seed, points=11, ball_speed=14):
+    """
+    One game between two AIs, left on the opponent's paddle and right on the player's,
+    until one reaches `points`. Returns (left_score, right_score, rally_frames) where
+    rally_frames lists how many ticks each point took.
+    """
+    match = Match(seed=seed, ball_speed=ball_speed, boss_mode=left.boss_mode or right.boss_mode)
+    rally_frames = []
+    frames = 0
+    while match.player_score < points and match.opponent_score < points:
+        # Same order as the game: ball, paddle momentum, then the AIs
+        match.save_previous()
+        scorer = match.move_ball()
+        match.track_ball('player')
+        match.track_ball('opponent')
+        match.move_ai('opponent', left)
+        match.move_ai('player', right)
+        frames += 1
+        if scorer is not None:
+            rally_frames.append(frames)
+            frames = 0
+        elif frames >= MAX_RALLY_FRAMES:
+            break
+    return match.opponent_score, match.player_score, rally_frames
+
+
+def play_shard(left, right, seed, games, points, ball_speed):
+    """
+    A worker's share of one pairing. The game seeds come from the shard seed, and
+    the two AIs swap paddles every other game.
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    results = []  # (first_score, second_score, rally_frames), scores of the pairing's first and second AI
+    for game in range(games):
+        game_seed = rng.getrandbits(63)
+        if game % 2 == 0:
+            first, second, rallies = play_game(left, right, game_seed, points, ball_speed)
+        else:
+            second, first, rallies = play_game(right, left, game_seed, points, ball_speed)
+        if max(first, second) < points:
+            first = second = 0  # Stopped by MAX_RALLY_FRAMES: undecided, whatever the score was
+        results.append((first, second, rallies))
+    return results, time.perf_counter() - start
+
+
+def shard_seeds(seed, count):
+    """Independent seeds for each shard, fixed by the tournament seed whatever the number of workers."""
+    rng = random.Random(seed)
+    return [rng.getrandbits(63) for _ in range(count)]
+
+
+# -------------------- Results --------------------
+class Standings:
+    """Aggregated results per AI and per pairing."""
+
+    def __init__(self, names):
+        self.names = names
+        self.wins = dict.fromkeys(names, 0)
+        self.games = dict.fromkeys(names, 0)
+        self.pairings = {}  # (first, second) -> [first wins, second wins, undecided]
+        self.rallies = []  # Ticks per point, every point of the tournament
+        self.points = 0
+        self.worker_seconds = 0.0
+
+    def add(self, first, second, results, seconds):
+        record = self.pairings.setdefault((first, second), [0, 0, 0])
+        for first_score, second_score, rallies in results:
+            self.games[first] += 1
+            self.games[second] += 1
+            if first_score > second_score:
+                self.wins[first] += 1
+                record[0] += 1
+            elif second_score > first_score:
+                self.wins[second] += 1
+                record[1] += 1
+            else:
+                record[2] += 1
+            self.rallies.extend(rallies)
+            self.points += len(rallies)
+        self.worker_seconds += seconds
+
+    def report(self, wall_seconds):
+        lines = ["", "%-20s %8s %8s %9s" % ("AI", "games", "wins", "win rate")]
+        for name in sorted(self.names, key=lambda name: -self.wins[name] / max(self.games[name], 1)):
+            lines.append("%-20s %8d %8d %8.1f%%" % (name, self.games[name], self.wins[name],
+                                                    100 * self.wins[name] / max(self.games[name], 1)))
+
+        lines.append("")
+        lines.append("%-20s %-20s %8s %8s %8s" % ("first", "second", "1st won", "2nd won", "undecided"))
+        for (first, second), (first_wins, second_wins, undecided) in self.pairings.items():
+            lines.append("%-20s %-20s %8d %8d %8d" % (first, second, first_wins, second_wins, undecided))
+
+        if self.rallies:
+            rallies = sorted(self.rallies)
+            game_seconds = sum(rallies) / PHYSICS_HZ
+            lines.append("")
+            lines.append("rally length: mean %.1fs, p50 %.1fs, p90 %.1fs, max %.1fs (game time)"
+                         % (game_seconds / len(rallies), rallies[len(rallies) // 2] / PHYSICS_HZ,
+                            rallies[int(len(rallies) * 0.9)] / PHYSICS_HZ, rallies[-1] / PHYSICS_HZ))
+            lines.append("points per second: %.3f of game time, %.0f simulated (%.0f per worker)"
+                         % (self.points / game_seconds, self.points / wall_seconds,
+                            self.points / max(self.worker_seconds, 1e-9)))
+        return "\n".join(lines)
+
+
+# -------------------- Command line --------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pong AI-vs-AI tournament")
+    parser.add_argument("ais", nargs="*", help="AI specs: normal:<difficulty> or boss[:<prediction>[:<speed>]]")
+    parser.add_argument("--ladder", action="store_true", help="add the game's difficulty ladder (normal:0.2 .. normal:1.0)")
+    parser.add_argument("--games", type=int, default=100, help="games per pairing")
+    parser.add_argument("--points", type=int, default=11, help="points needed to win a game")
+    parser.add_argument("--ball-speed", type=float, default=14, help="serve speed")
+    parser.add_argument("--shard-size", type=int, default=10, help="games per task sent to a worker")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--seed", type=int, default=1, help="tournament seed")
+    args = parser.parse_args(argv)
+
+    specs = (["normal:%g" % level for level in DIFFICULTY_LADDER] if args.ladder else []) + args.ais
+    configs = {}
+    for spec in specs:
+        config = AIConfig.parse(spec)
+        configs[config.name] = config
+    if len(configs) < 2:
+        parser.error("need at least two different AIs")
+
+    # Every pairing is split into shards of at most shard_size games
+    tasks = []
+    for first, second in itertools.combinations(configs, 2):
+        for start in range(0, args.games, args.shard_size):
+            tasks.append((first, second, min(args.shard_size, args.games - start)))
+    seeds = shard_seeds(args.seed, len(tasks))
+
+    standings = Standings(list(configs))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(play_shard, configs[first], configs[second], seed, games, args.points,
+                               args.ball_speed): (first, second)
+                   for (first, second, games), seed in zip(tasks, seeds)}
+        for done, future in enumerate(as_completed(futures), 1):
+            first, second = futures[future]
+            results, seconds = future.result()
+            standings.add(first, second, results, seconds)
+            first_wins = sum(first_score > second_score for first_score, second_score, _ in results)
+            second_wins = sum(second_score > first_score for first_score, second_score, _ in results)
+            print("[%d/%d] %s vs %s: %d-%d in %.2fs" % (done, len(tasks), first, second, first_wins, second_wins,
+                                                       seconds), flush=True)
+    print(standings.report(time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])